@@ -1,4 +1,4 @@
-from typing import Dict, List, Union
+from typing import Dict, Iterable, List, Union
 
 
 JSONObject = Union[
@@ -13,11 +13,20 @@ version_minor = 0
 version_string = f"{version}.{version_minor}"
 
 
-def check_serialized_version(json_object: JSONObject):
+def check_serialized_version(json_object: JSONObject,
+                             supported_versions: Iterable[str] = (
+                                 version_string,)
+                             ) -> str:
+    """
+    Ensure that the stored version is one of the supported versions,
+    return the stored version. Callers that read more than one
+    version use the result to select the decoding of the object.
+    """
     stored_class = json_object["@"]["type"]
     stored_version = json_object["@"]["version"]
-    if stored_version != version_string:
+    if stored_version not in supported_versions:
         raise ValueError(
             f"Unsupported metadata version ({stored_version}) in "
             f"stored {stored_class} object, expected version: "
-            f"{version_string}")
+            f"{', '.join(supported_versions)}")
+    return stored_version
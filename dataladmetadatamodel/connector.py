@@ -1,22 +1,81 @@
-from typing import Any, Optional
+import weakref
+from typing import Any, Callable, Dict, Optional
 
+from dataladmetadatamodel.connectorcache import (
+    discard_connector,
+    get_connector_cache)
+from dataladmetadatamodel.identitymap import (
+    get_current_reference,
+    get_shared_object,
+    register_object)
 from dataladmetadatamodel.mapper import get_mapper
 from dataladmetadatamodel.mapper.reference import Reference
 
 
+# Size estimate for objects that do not provide their own estimate
+DEFAULT_SIZE_ESTIMATE = 1024
+
+
 class ConnectedObject:
     def __init__(self):
         self.modified = True
+        # The objects that refer to this object, keyed by the id of
+        # the referring object. Parents are referenced strongly, i.e.
+        # an object keeps its parents alive. The connector of a
+        # parent might be evicted, it only keeps a weak reference to
+        # the parent, see Connector.evict(). Modifications of this
+        # object are then saved with the parent that is reconnected
+        # to its connector.
+        self.parents: Optional[Dict[int, "ConnectedObject"]] = None
 
     def is_modified(self) -> bool:
         return self.modified
 
+    def add_parent(self, parent: "ConnectedObject"):
+        """
+        Register an object that refers to this object. Parents are
+        touched whenever this object is touched. If this object is
+        already modified, the parent is touched immediately.
+        """
+        if self.parents is None:
+            self.parents = dict()
+        self.parents[id(parent)] = parent
+        if self.modified:
+            parent.touch()
+
+    def register_child(self,
+                       child: Optional["ConnectedObject"]
+                       ) -> Optional["ConnectedObject"]:
+        """
+        Register self as parent of child, if child is not None.
+        Return child.
+        """
+        if child is not None:
+            child.add_parent(self)
+        return child
+
     def touch(self):
+        """
+        Mark this object and all its ancestors as modified. The
+        propagation stops at modified ancestors, because their
+        ancestors are already modified.
+        """
         self.modified = True
+        if self.parents:
+            for parent in self.parents.values():
+                if not parent.modified:
+                    parent.touch()
 
     def un_touch(self):
         self.modified = False
 
+    def get_size_estimate(self) -> int:
+        """
+        Return an estimate of the memory size of this object in
+        bytes. The estimate is used for connector budgets.
+        """
+        return DEFAULT_SIZE_ESTIMATE
+
     def save(self):
         raise NotImplementedError
 
@@ -25,6 +84,10 @@ class ConnectedObject:
 
 
 class Connector:
+    __slots__ = (
+        "reference", "object", "is_mapped", "evicted_object", "is_saving",
+        "__weakref__")
+
     def __init__(self,
                  reference: Optional[Reference],
                  obj: Optional[ConnectedObject],
@@ -32,6 +95,13 @@ class Connector:
         self.reference = reference
         self.object = obj
         self.is_mapped = is_mapped
+        # Weak reference to the object that was connected before
+        # the connector was evicted, see Connector.evict().
+        self.evicted_object: Optional[weakref.ref] = None
+        # Connectors are not evicted while they save their object,
+        # saving the object accounts, and might evict, other
+        # connectors, e.g. the connectors of child objects.
+        self.is_saving = False
 
     @classmethod
     def from_reference(cls, reference):
@@ -51,63 +121,134 @@ class Connector:
     def is_object_modified(self) -> bool:
         if self.is_mapped and self.object is not None:
             return self.object.is_modified()
+        evicted_object = self._get_evicted_object()
+        if evicted_object is not None:
+            return evicted_object.is_modified()
         return False
 
+    def is_evictable(self) -> bool:
+        return (
+            self.is_mapped
+            and not self.is_saving
+            and self.reference is not None
+            and self.object is not None
+            and not self.object.is_modified())
+
+    def evict(self):
+        """
+        Disconnect a clean, saved object. The object is reloaded on
+        the next call to load_object(). If the object is still used
+        elsewhere when it is requested again, it is reconnected
+        instead of being loaded a second time.
+        """
+        assert self.is_evictable()
+        self.evicted_object = weakref.ref(self.object)
+        self.object = None
+        self.is_mapped = False
+
+    def _get_evicted_object(self) -> Optional[ConnectedObject]:
+        if self.evicted_object is None:
+            return None
+        return self.evicted_object()
+
+    def _account(self):
+        if self.object is not None:
+            cache = get_connector_cache(self.reference.realm)
+            if cache is not None:
+                cache.access(self)
+
     def load_object(self) -> Any:
         if not self.is_mapped:
             assert self.reference is not None
+            evicted_object = self._get_evicted_object()
+            self.evicted_object = None
             if self.reference.is_none_reference():
                 self.object = None
+            elif evicted_object is not None:
+                self.object = evicted_object
             else:
-                self.object = get_mapper(
-                    self.reference.mapper_family,
-                    self.reference.class_name)(self.reference.realm).map(
-                        self.reference)
-                self.object.post_load(
-                    self.reference.mapper_family,
-                    self.reference.realm)
-                self.object.un_touch()
+                self.object = get_shared_object(self.reference)
+                if self.object is None:
+                    self.object = get_mapper(
+                        self.reference.mapper_family,
+                        self.reference.class_name)(self.reference.realm).map(
+                            self.reference)
+                    self.object.post_load(
+                        self.reference.mapper_family,
+                        self.reference.realm)
+                    self.object.un_touch()
+                    register_object(self.reference, self.object)
             self.is_mapped = True
+        if self.reference is not None:
+            self._account()
         return self.object
 
-    def save_object(self) -> Reference:
+    def save_object(self,
+                    save: Optional[
+                        Callable[[ConnectedObject], Reference]] = None
+                    ) -> Reference:
         """
         Save the connected object, if it is modified and save the
         state of the connector itself.
 
         Saving the connected object is delegated to the object via
-        ConnectedObject.save().
+        ConnectedObject.save(), or to save, if it is given. Mappers
+        use save to pass their state to the mappers of child objects.
         """
+        if not self.is_mapped:
+            # An evicted object might have been modified by a holder
+            # of the object, reconnect it to save the modifications.
+            evicted_object = self._get_evicted_object()
+            if evicted_object is not None and evicted_object.is_modified():
+                self.load_object()
+
         if self.is_mapped:
-            if self.object is None:
+            obj = self.object
+            if obj is None:
                 self.reference = Reference.get_none_reference()
             else:
                 # If there is no reference yet in this connector
                 # or if the object was modified, we have to save it.
-                # (There might be no reference here, because the object
-                # was already saved through another way.)
-                # TODO: can we cache the reference?
-                if True:
-                    # FIXME: check for modifications self.reference is None or
-                    #  self.is_object_modified():
-                    self.reference = self.object.save()
+                # Otherwise the reference still points to the
+                # persisted state of the object.
+                if self.reference is None or obj.is_modified():
+                    self.is_saving = True
+                    try:
+                        self.reference = (
+                            obj.save()
+                            if save is None
+                            else save(obj))
+                    finally:
+                        self.is_saving = False
+                    register_object(self.reference, obj)
+                else:
+                    # A shared object might have been saved by
+                    # another connector.
+                    self.reference = get_current_reference(
+                        self.reference,
+                        obj)
+                self._account()
         else:
             if self.reference is None:
                 self.reference = Reference.get_none_reference()
         return self.reference
 
     def set(self, obj):
+        discard_connector(self)
         self.object = obj
         self.reference = None
         self.is_mapped = True
+        self.evicted_object = None
 
     def purge(self, unsafe: Optional[bool] = False):
         if self.is_object_modified() and unsafe is False:
             raise ValueError(
                 f"Cannot purge unsaved, modified object of type "
                 f"{type(self.object).__name__}")
+        discard_connector(self)
         self.object = None
         self.is_mapped = False
+        self.evicted_object = None
 
     def deepcopy(self,
                  new_mapper_family: Optional[str] = None,
@@ -0,0 +1,162 @@
+"""
+Opt-in memory budgets for connected objects.
+
+Without a budget, every object that is loaded through a connector
+stays in memory until the connector is purged. A budget limits the
+number of objects, or their estimated size in bytes, that are held
+by connectors. A budget can be set globally or for individual realms,
+a realm budget takes precedence over the global budget.
+
+If a budget is exceeded, connectors are evicted in least recently
+used order. Only connectors with a clean, saved object are evicted,
+i.e. connectors that have a reference, whose object is not modified,
+and that are not saving their object. Evicted connectors reload their
+object transparently on the next call to Connector.load_object().
+An evicted object stays in memory while it, or one of its children,
+is still used, because children keep their parents alive.
+"""
+import weakref
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Optional
+
+
+class ConnectorCache:
+    def __init__(self,
+                 max_objects: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+
+        if max_objects is None and max_bytes is None:
+            raise ValueError("either max_objects or max_bytes is required")
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.size = 0
+        self.evictions = 0
+
+    def is_over_budget(self) -> bool:
+        return (
+            (self.max_objects is not None
+             and len(self.entries) > self.max_objects)
+            or (self.max_bytes is not None
+                and self.size > self.max_bytes))
+
+    def _remove(self, key: int):
+        _, size = self.entries.pop(key)
+        self.size -= size
+
+    def _on_collect(self, key: int, connector_reference: weakref.ref):
+        entry = self.entries.get(key, None)
+        if entry is not None and entry[0] is connector_reference:
+            self._remove(key)
+
+    def access(self, connector: "Connector"):
+        """
+        Mark the connector as most recently used and evict least
+        recently used connectors, if the budget is exceeded.
+        """
+        key = id(connector)
+        entry = self.entries.get(key, None)
+        if entry is not None:
+            if entry[0]() is connector:
+                self.entries.move_to_end(key)
+                self._evict()
+                return
+            self._remove(key)
+
+        size = connector.object.get_size_estimate()
+        self.entries[key] = (
+            weakref.ref(connector, partial(self._on_collect, key)),
+            size)
+        self.size += size
+        self._evict()
+
+    def discard(self, connector: "Connector"):
+        key = id(connector)
+        entry = self.entries.get(key, None)
+        if entry is not None and entry[0]() is connector:
+            self._remove(key)
+
+    def _evict(self):
+        # Visit every entry at most once. Entries that cannot be
+        # evicted are moved to the end, the most recently accessed
+        # connector is the last entry and is therefore never evicted.
+        for _ in range(len(self.entries) - 1):
+            if not self.is_over_budget():
+                return
+            key, (connector_reference, size) = self.entries.popitem(
+                last=False)
+            connector = connector_reference()
+            if connector is None or not connector.is_mapped:
+                self.size -= size
+            elif connector.is_evictable():
+                connector.evict()
+                self.size -= size
+                self.evictions += 1
+            else:
+                self.entries[key] = (connector_reference, size)
+
+    def get_statistics(self) -> Dict[str, Optional[int]]:
+        return {
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_objects": self.max_objects,
+            "max_bytes": self.max_bytes
+        }
+
+
+_global_cache: Optional[ConnectorCache] = None
+_realm_caches: Dict[str, ConnectorCache] = dict()
+
+
+def set_connector_budget(max_objects: Optional[int] = None,
+                         max_bytes: Optional[int] = None,
+                         realm: Optional[str] = None):
+    """
+    Set a budget for the objects that are held by connectors, either
+    for the given realm or, if realm is None, for all realms without
+    a realm budget. If max_objects and max_bytes are both None, the
+    budget is removed. Connectors that were loaded before the budget
+    was set are not accounted.
+    """
+    global _global_cache
+
+    if max_objects is None and max_bytes is None:
+        cache = None
+    else:
+        cache = ConnectorCache(max_objects, max_bytes)
+
+    if realm is None:
+        _global_cache = cache
+    elif cache is None:
+        _realm_caches.pop(str(realm), None)
+    else:
+        _realm_caches[str(realm)] = cache
+
+
+def get_connector_cache(realm: Optional[str]) -> Optional[ConnectorCache]:
+    if not _realm_caches:
+        return _global_cache
+    return _realm_caches.get(str(realm), _global_cache)
+
+
+def discard_connector(connector: "Connector"):
+    if _global_cache is not None:
+        _global_cache.discard(connector)
+    for cache in _realm_caches.values():
+        cache.discard(connector)
+
+
+def get_connector_cache_statistics() -> Dict[str, Dict[str, Optional[int]]]:
+    """
+    Return the statistics of all budgets, keyed by realm. The global
+    budget is reported with the key "*".
+    """
+    statistics = {
+        realm: cache.get_statistics()
+        for realm, cache in _realm_caches.items()
+    }
+    if _global_cache is not None:
+        statistics["*"] = _global_cache.get_statistics()
+    return statistics
@@ -1,7 +1,7 @@
 import enum
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 
-from .connector import ConnectedObject
+from .connector import ConnectedObject, Connector
 from .mapper import get_mapper
 from .metadatapath import MetadataPath
 from .metadatarootrecord import MetadataRootRecord
@@ -15,49 +15,124 @@ class NodeType(enum.Enum):
     INTERNAL = enum.auto()
 
 
-class DatasetTree(ConnectedObject, TreeNode):
+class DatasetTreeNode(TreeNode):
+    """
+    A node of a dataset tree. The value of a node is the metadata
+    root record of the dataset at the node, or None. The record is
+    held by a connector, it is mapped when the value is accessed.
+    """
+    __slots__ = ("dataset_tree",)
+
+    def __init__(self,
+                 dataset_tree: Optional["DatasetTree"],
+                 connector: Optional[Connector] = None):
+
+        TreeNode.__init__(self, connector)
+        self.dataset_tree = dataset_tree
+
+    def _load(self):
+        TreeNode._load(self)
+        for child_node in self._child_nodes.values():
+            child_node.dataset_tree = self.dataset_tree
+
+    def _create_node(self) -> "DatasetTreeNode":
+        return DatasetTreeNode(self.dataset_tree)
+
+    @property
+    def connector(self) -> Optional[Connector]:
+        return TreeNode.value.fget(self)
+
+    @connector.setter
+    def connector(self, connector: Optional[Connector]):
+        TreeNode.value.fset(self, connector)
+
+    @property
+    def value(self) -> Optional[MetadataRootRecord]:
+        connector = self.connector
+        if connector is None:
+            return None
+        return self.dataset_tree.register_child(connector.load_object())
+
+    @value.setter
+    def value(self, metadata_root_record: Optional[MetadataRootRecord]):
+        self.dataset_tree.touch()
+        self.connector = (
+            None
+            if metadata_root_record is None
+            else Connector.from_object(
+                self.dataset_tree.register_child(metadata_root_record)))
+
+
+class DatasetTree(ConnectedObject, DatasetTreeNode):
     def __init__(self,
                  mapper_family: str,
                  realm: str):
 
         ConnectedObject.__init__(self)
-        TreeNode.__init__(self)
+        DatasetTreeNode.__init__(self, self)
         self.mapper_family = mapper_family
         self.realm = realm
 
     def __contains__(self, path: MetadataPath) -> bool:
-        # The check for node.value <> None takes care of root paths
+        # The check for node.connector <> None takes care of root paths
         node = self.get_node_at_path(path)
-        return node is not None and node.value is not None
+        return node is not None and node.connector is not None
 
     def node_type(self):
         if self.is_leaf_node():
-            assert self.value is not None
+            assert self.connector is not None
             return NodeType.DATASET
         else:
-            if self.value is None:
+            if self.connector is None:
                 return NodeType.DIRECTORY
             else:
                 return NodeType.DATASET
 
     def add_directory(self, name):
         self.touch()
-        self._add_node(name, TreeNode())
+        self._add_node(name, DatasetTreeNode(self))
 
     def add_dataset(self,
                     path: MetadataPath,
                     metadata_root_record: MetadataRootRecord):
 
         self.touch()
+        self.register_child(metadata_root_record)
 
         dataset_node = self.get_node_at_path(path)
         if dataset_node is None:
             self.add_node_hierarchy(
                 path,
-                TreeNode(metadata_root_record),
+                DatasetTreeNode(
+                    self,
+                    Connector.from_object(metadata_root_record)),
                 allow_leaf_node_conversion=True)
         else:
-            dataset_node.value = metadata_root_record
+            dataset_node.connector = Connector.from_object(
+                metadata_root_record)
+
+    def add_datasets(self,
+                     datasets: Iterable[
+                         Tuple[MetadataPath, MetadataRootRecord]]):
+        """
+        Add the metadata root records of all datasets in a single
+        pass. Like add_dataset(), existing nodes are converted into
+        dataset nodes.
+        """
+        self.touch()
+        self._add_connectors(
+            (path, Connector.from_object(
+                self.register_child(metadata_root_record)))
+            for path, metadata_root_record in datasets)
+
+    def _add_connectors(self,
+                        connectors: Iterable[Tuple[MetadataPath, Connector]]):
+        directory_nodes = {(): self}
+        for path, connector in connectors:
+            self._get_directory_node(
+                directory_nodes,
+                path.parts,
+                True).connector = connector
 
     def add_subtree(self,
                     subtree: "DatasetTree",
@@ -68,7 +143,7 @@ class DatasetTree(ConnectedObject, TreeNode):
 
         self.touch()
 
-        sub_node = TreeNode(subtree.value)
+        sub_node = DatasetTreeNode(self, subtree.connector)
         for path, node in subtree.child_nodes.items():
             sub_node._add_node(path, node)
 
@@ -77,6 +152,18 @@ class DatasetTree(ConnectedObject, TreeNode):
             sub_node,
             allow_leaf_node_conversion=True)
 
+        # The nodes of the subtree belong to this tree now. Nodes that
+        # are not loaded yet, get this tree when they are loaded.
+        nodes = [sub_node]
+        while nodes:
+            node = nodes.pop()
+            node.dataset_tree = self
+            connector = node.connector
+            if connector is not None and connector.object is not None:
+                self.register_child(connector.object)
+            if node.is_loaded():
+                nodes.extend(node.child_nodes.values())
+
     def delete_subtree(self,
                        subtree_path: MetadataPath):
         if subtree_path == "":
@@ -90,22 +177,25 @@ class DatasetTree(ConnectedObject, TreeNode):
         _, containing_node = all_nodes_in_path[-2]
         name_to_delete, _ = all_nodes_in_path[-1]
         del containing_node.child_nodes[name_to_delete]
+        containing_node.location = None
 
-    def get_metadata_root_record(self, path: MetadataPath):
+    def get_metadata_root_record(self,
+                                 path: MetadataPath
+                                 ) -> Optional[MetadataRootRecord]:
+        """
+        Get the metadata root record at path. If it is not mapped
+        yet, it will be mapped.
+        """
         return self.get_node_at_path(path).value
 
     def save(self) -> Reference:
         """
-        Persists the dataset tree. First save connected
-        components in all metadata root records, if they
-        are mapped or modified. Then persist the dataset-tree
-        itself, with the class mapper.
+        Persists the dataset tree with the class mapper. The
+        class mapper saves the metadata root records, if they
+        are mapped or modified.
         """
         self.un_touch()
 
-        for _, file_node in self.get_paths_recursive(False):
-            file_node.value.save()
-
         return Reference(
             self.mapper_family,
             self.realm,
@@ -121,8 +211,8 @@ class DatasetTree(ConnectedObject, TreeNode):
                                        ]]:
         return [
             (name, node.value)
-            for name, node in self.get_paths_recursive(True)
-            if node.value is not None
+            for name, node in self.walk()
+            if node.connector is not None
         ]
 
     def deepcopy(self,
@@ -133,10 +223,9 @@ class DatasetTree(ConnectedObject, TreeNode):
             new_mapper_family or self.mapper_family,
             new_realm or self.realm)
 
-        for path, node in self.get_paths_recursive(True):
-            if node.value is not None:
-                assert isinstance(node.value, MetadataRootRecord)
-                copied_value = node.value.deepcopy(new_mapper_family, new_realm)
-                copied_dataset_tree.add_dataset(path, copied_value)
+        copied_dataset_tree._add_connectors(
+            (path, node.connector.deepcopy(new_mapper_family, new_realm))
+            for path, node in self.walk()
+            if node.connector is not None)
 
         return copied_dataset_tree
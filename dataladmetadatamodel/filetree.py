@@ -17,6 +17,9 @@ class FileTree(ConnectedObject, TreeNode):
         TreeNode.__init__(self)
         self.mapper_family = mapper_family
         self.realm = realm
+        # The location of the intern table of the persisted state,
+        # it is maintained by the git mapper, see interntable.py.
+        self.intern_table_location: Optional[str] = None
 
     def __contains__(self, path: Union[str, MetadataPath]) -> bool:
         # Allow strings as input as well
@@ -40,14 +43,31 @@ class FileTree(ConnectedObject, TreeNode):
         self.touch()
         self.add_node_hierarchy(
             path,
-            TreeNode(value=Connector.from_object(metadata)))
+            TreeNode(value=Connector.from_object(
+                self.register_child(metadata))))
+
+    def add_metadata_entries(self,
+                             entries: Iterable[
+                                 Tuple[MetadataPath, Optional[Metadata]]]):
+        """
+        Add metadata for all paths in entries in a single pass, see
+        TreeNode.add_node_hierarchies().
+        """
+        self.touch()
+        self.add_node_hierarchies(
+            (
+                path,
+                TreeNode(value=Connector.from_object(
+                    self.register_child(metadata))))
+            for path, metadata in entries)
 
     def get_metadata(self, path: MetadataPath) -> Optional[Metadata]:
-        return self.get_node_at_path(path).value.load_object()
+        return self.register_child(
+            self.get_node_at_path(path).value.load_object())
 
     def set_metadata(self, path: MetadataPath, metadata: Metadata):
         self.touch()
-        self.get_node_at_path(path).value.set(metadata)
+        self.get_node_at_path(path).value.set(self.register_child(metadata))
 
     def unget_metadata(self, path: MetadataPath):
         value = self.get_node_at_path(path).value
@@ -56,18 +76,12 @@ class FileTree(ConnectedObject, TreeNode):
 
     def save(self) -> Reference:
         """
-        Persists all file node values, i.e. all mapped metadata,
-        if they are mapped or modified Then save the tree itself,
-        with the class mapper.
+        Persists the file tree with the class mapper. The class
+        mapper saves the file node values, i.e. all mapped metadata,
+        if they are mapped or modified.
         """
         self.un_touch()
 
-        for _, metadata_connector in self.get_paths_recursive(False):
-            if metadata_connector is None:
-                metadata_connector = Connector.from_reference(
-                    Reference.get_none_reference())
-            metadata_connector.save_object()
-
         return Reference(
             self.mapper_family,
             self.realm,
@@ -119,18 +133,16 @@ class FileTree(ConnectedObject, TreeNode):
             new_mapper_family or self.mapper_family,
             new_realm or self.realm)
 
-        for path, connector in self.get_paths_recursive(True):
-            if connector is not None:
-                copied_connector = connector.deepcopy(
-                    new_mapper_family,
-                    new_realm)
-            else:
-                copied_connector = None
-
-            copied_file_tree.add_node_hierarchy(
-                path,
-                TreeNode(
-                    value=copied_connector),
-                allow_leaf_node_conversion=True)
+        copied_file_tree.add_node_hierarchies(
+            (
+                (
+                    path,
+                    TreeNode(
+                        value=node.value.deepcopy(new_mapper_family, new_realm)
+                        if node.value is not None
+                        else None))
+                for path, node in self.walk()
+            ),
+            allow_leaf_node_conversion=True)
 
         return copied_file_tree
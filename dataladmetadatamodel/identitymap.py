@@ -0,0 +1,155 @@
+"""
+An identity map for connected objects.
+
+Connectors that refer to the same logical object, e.g. a metadata
+root record that is reached via the UUID set and via the tree
+version list, share a single in-memory object instead of mapping the
+object once per connector. The identity map of a realm holds weak
+references to the loaded objects, keyed by class name and location.
+Only locations that identify immutable objects, i.e. git object
+hashes, are used as keys, because other locations, e.g. git
+references, might point to different objects over time.
+
+Only objects of the classes in SHAREABLE_CLASS_NAMES are shared.
+Objects of these classes record their identity, e.g. the dataset
+identifier and version of a metadata root record, i.e. equal
+persisted objects represent the same logical object. Objects of
+other classes, e.g. identical metadata of different files, are
+distinct objects that happen to be equal. Sharing them would apply
+modifications of one object to all equal objects.
+
+Objects that are modified are not handed out to other connectors,
+until they are saved. When a shared object is saved by one of its
+connectors, the other connectors pick up the new reference on their
+next save.
+"""
+import weakref
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from dataladmetadatamodel.mapper.gitmapper.gitbackend.cache import (
+    is_object_hash)
+from dataladmetadatamodel.mapper.reference import Reference
+
+
+SHAREABLE_CLASS_NAMES = {"MetadataRootRecord"}
+
+
+def _is_shareable(reference: Reference) -> bool:
+    return (
+        reference.class_name in SHAREABLE_CLASS_NAMES
+        and reference.mapper_family == "git"
+        and reference.location is not None
+        and is_object_hash(reference.location))
+
+
+class IdentityMap:
+    def __init__(self):
+        # Weak references to objects keyed by class name and location
+        self.objects: Dict[Tuple[str, str], weakref.ref] = dict()
+        # The current reference of every object in the map, keyed by
+        # the id of the object.
+        self.references: Dict[int, Tuple[weakref.ref, Reference]] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _get_key(reference: Reference) -> Tuple[str, str]:
+        return reference.class_name, reference.location.lower()
+
+    def _on_collect(self,
+                    object_id: int,
+                    key: Tuple[str, str],
+                    object_reference: weakref.ref):
+        if self.objects.get(key, None) is object_reference:
+            del self.objects[key]
+        entry = self.references.get(object_id, None)
+        if entry is not None and entry[0] is object_reference:
+            del self.references[object_id]
+
+    def get(self, reference: Reference) -> Optional["ConnectedObject"]:
+        object_reference = self.objects.get(self._get_key(reference), None)
+        obj = object_reference() if object_reference is not None else None
+        if obj is None or obj.is_modified():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return obj
+
+    def put(self, reference: Reference, obj: "ConnectedObject"):
+        key = self._get_key(reference)
+        object_id = id(obj)
+        entry = self.references.get(object_id, None)
+        if entry is not None and entry[0]() is obj:
+            old_key = self._get_key(entry[1])
+            if self.objects.get(old_key, None) is entry[0]:
+                del self.objects[old_key]
+
+        object_reference = weakref.ref(
+            obj,
+            partial(self._on_collect, object_id, key))
+        self.objects[key] = object_reference
+        self.references[object_id] = (object_reference, reference)
+
+    def get_reference(self, obj: "ConnectedObject") -> Optional[Reference]:
+        entry = self.references.get(id(obj), None)
+        if entry is not None and entry[0]() is obj:
+            return entry[1]
+        return None
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.objects)
+        }
+
+
+_identity_maps: Dict[str, IdentityMap] = dict()
+
+
+def _get_identity_map(realm: str) -> IdentityMap:
+    identity_map = _identity_maps.get(str(realm), None)
+    if identity_map is None:
+        identity_map = IdentityMap()
+        _identity_maps[str(realm)] = identity_map
+    return identity_map
+
+
+def get_shared_object(reference: Reference) -> Optional["ConnectedObject"]:
+    """
+    Return the unmodified object that is loaded from, or was saved
+    as, the given reference, or None, if no such object exists.
+    """
+    if not _is_shareable(reference):
+        return None
+    return _get_identity_map(reference.realm).get(reference)
+
+
+def register_object(reference: Reference, obj: "ConnectedObject"):
+    """
+    Record that obj is the in-memory representation of reference.
+    """
+    if _is_shareable(reference):
+        _get_identity_map(reference.realm).put(reference, obj)
+
+
+def get_current_reference(reference: Reference,
+                          obj: "ConnectedObject") -> Reference:
+    """
+    Return the reference under which obj was last registered in
+    the realm of reference. If obj is not registered, return
+    reference.
+    """
+    if not _is_shareable(reference):
+        return reference
+    current_reference = _get_identity_map(
+        reference.realm).get_reference(obj)
+    return current_reference or reference
+
+
+def get_identity_map_statistics() -> Dict[str, Dict[str, int]]:
+    return {
+        realm: identity_map.get_statistics()
+        for realm, identity_map in _identity_maps.items()
+    }
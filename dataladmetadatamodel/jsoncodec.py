@@ -0,0 +1,99 @@
+"""
+JSON encoding and decoding for all serialization sites of the model.
+
+If orjson is installed, it is used to decode JSON, otherwise the json
+module of the standard library is used. Both yield equal objects.
+Content that orjson rejects, but the json module accepts, e.g. NaN, or
+lone surrogates, is decoded by the json module. Because orjson silently
+decodes integers that exceed 64 bits as floats, content that contains
+LONG_DIGIT_SEQUENCE_LENGTH or more consecutive digits is decoded by the
+json module as well.
+
+Canonical encoding, the default, yields the output of json.dumps()
+with default arguments, independent of installed libraries. Objects
+that are persisted must be encoded canonically, because their object
+hashes depend on the encoding. orjson cannot create this output, it
+does not support the separators and the ASCII-escaping of json.dumps().
+Non-canonical encoding uses orjson, if it is installed, its output
+is compact and might differ between installations.
+"""
+import json
+from typing import Iterator, Union
+
+from . import JSONObject
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# The smallest number of digits of integers that exceed 64 bits
+LONG_DIGIT_SEQUENCE_LENGTH = 19
+
+# Translation table that maps all digits to "0" and all other bytes
+# to "x". Searching the translated content is considerably faster
+# than searching the content with a regular expression.
+digit_table = bytes(
+    ord("0") if ord("0") <= byte <= ord("9") else ord("x")
+    for byte in range(256))
+
+long_digit_sequence = b"0" * LONG_DIGIT_SEQUENCE_LENGTH
+
+
+def _has_long_digit_sequence(content: Union[str, bytes]) -> bool:
+    if isinstance(content, str):
+        content = content.encode()
+    return long_digit_sequence in content.translate(digit_table)
+
+
+def loads(content: Union[str, bytes]) -> JSONObject:
+    if orjson is not None and not _has_long_digit_sequence(content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def dumps(json_object: JSONObject, canonical: bool = True) -> str:
+    if canonical or orjson is None:
+        return json.dumps(json_object)
+    try:
+        return orjson.dumps(
+            json_object,
+            option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        return json.dumps(json_object)
+
+
+def iter_dumps(json_object: JSONObject, depth: int) -> Iterator[str]:
+    """
+    Yield the canonical encoding of json_object in chunks. Dictionaries
+    and lists up to the given depth are encoded item by item, values
+    below that depth are encoded as a whole. The concatenation of the
+    chunks equals dumps(json_object).
+    """
+    if depth == 0 or not isinstance(json_object, (dict, list)) \
+            or not json_object:
+        yield dumps(json_object)
+        return
+
+    if isinstance(json_object, list):
+        separator = "["
+        for value in json_object:
+            yield separator
+            yield from iter_dumps(value, depth - 1)
+            separator = ", "
+        yield "]"
+        return
+
+    separator = "{"
+    for key, value in json_object.items():
+        # Non-string keys are converted like json.dumps() converts them
+        if not isinstance(key, str):
+            key = dumps(key)
+        yield separator + dumps(key) + ": "
+        yield from iter_dumps(value, depth - 1)
+        separator = ", "
+    yield "}"
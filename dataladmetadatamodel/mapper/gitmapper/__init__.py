@@ -1,5 +1,6 @@
 from .datasettreemapper import DatasetTreeGitMapper
 from .filetreemapper import FileTreeGitMapper
+from .metadatacontentmapper import MetadataContentGitMapper
 from .metadatamapper import MetadataGitMapper
 from .metadatarootrecordmapper import MetadataRootRecordGitMapper
 from .filetreemapper import GitReference
@@ -14,6 +15,7 @@ GIT_MAPPER_FAMILY_MEMBERS = {
     "DatasetTree": DatasetTreeGitMapper,
     "FileTree": FileTreeGitMapper,
     "Metadata": MetadataGitMapper,
+    "MetadataContent": MetadataContentGitMapper,
     "MetadataRootRecord": MetadataRootRecordGitMapper,
     "Reference": ReferenceGitMapper,
     "Text": TextGitMapper,
@@ -0,0 +1,304 @@
+"""
+Codecs encode the JSON objects that git mappers persist in blobs,
+e.g. Metadata, version lists, and metadata root records.
+
+  - "json": JSON text, the default, readable by all versions of
+    the model
+  - "compact": a binary encoding, in which every string is stored
+    once in a string table, and integers and sizes are stored as
+    varints
+
+The codec that is used to save objects can be selected with
+set_codec(), or with the environment variable
+DATALAD_METADATA_MODEL_CODEC. Objects are always decoded with the
+codec that encoded them, i.e. a realm may contain objects that were
+encoded with different codecs.
+
+A compact blob starts with COMPACT_MAGIC, which cannot start a JSON
+text, followed by the version of the compact format. The version of
+the encoded object itself is recorded in its "@"-entry, like in JSON,
+and is checked by check_serialized_version().
+"""
+import os
+import struct
+from abc import ABCMeta, abstractmethod
+from typing import Callable, Dict, List, Tuple
+
+from .gitbackend import git_load_decoded, git_save_bytes
+from ... import JSONObject
+from ...jsoncodec import dumps, loads
+
+
+class Codec(metaclass=ABCMeta):
+    name = ""
+
+    @abstractmethod
+    def encode(self, json_object: JSONObject) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, content: bytes) -> JSONObject:
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    name = "json"
+
+    def encode(self, json_object: JSONObject) -> bytes:
+        return dumps(json_object).encode()
+
+    def decode(self, content: bytes) -> JSONObject:
+        return loads(content)
+
+
+COMPACT_MAGIC = b"\x00DLC"
+
+COMPACT_VERSION = "1.0"
+
+# Every value starts with a tag byte. Tags below SMALL_STRING_LIMIT
+# are strings, whose string table index is the tag. Tags from
+# SMALL_INTEGER_START on are integers, whose value is the tag minus
+# SMALL_INTEGER_START. All other values are identified by the tags
+# below, and are followed by their data, if any.
+SMALL_STRING_LIMIT = 0x80
+(
+    TAG_NONE,
+    TAG_FALSE,
+    TAG_TRUE,
+    TAG_INTEGER,
+    TAG_NEGATIVE_INTEGER,
+    TAG_FLOAT,
+    TAG_STRING,
+    TAG_LIST,
+    TAG_DICT
+) = range(SMALL_STRING_LIMIT, SMALL_STRING_LIMIT + 9)
+SMALL_INTEGER_START = 0xc0
+SMALL_INTEGER_LIMIT = 0x100 - SMALL_INTEGER_START
+
+float_struct = struct.Struct(">d")
+
+
+def _write_varint(output: bytearray, value: int):
+    while value > 0x7f:
+        output.append((value & 0x7f) | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def _read_varint(content: bytes, position: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = content[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+def _get_key_string(key) -> str:
+    # Convert keys like dumps() does
+    return key if isinstance(key, str) else dumps(key)
+
+
+def _decode_compact_version_1(content: bytes, position: int) -> JSONObject:
+    count, position = _read_varint(content, position)
+    strings: List[str] = []
+    for _ in range(count):
+        length, position = _read_varint(content, position)
+        strings.append(content[position:position + length].decode())
+        position += length
+
+    def read_varint() -> int:
+        nonlocal position
+        byte = content[position]
+        if byte < 0x80:
+            position += 1
+            return byte
+        value, position = _read_varint(content, position)
+        return value
+
+    def read_value() -> JSONObject:
+        nonlocal position
+        tag = content[position]
+        position += 1
+        if tag < SMALL_STRING_LIMIT:
+            return strings[tag]
+        if tag >= SMALL_INTEGER_START:
+            return tag - SMALL_INTEGER_START
+        if tag == TAG_DICT:
+            # Read the key before the value, dict comprehensions
+            # evaluate the value first in Python < 3.8.
+            json_dict = dict()
+            for _ in range(read_varint()):
+                key = strings[read_varint()]
+                json_dict[key] = read_value()
+            return json_dict
+        if tag == TAG_LIST:
+            return [read_value() for _ in range(read_varint())]
+        if tag == TAG_STRING:
+            return strings[read_varint()]
+        if tag == TAG_INTEGER:
+            return read_varint()
+        if tag == TAG_NEGATIVE_INTEGER:
+            return -read_varint()
+        if tag == TAG_FLOAT:
+            value = float_struct.unpack_from(content, position)[0]
+            position += float_struct.size
+            return value
+        if tag == TAG_NONE:
+            return None
+        if tag == TAG_TRUE:
+            return True
+        if tag == TAG_FALSE:
+            return False
+        raise ValueError(f"Unknown value tag: {tag}")
+
+    result = read_value()
+    if position != len(content):
+        raise ValueError("Trailing data after compact encoded object")
+    return result
+
+
+COMPACT_DECODERS: Dict[str, Callable[[bytes, int], JSONObject]] = {
+    COMPACT_VERSION: _decode_compact_version_1
+}
+
+
+class CompactCodec(Codec):
+    name = "compact"
+
+    def encode(self, json_object: JSONObject) -> bytes:
+        strings: Dict[str, int] = dict()
+        body = bytearray()
+
+        def get_string_index(string: str) -> int:
+            index = strings.get(string, None)
+            if index is None:
+                index = len(strings)
+                strings[string] = index
+            return index
+
+        def write_value(value: JSONObject):
+            if isinstance(value, str):
+                index = get_string_index(value)
+                if index < SMALL_STRING_LIMIT:
+                    body.append(index)
+                else:
+                    body.append(TAG_STRING)
+                    _write_varint(body, index)
+            elif value is None:
+                body.append(TAG_NONE)
+            elif value is True:
+                body.append(TAG_TRUE)
+            elif value is False:
+                body.append(TAG_FALSE)
+            elif isinstance(value, int):
+                if 0 <= value < SMALL_INTEGER_LIMIT:
+                    body.append(SMALL_INTEGER_START + value)
+                elif value >= 0:
+                    body.append(TAG_INTEGER)
+                    _write_varint(body, value)
+                else:
+                    body.append(TAG_NEGATIVE_INTEGER)
+                    _write_varint(body, -value)
+            elif isinstance(value, float):
+                body.append(TAG_FLOAT)
+                body.extend(float_struct.pack(value))
+            elif isinstance(value, dict):
+                body.append(TAG_DICT)
+                _write_varint(body, len(value))
+                for key, element in value.items():
+                    _write_varint(
+                        body,
+                        get_string_index(_get_key_string(key)))
+                    write_value(element)
+            elif isinstance(value, (list, tuple)):
+                body.append(TAG_LIST)
+                _write_varint(body, len(value))
+                for element in value:
+                    write_value(element)
+            else:
+                raise TypeError(
+                    f"Object of type {type(value).__name__} is not "
+                    f"JSON serializable")
+
+        write_value(json_object)
+
+        output = bytearray(COMPACT_MAGIC)
+        encoded_version = COMPACT_VERSION.encode()
+        _write_varint(output, len(encoded_version))
+        output.extend(encoded_version)
+        _write_varint(output, len(strings))
+        for string in strings:
+            encoded_string = string.encode()
+            _write_varint(output, len(encoded_string))
+            output.extend(encoded_string)
+        return bytes(output + body)
+
+    def decode(self, content: bytes) -> JSONObject:
+        if not content.startswith(COMPACT_MAGIC):
+            raise ValueError("Not a compact encoded object")
+        try:
+            length, position = _read_varint(content, len(COMPACT_MAGIC))
+            stored_version = content[position:position + length].decode()
+            decoder = COMPACT_DECODERS.get(stored_version, None)
+            if decoder is None:
+                raise ValueError(
+                    f"Unsupported compact format version "
+                    f"({stored_version}), expected version: "
+                    f"{', '.join(COMPACT_DECODERS)}")
+            return decoder(content, position + length)
+        except (IndexError, UnicodeDecodeError, struct.error) as e:
+            raise ValueError(f"Malformed compact encoded object: {e}")
+
+
+CODECS = {
+    codec.name: codec
+    for codec in (JSONCodec(), CompactCodec())
+}
+
+DEFAULT_CODEC_NAME = os.environ.get(
+    "DATALAD_METADATA_MODEL_CODEC",
+    "json")
+
+
+codec = None
+
+
+def set_codec(name: str):
+    global codec
+
+    selected_codec = CODECS.get(name, None)
+    if selected_codec is None:
+        raise ValueError(f"Unknown codec: {name}")
+    codec = selected_codec
+
+
+def get_codec() -> Codec:
+    return codec
+
+
+set_codec(DEFAULT_CODEC_NAME)
+
+
+def decode(content: bytes) -> JSONObject:
+    """ Decode content with the codec that encoded it """
+    if content.startswith(COMPACT_MAGIC):
+        return CODECS["compact"].decode(content)
+    return CODECS["json"].decode(content)
+
+
+def load_json_object(realm: str, location: str) -> JSONObject:
+    """
+    Load a JSON object that was saved with save_json_object(). The
+    returned object might be shared with other callers and must
+    therefore not be modified.
+    """
+    return git_load_decoded(realm, location, decode)
+
+
+def save_json_object(realm: str, json_object: JSONObject) -> str:
+    """ Save a JSON object with the current codec """
+    return git_save_bytes(realm, codec.encode(json_object))
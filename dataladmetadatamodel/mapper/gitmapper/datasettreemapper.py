@@ -1,7 +1,8 @@
+from functools import partial
+from typing import Dict, Optional, Tuple
 
 from .objectreference import GitReference, add_tree_reference
-from .gitbackend.subprocess import git_ls_tree_recursive, git_save_tree
-from .metadatarootrecordmapper import MetadataRootRecordGitMapper
+from .gitbackend import git_ls_tree, git_save_tree
 from ..basemapper import BaseMapper
 from ..reference import Reference
 
@@ -11,66 +12,93 @@ DATALAD_ROOT_RECORD_NAME = ".datalad_metadata_root_record"
 
 class DatasetTreeGitMapper(BaseMapper):
 
-    def _unmap_metadata_root_record(self, metadata_root_record) -> str:
-        return MetadataRootRecordGitMapper(self.realm).unmap(
-            metadata_root_record)
-
-    def _save_dataset_tree(self, node: "TreeNode") -> str:
+    def _save_dataset_tree(self, node: "DatasetTreeNode") -> str:
+        """
+        Save the node, if it differs from its persisted state, and
+        return the location of the persisted state. Nodes that were
+        not loaded are unchanged, they are neither loaded nor saved.
+        """
         dir_entries = []
-
-        if node.value is not None:
-            from dataladmetadatamodel.metadatarootrecord import \
-                MetadataRootRecord
-
-            assert isinstance(node.value, MetadataRootRecord)
-            location = self._unmap_metadata_root_record(node.value)
+        is_changed = node.location is None
+
+        if node.connector is not None:
+            previous_reference = node.connector.reference
+            location = node.connector.save_object().location
+            is_changed = (
+                is_changed
+                or previous_reference is None
+                or location != previous_reference.location)
             dir_entries.append(
                 ("100644", "blob", location, DATALAD_ROOT_RECORD_NAME))
 
         for name, child_node in node.child_nodes.items():
-            dir_entries.append(
-                ("040000", "tree", self._save_dataset_tree(child_node), name))
-        return git_save_tree(self.realm, dir_entries)
-
-    def _map_metadata_root_record(self,
-                                  location: str) -> "MetadataRootRecord":
-        return MetadataRootRecordGitMapper(self.realm).map(
-            Reference("git", self.realm, "MetadataRootRecord", location)
-        )
+            previous_location = child_node.location
+            if child_node.is_loaded() or previous_location is None:
+                location = self._save_dataset_tree(child_node)
+                is_changed = is_changed or location != previous_location
+            else:
+                location = previous_location
+            dir_entries.append(("040000", "tree", location, name))
+
+        if is_changed:
+            node.location = git_save_tree(self.realm, dir_entries)
+        return node.location
+
+    def _map_tree_level(self,
+                        location: str
+                        ) -> Tuple[
+                            Optional["Connector"],
+                            Dict[str, "DatasetTreeNode"]]:
+        """
+        Create the value and the child nodes of a single dataset
+        tree node. The metadata root record is not mapped, and the
+        child nodes load their own levels when they are accessed.
+        """
+        from dataladmetadatamodel.connector import Connector
+        from dataladmetadatamodel.datasettree import DatasetTreeNode
+
+        value = None
+        child_nodes = dict()
+        for line in git_ls_tree(self.realm, location):
+            object_info, name = line.split("\t", 1)
+            object_hash = object_info.split()[2]
+            if name == DATALAD_ROOT_RECORD_NAME:
+                value = Connector.from_reference(
+                    Reference(
+                        "git",
+                        self.realm,
+                        "MetadataRootRecord",
+                        object_hash))
+            else:
+                child_nodes[name] = DatasetTreeNode(None)
+                child_nodes[name].set_loader(
+                    partial(self._map_tree_level, object_hash),
+                    object_hash)
+        return value, child_nodes
 
     def map(self, ref: Reference) -> "DatasetTree":
         from dataladmetadatamodel.datasettree import DatasetTree
-        from dataladmetadatamodel.metadatapath import MetadataPath
-        from dataladmetadatamodel.treenode import TreeNode
 
         dataset_tree = DatasetTree("git", self.realm)
-
-        # List all leaf-nodes. Those should only end with the datalad
-        # root record-name. Add the hierarchy except the leaf-node,
-        # read the metadata root record from the leave node, and
-        # add it as value to the hierarchy.
-        for line in git_ls_tree_recursive(self.realm, ref.location):
-
-            _, _, location, path_string = line.split()
-            path = MetadataPath(path_string)
-            assert path.name == DATALAD_ROOT_RECORD_NAME
-            metadata_root_record = self._map_metadata_root_record(location)
-
-            dataset_tree.add_node_hierarchy(
-                MetadataPath(*path.parts[:-1]),
-                TreeNode(metadata_root_record),
-                allow_leaf_node_conversion=True
-            )
+        dataset_tree.set_loader(
+            partial(self._map_tree_level, ref.location),
+            ref.location)
         return dataset_tree
 
     def unmap(self, obj) -> str:
         """
         Save DatasetTree as git tree with DATALAD_ROOT_RECORD_NAME
-        nodes for each MetadataRootRecord instance.
+        nodes for each MetadataRootRecord instance. Only nodes that
+        differ from their persisted state are saved.
         """
         from dataladmetadatamodel.datasettree import DatasetTree
 
         assert isinstance(obj, DatasetTree)
+        if not obj.is_loaded() and obj.location is not None:
+            return obj.location
+
+        previous_location = obj.location
         dataset_tree_hash = self._save_dataset_tree(obj)
-        add_tree_reference(GitReference.DATASET_TREE, dataset_tree_hash)
+        if dataset_tree_hash != previous_location:
+            add_tree_reference(GitReference.DATASET_TREE, dataset_tree_hash)
         return dataset_tree_hash
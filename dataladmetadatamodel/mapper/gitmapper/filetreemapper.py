@@ -1,24 +1,138 @@
+import weakref
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from .objectreference import GitReference, add_tree_reference
-from .gitbackend.subprocess import (
-    git_load_str,
-    git_ls_tree_recursive,
+from .gitbackend import (
+    get_empty_blob_hash,
+    git_load_json,
+    git_load_str_list,
+    git_ls_tree,
+    git_save_json,
     git_save_str,
     git_save_tree)
+from .interntable import InternTable
+from .metadatamapper import MetadataGitMapper
 from ..basemapper import BaseMapper
 from ..reference import Reference
+from ... import check_serialized_version
 
 
 empty_tree_location = "None"
 
+# Names of root tree entries that are not paths of the file tree start
+# with RESERVED_NAME_PREFIX. The root entries of paths that start with
+# RESERVED_NAME_PREFIX are stored with ESCAPED_NAME_PREFIX prepended,
+# i.e. they never collide with reserved names.
+RESERVED_NAME_PREFIX = ".datalad_file_tree_"
+ESCAPED_NAME_PREFIX = RESERVED_NAME_PREFIX + "escaped_"
+
+# The root tree of a file tree contains a blob with this name,
+# that records the version of the file tree format.
+FILE_TREE_FORMAT_NAME = RESERVED_NAME_PREFIX + "format"
+
+# The root tree of a file tree, that contains interned metadata,
+# contains a tree with this name, that holds the entries of its intern
+# table. The entries are named by their location, see interntable.py.
+INTERN_TABLE_NAME = RESERVED_NAME_PREFIX + "intern_table"
+
+# Version 2.0: leaf entries point to blobs that contain a JSON-serialized
+# Reference to the Metadata object. File trees in this format carry no
+# format blob.
+# Version 2.1: leaf entries point to Metadata blobs directly, the empty
+# blob represents a None-reference.
+LEGACY_FILE_TREE_VERSION = "2.0"
+FILE_TREE_VERSION = "2.1"
+SUPPORTED_FILE_TREE_VERSIONS = (LEGACY_FILE_TREE_VERSION, FILE_TREE_VERSION)
+
+
+def _escape_root_name(name: str) -> str:
+    if name.startswith(RESERVED_NAME_PREFIX):
+        return ESCAPED_NAME_PREFIX + name
+    return name
+
+
+def _unescape_root_name(name: str) -> Optional[str]:
+    """
+    Return the path name of a root entry, or None, if the
+    entry has a reserved name.
+    """
+    if name.startswith(ESCAPED_NAME_PREFIX):
+        return name[len(ESCAPED_NAME_PREFIX):]
+    if name.startswith(RESERVED_NAME_PREFIX):
+        return None
+    return name
+
 
 class FileTreeGitMapper(BaseMapper):
 
-    def _save_file_tree(self, node: "TreeNode") -> str:
+    def _save_metadata(self,
+                       intern_table: InternTable,
+                       obj: "ConnectedObject") -> Reference:
+        """
+        Save metadata of this realm in the interned format, and any
+        other object with its own mapper.
+        """
+        from dataladmetadatamodel.metadata import Metadata
+
+        if not isinstance(obj, Metadata) \
+                or obj.mapper_family != "git" \
+                or str(obj.realm) != str(self.realm):
+            return obj.save()
+
+        obj.un_touch()
+        return Reference(
+            "git",
+            self.realm,
+            "Metadata",
+            MetadataGitMapper(self.realm, intern_table).unmap(obj))
+
+    def _get_leaf_location(self,
+                           node: "TreeNode",
+                           save_metadata: Callable[
+                               ["ConnectedObject"], Reference]) -> str:
+        connector = node.value
+        reference = connector.save_object(save_metadata)
+        if reference.is_none_reference():
+            return git_save_str(self.realm, "")
+        if reference.class_name != "Metadata":
+            raise ValueError(
+                f"Cannot store {reference} in a file tree, only "
+                f"Metadata is supported")
+        if reference.mapper_family != "git" \
+                or str(reference.realm) != str(self.realm):
+            # Leaves of legacy file trees might refer to metadata of
+            # other realms, copy the metadata into this realm, like
+            # deepcopy() does. Unmapped connectors are replaced by the
+            # connector of the copy. Mapped objects might be modified
+            # by their holders and are copied whenever they are saved.
+            copied_connector = connector.deepcopy("git", self.realm)
+            if not connector.is_mapped:
+                node.value = copied_connector
+            reference = copied_connector.reference
+        return reference.location
+
+    def _get_tree_entries(self,
+                          node: "TreeNode",
+                          save_metadata: Callable[
+                              ["ConnectedObject"], Reference]
+                          ) -> Tuple[List[Tuple[str, str, str, str]], bool]:
+        """
+        Return the tree entries of node and a flag that indicates
+        whether the entries differ from the persisted entries of
+        node. Directory nodes that were not loaded are unchanged,
+        they are neither loaded nor saved.
+        """
         from dataladmetadatamodel.connector import Connector
 
         dir_entries = []
+        is_changed = node.location is None
         for name, child_node in node.child_nodes.items():
+            previous_location = child_node.location
+            if not child_node.is_loaded() and previous_location is not None:
+                dir_entries.append(("040000", "tree", previous_location, name))
+                continue
+
             if child_node.is_leaf_node():
                 assert isinstance(child_node.value, Connector)
                 # Save connector, that will ensure that the reference is set.
@@ -26,47 +140,225 @@ class FileTreeGitMapper(BaseMapper):
                 #  save-operation, it should probably be called in FileTree
                 #  or TreeNode, but that would require another recursive
                 #  descent.
-                child_node.value.save_object()
-                # Save connectors reference.
-                location = git_save_str(
-                    self.realm,
-                    child_node.value.reference.to_json_str())
+                location = self._get_leaf_location(child_node, save_metadata)
+                child_node.location = location
                 dir_entries.append(("100644", "blob", location, name))
             else:
-                dir_entries.append((
-                    "040000",
-                    "tree",
-                    self._save_file_tree(child_node), name))
+                location = self._save_file_tree(child_node, save_metadata)
+                dir_entries.append(("040000", "tree", location, name))
+            is_changed = is_changed or location != previous_location
+        return dir_entries, is_changed
 
-        if dir_entries:
-            return git_save_tree(self.realm, dir_entries)
+    def _save_file_tree(self,
+                        node: "TreeNode",
+                        save_metadata: Callable[
+                            ["ConnectedObject"], Reference]) -> str:
+        """
+        Save the node, if it differs from its persisted state, and
+        return the location of the persisted state.
+        """
+        dir_entries, is_changed = self._get_tree_entries(node, save_metadata)
+        if is_changed:
+            node.location = git_save_tree(self.realm, dir_entries)
+        return node.location
+
+    def _read_tree_entries(self, location: str) -> List[Tuple[str, str, str]]:
+        entries = []
+        for line in git_ls_tree(self.realm, location):
+            object_info, name = line.split("\t", 1)
+            _, node_type, object_hash = object_info.split()
+            entries.append((node_type, object_hash, name))
+        return entries
+
+    def _map_tree_level(self,
+                        location: str,
+                        file_tree_version: str
+                        ) -> Tuple[None, Dict[str, "TreeNode"]]:
+        return self._create_nodes(
+            self._read_tree_entries(location),
+            file_tree_version)
+
+    def _create_nodes(self,
+                      entries: List[Tuple[str, str, str]],
+                      file_tree_version: str
+                      ) -> Tuple[None, Dict[str, "TreeNode"]]:
+        """
+        Create the nodes of a single level of a file tree. Directory
+        nodes load their child nodes from the git tree on access.
+        """
+        from dataladmetadatamodel.connector import Connector
+        from dataladmetadatamodel.treenode import TreeNode
+
+        if file_tree_version == LEGACY_FILE_TREE_VERSION:
+            references = iter([
+                Reference.from_json_str(reference_json_str)
+                for reference_json_str in git_load_str_list(
+                    self.realm,
+                    [
+                        object_hash
+                        for node_type, object_hash, _ in entries
+                        if node_type == "blob"
+                    ])
+            ])
+        else:
+            empty_blob_hash = get_empty_blob_hash(self.realm)
+            references = iter([
+                Reference.get_none_reference()
+                if object_hash == empty_blob_hash
+                else Reference("git", self.realm, "Metadata", object_hash)
+                for node_type, object_hash, _ in entries
+                if node_type == "blob"
+            ])
+
+        # Directories in the legacy format have no location, because
+        # they have to be saved in the current format.
+        is_current_version = file_tree_version == FILE_TREE_VERSION
+        child_nodes = dict()
+        for node_type, object_hash, name in entries:
+            if node_type == "blob":
+                child_nodes[name] = TreeNode(
+                    Connector.from_reference(next(references)))
+                child_nodes[name].location = object_hash
+            else:
+                child_nodes[name] = TreeNode()
+                child_nodes[name].set_loader(
+                    partial(
+                        self._map_tree_level,
+                        object_hash,
+                        file_tree_version),
+                    object_hash if is_current_version else None)
+        return None, child_nodes
+
+    def _map_root_level(self,
+                        file_tree_ref: Callable[[], "FileTree"],
+                        location: str
+                        ) -> Tuple[None, Dict[str, "TreeNode"]]:
+
+        if location == empty_tree_location:
+            return None, dict()
+
+        entries = self._read_tree_entries(location)
+        format_locations = [
+            object_hash
+            for _, object_hash, name in entries
+            if name == FILE_TREE_FORMAT_NAME
+        ]
+        if format_locations:
+            file_tree_version = check_serialized_version(
+                git_load_json(self.realm, format_locations[0]),
+                SUPPORTED_FILE_TREE_VERSIONS)
         else:
-            return empty_tree_location
+            file_tree_version = LEGACY_FILE_TREE_VERSION
+
+        if file_tree_version == LEGACY_FILE_TREE_VERSION:
+            return self._create_nodes(entries, file_tree_version)
+
+        path_entries = []
+        for node_type, object_hash, name in entries:
+            path_name = _unescape_root_name(name)
+            if path_name is not None:
+                path_entries.append((node_type, object_hash, path_name))
+            elif name == INTERN_TABLE_NAME:
+                file_tree_ref().intern_table_location = object_hash
+        return self._create_nodes(path_entries, file_tree_version)
+
+    def _save_intern_table(self,
+                           intern_table: InternTable,
+                           previous_entry_locations: Iterable[str],
+                           previous_location: Optional[str]
+                           ) -> Optional[str]:
+        """
+        Save the intern table, if its entries differ from the previous
+        entries, and return the location of the persisted table, or
+        None, if the table is empty.
+        """
+        if not intern_table.entry_locations:
+            return None
+        if intern_table.entry_locations == set(previous_entry_locations):
+            return previous_location
+        return git_save_tree(
+            self.realm,
+            [
+                ("100644", "blob", entry_location, entry_location)
+                for entry_location in sorted(intern_table.entry_locations)
+            ])
 
     def map(self, ref: Reference) -> "FileTree":
-        from dataladmetadatamodel.connector import Connector
+        """
+        Map the root of the file tree. The levels below the root
+        are mapped when they are accessed.
+        """
         from dataladmetadatamodel.filetree import FileTree
-        from dataladmetadatamodel.metadatapath import MetadataPath
-        from dataladmetadatamodel.treenode import TreeNode
 
+        # The root level loader records the location of the intern
+        # table in the file tree, it refers to the file tree weakly,
+        # to prevent a reference cycle.
         file_tree = FileTree("git", self.realm)
-        if ref.location != empty_tree_location:
-            for line in git_ls_tree_recursive(self.realm, ref.location):
-                location, path = line[12:52], line[53:]
-                connector = Connector.from_reference(
-                    Reference.from_json_str(
-                        git_load_str(self.realm, location)))
-                file_tree.add_node_hierarchy(
-                    MetadataPath(path),
-                    TreeNode(connector))
+        file_tree.set_loader(
+            partial(
+                self._map_root_level,
+                weakref.ref(file_tree),
+                ref.location),
+            None if ref.location == empty_tree_location else ref.location)
         return file_tree
 
     def unmap(self, obj) -> str:
-        """ Save FileTree as git file tree """
+        """
+        Save FileTree as git file tree. File trees are always
+        saved in the current file tree format. Only directories
+        that differ from their persisted state are saved, i.e.
+        the directories on the paths to modified entries. Metadata
+        is saved in the interned format, see interntable.py.
+        """
         from dataladmetadatamodel.filetree import FileTree
 
         assert isinstance(obj, FileTree)
-        file_tree_hash = self._save_file_tree(obj)
-        if file_tree_hash != empty_tree_location:
-            add_tree_reference(GitReference.FILE_TREE, file_tree_hash)
-        return file_tree_hash
+        if not obj.is_loaded() and obj.location is not None:
+            return obj.location
+
+        # The intern table of the file tree contains the entries of
+        # the persisted state, and the entries of the metadata that
+        # is saved now. Unchanged metadata is neither loaded nor
+        # saved, and its entries are kept.
+        previous_table_location = obj.intern_table_location
+        previous_entry_locations = (
+            []
+            if previous_table_location is None
+            else [
+                object_hash
+                for _, object_hash, _
+                in self._read_tree_entries(previous_table_location)
+            ])
+        intern_table = InternTable(self.realm, previous_entry_locations)
+        dir_entries, is_changed = self._get_tree_entries(
+            obj,
+            partial(self._save_metadata, intern_table))
+
+        table_location = self._save_intern_table(
+            intern_table,
+            previous_entry_locations,
+            previous_table_location)
+        is_changed = is_changed or table_location != previous_table_location
+        obj.intern_table_location = table_location
+
+        if is_changed:
+            format_location = git_save_json(
+                self.realm,
+                {
+                    "@": dict(
+                        type="FileTree",
+                        version=FILE_TREE_VERSION)
+                })
+            root_entries = [
+                ("100644", "blob", format_location, FILE_TREE_FORMAT_NAME),
+                *(
+                    (flag, node_type, location, _escape_root_name(name))
+                    for flag, node_type, location, name in dir_entries
+                )
+            ]
+            if table_location is not None:
+                root_entries.append(
+                    ("040000", "tree", table_location, INTERN_TABLE_NAME))
+            obj.location = git_save_tree(self.realm, root_entries)
+            add_tree_reference(GitReference.FILE_TREE, obj.location)
+        return obj.location
@@ -0,0 +1,309 @@
+"""
+Git backends persist and retrieve git objects on behalf of
+the git mappers. The mappers use the functions of this module,
+which delegate to the selected backend:
+
+  - "subprocess": long-lived git processes read and write objects
+  - "objectstore": blobs and trees are written in-process as loose
+    objects, objects are read in-process from loose objects and
+    packfiles, references are updated by git processes
+
+Large numbers of objects should be saved within a pack_session(),
+which allows the backend to collect the objects in a packfile,
+instead of writing them as loose objects.
+
+The default backend can be set with the environment variable
+DATALAD_METADATA_MODEL_GIT_BACKEND.
+
+Objects that are loaded by their object hash are kept in an LRU
+cache, see cache.ObjectCache. Its size in bytes can be set with the
+environment variable DATALAD_METADATA_MODEL_OBJECT_CACHE_SIZE.
+
+Large blobs can be saved from a sequence of string chunks with
+git_save_str_chunks(). Content that exceeds MAX_IN_MEMORY_BLOB_SIZE
+is written into a temporary file while the chunks are generated and
+streamed from there into the backend, i.e. the complete content is
+never held in memory.
+
+Blobs that were saved before are not handed to the backend again,
+see writememo.WriteMemo. If the environment variable
+DATALAD_METADATA_MODEL_PERSIST_WRITE_MEMO is set to "1", the write
+memo of a realm is stored in its git directory by save_write_memo().
+"""
+import hashlib
+import os
+import tempfile
+from typing import (
+    Any, Callable, ContextManager, Dict, Iterable, List, Tuple, Union)
+
+from dataladmetadatamodel.jsoncodec import dumps, loads
+
+from . import objectstore, subprocess
+from .cache import ObjectCache, is_object_hash
+from .writememo import WriteMemo
+
+
+GIT_BACKENDS = {
+    "objectstore": objectstore,
+    "subprocess": subprocess
+}
+
+DEFAULT_GIT_BACKEND_NAME = os.environ.get(
+    "DATALAD_METADATA_MODEL_GIT_BACKEND",
+    "subprocess")
+
+
+DEFAULT_OBJECT_CACHE_SIZE = int(os.environ.get(
+    "DATALAD_METADATA_MODEL_OBJECT_CACHE_SIZE",
+    64 * 1024 * 1024))
+
+
+MAX_WRITE_MEMO_ENTRIES = 1024 * 1024
+
+# Number of characters up to which git_save_str_chunks() collects
+# chunks in memory, before it writes them into a temporary file.
+MAX_IN_MEMORY_BLOB_SIZE = 1024 * 1024
+
+PERSIST_WRITE_MEMOS = os.environ.get(
+    "DATALAD_METADATA_MODEL_PERSIST_WRITE_MEMO",
+    "0") == "1"
+
+
+git_backend = None
+object_cache = ObjectCache(DEFAULT_OBJECT_CACHE_SIZE)
+write_memos: Dict[str, WriteMemo] = dict()
+empty_blob_hashes: Dict[str, str] = dict()
+
+
+def set_git_backend(name: str):
+    global git_backend
+
+    backend = GIT_BACKENDS.get(name, None)
+    if backend is None:
+        raise ValueError(f"Unknown git backend: {name}")
+    git_backend = backend
+
+
+def get_git_backend_name() -> str:
+    return git_backend.__name__.split(".")[-1]
+
+
+set_git_backend(DEFAULT_GIT_BACKEND_NAME)
+
+
+def pack_session(repo_dir) -> ContextManager:
+    return git_backend.pack_session(repo_dir)
+
+
+def get_object_cache() -> ObjectCache:
+    return object_cache
+
+
+def get_write_memo(repo_dir) -> WriteMemo:
+    repo_dir = str(repo_dir)
+    write_memo = write_memos.get(repo_dir, None)
+    if write_memo is None:
+        write_memo = WriteMemo(repo_dir, MAX_WRITE_MEMO_ENTRIES)
+        if PERSIST_WRITE_MEMOS:
+            write_memo.load()
+        write_memos[repo_dir] = write_memo
+    return write_memo
+
+
+def save_write_memo(repo_dir):
+    """ Persist the write memo of the realm, if persistence is enabled """
+    write_memo = write_memos.get(str(repo_dir), None)
+    if PERSIST_WRITE_MEMOS and write_memo is not None:
+        write_memo.save()
+
+
+def get_empty_blob_hash(repo_dir) -> str:
+    """
+    Get the object hash of the empty blob in the object format
+    of repo_dir
+    """
+    repo_dir = str(repo_dir)
+    empty_blob_hash = empty_blob_hashes.get(repo_dir, None)
+    if empty_blob_hash is None:
+        empty_blob_hash = hashlib.new(
+            subprocess.get_object_format(repo_dir),
+            b"blob 0\0").hexdigest()
+        empty_blob_hashes[repo_dir] = empty_blob_hash
+    return empty_blob_hash
+
+
+def _as_str(content: Union[str, bytes]) -> str:
+    return content if isinstance(content, str) else content.decode()
+
+
+def _as_bytes(content: Union[str, bytes]) -> bytes:
+    return content if isinstance(content, bytes) else content.encode()
+
+
+def git_load_bytes(repo_dir, object_reference) -> bytes:
+    if not is_object_hash(object_reference):
+        return git_backend.git_load_bytes(repo_dir, object_reference)
+
+    entry = object_cache.get(repo_dir, object_reference)
+    if entry is not None:
+        return _as_bytes(entry.content)
+    content = git_backend.git_load_bytes(repo_dir, object_reference)
+    object_cache.put(repo_dir, object_reference, content)
+    return content
+
+
+def git_load_str(repo_dir, object_reference) -> str:
+    if not is_object_hash(object_reference):
+        return git_backend.git_load_str(repo_dir, object_reference)
+
+    entry = object_cache.get(repo_dir, object_reference)
+    if entry is not None:
+        return _as_str(entry.content)
+    content = git_backend.git_load_str(repo_dir, object_reference)
+    object_cache.put(repo_dir, object_reference, content)
+    return content
+
+
+def git_load_str_list(repo_dir, object_references: List[str]) -> List[str]:
+    result = []
+    missing_indices = []
+    for index, object_reference in enumerate(object_references):
+        entry = (
+            object_cache.get(repo_dir, object_reference)
+            if is_object_hash(object_reference)
+            else None)
+        if entry is None:
+            missing_indices.append(index)
+            result.append(None)
+        else:
+            result.append(_as_str(entry.content))
+
+    if missing_indices:
+        missing_contents = git_backend.git_load_str_list(
+            repo_dir,
+            [object_references[index] for index in missing_indices])
+        for index, content in zip(missing_indices, missing_contents):
+            result[index] = content
+            if is_object_hash(object_references[index]):
+                object_cache.put(repo_dir, object_references[index], content)
+    return result
+
+
+def git_load_decoded(repo_dir,
+                     object_reference,
+                     decode: Callable[[bytes], Any]
+                     ) -> Any:
+    """
+    Load an object and decode its content with decode. The decoded
+    object is cached with the content. The returned object might
+    therefore be shared with other callers and must not be modified.
+    All decode functions must yield equal results for the same content.
+    """
+    if not is_object_hash(object_reference):
+        return decode(git_backend.git_load_bytes(repo_dir, object_reference))
+
+    entry = object_cache.get(repo_dir, object_reference)
+    if entry is None:
+        content = git_backend.git_load_bytes(repo_dir, object_reference)
+        object_cache.put(repo_dir, object_reference, content)
+    elif entry.has_json_object:
+        return entry.json_object
+    else:
+        content = _as_bytes(entry.content)
+
+    decoded_object = decode(content)
+    object_cache.put_json_object(repo_dir, object_reference, decoded_object)
+    return decoded_object
+
+
+def git_load_json(repo_dir, object_reference) -> Union[Dict, List]:
+    """
+    Load a JSON object. The returned object might be shared
+    with other callers and must therefore not be modified.
+    """
+    return git_load_decoded(repo_dir, object_reference, loads)
+
+
+def git_ls_tree(repo_dir, object_reference) -> List[str]:
+    return git_backend.git_ls_tree(repo_dir, object_reference)
+
+
+def git_ls_tree_recursive(repo_dir, object_reference) -> List[str]:
+    return git_backend.git_ls_tree_recursive(repo_dir, object_reference)
+
+
+def _save_blob(repo_dir,
+               encoded_content: bytes,
+               save: Callable[[], str]
+               ) -> str:
+    write_memo = get_write_memo(repo_dir)
+    digest = write_memo.get_digest(encoded_content)
+    object_hash = write_memo.get(digest)
+    if object_hash is None:
+        object_hash = save()
+        write_memo.put(digest, object_hash)
+    return object_hash
+
+
+def git_save_bytes(repo_dir, content: bytes) -> str:
+    return _save_blob(
+        repo_dir,
+        content,
+        lambda: git_backend.git_save_bytes(repo_dir, content))
+
+
+def git_save_str(repo_dir, content: str) -> str:
+    # The content is encoded once, for the digest and for saving
+    return git_save_bytes(repo_dir, content.encode())
+
+
+def git_save_str_chunks(repo_dir, chunks: Iterable[str]) -> str:
+    """
+    Save the concatenation of chunks as blob. The result is
+    identical to git_save_str(repo_dir, "".join(chunks)).
+    """
+    chunk_iterator = iter(chunks)
+    buffered_chunks = []
+    buffered_size = 0
+    for chunk in chunk_iterator:
+        buffered_chunks.append(chunk)
+        buffered_size += len(chunk)
+        if buffered_size > MAX_IN_MEMORY_BLOB_SIZE:
+            break
+    else:
+        return git_save_str(repo_dir, "".join(buffered_chunks))
+
+    write_memo = get_write_memo(repo_dir)
+    digest_builder = write_memo.get_digest_builder()
+    with tempfile.TemporaryFile() as file:
+        size = 0
+        for chunk_source in (buffered_chunks, chunk_iterator):
+            for chunk in chunk_source:
+                encoded_chunk = chunk.encode()
+                digest_builder.update(encoded_chunk)
+                file.write(encoded_chunk)
+                size += len(encoded_chunk)
+            # Release the buffered chunks as soon as they are written
+            buffered_chunks.clear()
+
+        digest = digest_builder.digest()
+        object_hash = write_memo.get(digest)
+        if object_hash is None:
+            file.seek(0)
+            object_hash = git_backend.git_save_file(repo_dir, file, size)
+            write_memo.put(digest, object_hash)
+    return object_hash
+
+
+def git_save_json(repo_dir, json_object: Union[Dict, List]) -> str:
+    return git_save_str(repo_dir, dumps(json_object))
+
+
+def git_save_tree(repo_dir,
+                  entry_list: List[Tuple[str, str, str, str]]
+                  ) -> str:
+    return git_backend.git_save_tree(repo_dir, entry_list)
+
+
+def git_update_ref(repo_dir: str, ref_name: str, location: str) -> None:
+    git_backend.git_update_ref(repo_dir, ref_name, location)
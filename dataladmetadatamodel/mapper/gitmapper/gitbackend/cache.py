@@ -0,0 +1,101 @@
+"""
+A size-bounded LRU cache for the content of git objects.
+
+Git objects are immutable, the cache is therefore keyed by
+realm and object hash and never has to be invalidated. Entries
+hold the object content, as str or bytes, depending on how the
+object was loaded, and, optionally, the decoded object, e.g. the
+parsed JSON object. The size of an entry is accounted as the length
+of its content, the decoded object is accounted with the same size
+again.
+"""
+import string
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+# Length of sha1- and sha256-object hashes in hex digits
+OBJECT_HASH_LENGTHS = (40, 64)
+
+HEX_DIGITS = frozenset(string.hexdigits)
+
+
+def is_object_hash(name: str) -> bool:
+    """
+    Check whether name is a full object hash. Only those
+    are cached, because all other names, e.g. references,
+    might point to different objects over time.
+    """
+    return len(name) in OBJECT_HASH_LENGTHS and HEX_DIGITS.issuperset(name)
+
+
+class CacheEntry:
+    def __init__(self, content: Union[str, bytes]):
+        self.content = content
+        self.json_object = None
+        self.has_json_object = False
+
+    def get_size(self) -> int:
+        if self.has_json_object:
+            return 2 * len(self.content)
+        return len(self.content)
+
+
+class ObjectCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _get_key(repo_dir, object_hash: str) -> Tuple[str, str]:
+        return str(repo_dir), object_hash.lower()
+
+    def get(self, repo_dir, object_hash: str) -> Optional[CacheEntry]:
+        key = self._get_key(repo_dir, object_hash)
+        entry = self.entries.get(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, repo_dir, object_hash: str, content: Union[str, bytes]):
+        key = self._get_key(repo_dir, object_hash)
+        if key not in self.entries:
+            entry = CacheEntry(content)
+            self.entries[key] = entry
+            self.size += entry.get_size()
+            self._evict()
+
+    def put_json_object(self, repo_dir, object_hash: str, json_object: Any):
+        entry = self.entries.get(self._get_key(repo_dir, object_hash), None)
+        if entry is not None and not entry.has_json_object:
+            entry.json_object = json_object
+            entry.has_json_object = True
+            self.size += len(entry.content)
+            self._evict()
+
+    def _evict(self):
+        while self.size > self.max_size and self.entries:
+            _, entry = self.entries.popitem(last=False)
+            self.size -= entry.get_size()
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get_statistics(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "size": self.size,
+            "max_size": self.max_size
+        }
@@ -0,0 +1,374 @@
+"""
+An in-process git object store. Blobs and trees are hashed
+with hashlib and written as zlib-compressed loose objects into
+the object directory of the repository, without invoking the
+git binary. The created objects are byte-identical to objects
+that are created by `git hash-object -w` and `git mktree`.
+
+Objects are read in process from loose object files and from
+packfiles, see packfile.ObjectDatabase. Names that cannot be
+resolved in process, e.g. abbreviated object hashes, are handed
+to the subprocess backend. Updating references is performed by
+the subprocess backend.
+
+Within a pack_session(), blobs and trees are not written as loose
+objects, but collected in a single packfile, which is written into
+the object directory when the session ends.
+"""
+import hashlib
+import os
+import tempfile
+import zlib
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from dataladmetadatamodel.jsoncodec import dumps, loads
+
+from . import subprocess
+from .packfile import ObjectDatabase
+from .packwriter import COPY_BUFFER_SIZE, PackWriter
+from .subprocess import get_object_format
+
+
+# Git's default value for core.looseCompression
+LOOSE_COMPRESSION_LEVEL = 1
+
+TREE_MODE = "40000"
+GITLINK_MODE = "160000"
+
+
+def encode_tree(entry_list: List[Tuple[str, str, str, str]]) -> bytes:
+    """
+    Encode a list of (flag, node_type, object_hash, name)-tuples
+    in the binary git tree format. Entries are sorted like git
+    sorts them, i.e. trees are compared as if their names had a
+    trailing "/".
+    """
+    encoded_entries = []
+    for flag, node_type, object_hash, name in entry_list:
+        mode = flag.lstrip("0")
+        encoded_name = name.encode()
+        encoded_entries.append((
+            encoded_name + b"/" if mode == TREE_MODE else encoded_name,
+            mode.encode() + b" " + encoded_name + b"\0"
+            + bytes.fromhex(object_hash)))
+    return b"".join(entry for _, entry in sorted(encoded_entries))
+
+
+def _read_chunks(file: BinaryIO) -> Iterable[bytes]:
+    return iter(partial(file.read, COPY_BUFFER_SIZE), b"")
+
+
+class LooseObjectStore:
+    def __init__(self, repo_dir: str):
+        self.object_dir = Path(repo_dir) / ".git" / "objects"
+        self.hash_constructor = getattr(hashlib, get_object_format(repo_dir))
+
+    def hash_object(self, object_type: str, content: bytes) -> Tuple[str, bytes]:
+        data = f"{object_type} {len(content)}\0".encode() + content
+        return self.hash_constructor(data).hexdigest(), data
+
+    def hash_object_file(self,
+                         object_type: str,
+                         file: BinaryIO,
+                         size: int
+                         ) -> str:
+        """
+        Hash the size bytes that are read from file, and rewind
+        file to its start.
+        """
+        object_hash = self.hash_constructor(
+            f"{object_type} {size}\0".encode())
+        for chunk in _read_chunks(file):
+            object_hash.update(chunk)
+        file.seek(0)
+        return object_hash.hexdigest()
+
+    def write_object(self, object_type: str, content: bytes) -> str:
+        object_hash, data = self.hash_object(object_type, content)
+        self._store_object(
+            object_hash,
+            [zlib.compress(data, LOOSE_COMPRESSION_LEVEL)])
+        return object_hash
+
+    def write_object_file(self,
+                          object_type: str,
+                          file: BinaryIO,
+                          size: int
+                          ) -> str:
+        """
+        Write the size bytes that are read from file as loose object.
+        The content is hashed and compressed chunk by chunk.
+        """
+        object_hash = self.hash_object_file(object_type, file, size)
+
+        def compressed_chunks():
+            compressor = zlib.compressobj(LOOSE_COMPRESSION_LEVEL)
+            yield compressor.compress(f"{object_type} {size}\0".encode())
+            for chunk in _read_chunks(file):
+                yield compressor.compress(chunk)
+            yield compressor.flush()
+
+        self._store_object(object_hash, compressed_chunks())
+        return object_hash
+
+    def _store_object(self,
+                      object_hash: str,
+                      compressed_chunks: Iterable[bytes]):
+
+        object_path = self.object_dir / object_hash[:2] / object_hash[2:]
+        if object_path.exists():
+            return
+
+        object_path.parent.mkdir(exist_ok=True)
+        file_descriptor, temp_path = tempfile.mkstemp(
+            prefix="tmp_obj_",
+            dir=str(object_path.parent))
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                for chunk in compressed_chunks:
+                    temp_file.write(chunk)
+            os.chmod(temp_path, 0o444)
+            os.replace(temp_path, object_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+loose_object_stores: Dict[str, LooseObjectStore] = dict()
+
+
+def get_loose_object_store(repo_dir) -> LooseObjectStore:
+    repo_dir = str(repo_dir)
+    object_store = loose_object_stores.get(repo_dir, None)
+    if object_store is None:
+        object_store = LooseObjectStore(repo_dir)
+        loose_object_stores[repo_dir] = object_store
+    return object_store
+
+
+object_databases: Dict[str, ObjectDatabase] = dict()
+
+
+def get_object_database(repo_dir) -> ObjectDatabase:
+    repo_dir = str(repo_dir)
+    object_database = object_databases.get(repo_dir, None)
+    if object_database is None:
+        object_database = ObjectDatabase(repo_dir)
+        object_databases[repo_dir] = object_database
+    return object_database
+
+
+pack_writers: Dict[str, PackWriter] = dict()
+pack_session_depths: Dict[str, int] = dict()
+
+
+@contextmanager
+def pack_session(repo_dir):
+    """
+    Collect all objects that are written to the repository while
+    the session is active in a single packfile. Sessions can be
+    nested, the packfile is written when the outermost session ends.
+    """
+    repo_dir = str(repo_dir)
+    depth = pack_session_depths.get(repo_dir, 0)
+    pack_session_depths[repo_dir] = depth + 1
+    try:
+        yield
+    finally:
+        if depth == 0:
+            del pack_session_depths[repo_dir]
+            flush_pack_writer(repo_dir)
+        else:
+            pack_session_depths[repo_dir] = depth
+
+
+def _get_pack_writer(repo_dir: str) -> Optional[PackWriter]:
+    if repo_dir not in pack_session_depths:
+        return None
+    pack_writer = pack_writers.get(repo_dir, None)
+    if pack_writer is None:
+        object_database = get_object_database(repo_dir)
+        pack_writer = PackWriter(
+            object_database.object_dir,
+            get_object_format(repo_dir))
+        pack_writers[repo_dir] = pack_writer
+        object_database.pending_objects = pack_writer
+    return pack_writer
+
+
+def flush_pack_writer(repo_dir):
+    """
+    Write the objects that were collected in the current pack
+    session into a packfile, which makes them visible to git.
+    """
+    repo_dir = str(repo_dir)
+    pack_writer = pack_writers.pop(repo_dir, None)
+    if pack_writer is None:
+        return
+    object_database = get_object_database(repo_dir)
+    try:
+        pack_writer.finish()
+    finally:
+        object_database.pending_objects = None
+    object_database.scan_pack_files()
+
+
+def _write_object(repo_dir, object_type: str, content: bytes) -> str:
+    repo_dir = str(repo_dir)
+    pack_writer = _get_pack_writer(repo_dir)
+    if pack_writer is None:
+        return get_loose_object_store(repo_dir).write_object(
+            object_type,
+            content)
+
+    object_hash, _ = get_loose_object_store(repo_dir).hash_object(
+        object_type,
+        content)
+    if object_hash not in pack_writer \
+            and not get_object_database(repo_dir).has_object(object_hash):
+        pack_writer.add_object(object_hash, object_type, content)
+    return object_hash
+
+
+def _write_object_file(repo_dir,
+                       object_type: str,
+                       file: BinaryIO,
+                       size: int
+                       ) -> str:
+    repo_dir = str(repo_dir)
+    pack_writer = _get_pack_writer(repo_dir)
+    if pack_writer is None:
+        return get_loose_object_store(repo_dir).write_object_file(
+            object_type,
+            file,
+            size)
+
+    object_hash = get_loose_object_store(repo_dir).hash_object_file(
+        object_type,
+        file,
+        size)
+    if object_hash not in pack_writer \
+            and not get_object_database(repo_dir).has_object(object_hash):
+        pack_writer.add_object_chunks(
+            object_hash,
+            object_type,
+            size,
+            _read_chunks(file))
+    return object_hash
+
+
+def _load_bytes(repo_dir, object_reference: str) -> Optional[bytes]:
+    """
+    Read an object in process. Return None if the name cannot be
+    resolved in process, in this case the caller should let git
+    handle the name.
+    """
+    object_hash = get_object_database(repo_dir).resolve_reference(
+        object_reference)
+    if object_hash is None:
+        return None
+    result = get_object_database(repo_dir).read_object(object_hash)
+    if result is None:
+        raise RuntimeError(
+            f"Object not found in {repo_dir}: {object_reference}")
+    return result[1]
+
+
+def git_load_bytes(repo_dir, object_reference) -> bytes:
+    content = _load_bytes(repo_dir, object_reference)
+    if content is None:
+        flush_pack_writer(repo_dir)
+        return subprocess.git_load_bytes(repo_dir, object_reference)
+    return content
+
+
+def git_load_str(repo_dir, object_reference) -> str:
+    return git_load_bytes(repo_dir, object_reference).decode()
+
+
+def git_load_str_list(repo_dir, object_references: List[str]) -> List[str]:
+    return [
+        git_load_str(repo_dir, object_reference)
+        for object_reference in object_references
+    ]
+
+
+def git_load_json(repo_dir, object_reference) -> Union[Dict, List]:
+    return loads(git_load_str(repo_dir, object_reference))
+
+
+def _ls_tree_line(mode: str, object_hash: str, path: str) -> str:
+    if mode == TREE_MODE:
+        return f"0{mode} tree {object_hash}\t{path}"
+    node_type = "commit" if mode == GITLINK_MODE else "blob"
+    return f"{mode} {node_type} {object_hash}\t{path}"
+
+
+def git_ls_tree(repo_dir, object_reference) -> List[str]:
+    object_hash = get_object_database(repo_dir).resolve_reference(
+        object_reference)
+    if object_hash is None:
+        flush_pack_writer(repo_dir)
+        return subprocess.git_ls_tree(repo_dir, object_reference)
+    return [
+        _ls_tree_line(mode, entry_hash, name)
+        for mode, entry_hash, name in get_object_database(repo_dir).read_tree(
+            object_hash)
+    ]
+
+
+def git_ls_tree_recursive(repo_dir, object_reference) -> List[str]:
+    object_hash = get_object_database(repo_dir).resolve_reference(
+        object_reference)
+    if object_hash is None:
+        flush_pack_writer(repo_dir)
+        return subprocess.git_ls_tree_recursive(repo_dir, object_reference)
+
+    object_database = get_object_database(repo_dir)
+    result = []
+    stack = [("", object_database.read_tree(object_hash)[::-1])]
+    while stack:
+        prefix, entries = stack[-1]
+        if not entries:
+            stack.pop()
+            continue
+        mode, entry_hash, name = entries.pop()
+        if mode == TREE_MODE:
+            stack.append((
+                prefix + name + "/",
+                object_database.read_tree(entry_hash)[::-1]))
+        else:
+            result.append(_ls_tree_line(mode, entry_hash, prefix + name))
+    return result
+
+
+def git_save_bytes(repo_dir, content: bytes) -> str:
+    return _write_object(repo_dir, "blob", content)
+
+
+def git_save_str(repo_dir, content: str) -> str:
+    return git_save_bytes(repo_dir, content.encode())
+
+
+def git_save_file(repo_dir, file: BinaryIO, size: int) -> str:
+    return _write_object_file(repo_dir, "blob", file, size)
+
+
+def git_save_json(repo_dir, json_object: Union[Dict, List]) -> str:
+    return git_save_str(repo_dir, dumps(json_object))
+
+
+def git_save_tree(repo_dir,
+                  entry_list: List[Tuple[str, str, str, str]]
+                  ) -> str:
+
+    return _write_object(repo_dir, "tree", encode_tree(entry_list))
+
+
+def git_update_ref(repo_dir: str, ref_name: str, location: str) -> None:
+    # Ensure that the referenced object is visible to update-ref
+    flush_pack_writer(repo_dir)
+    subprocess.git_update_ref(repo_dir, ref_name, location)
@@ -0,0 +1,378 @@
+"""
+In-process, read-only access to the objects of a git repository.
+
+Objects are read from memory mapped packfiles or from loose
+object files. Objects in packfiles are located by a binary
+search in the memory mapped pack index (.idx, version 2).
+Deltified objects, i.e. OFS_DELTA and REF_DELTA objects, are
+reconstructed in process.
+"""
+import hashlib
+import mmap
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .subprocess import get_object_format
+
+
+OBJECT_TYPE_NAMES = {
+    1: "commit",
+    2: "tree",
+    3: "blob",
+    4: "tag"
+}
+
+OFS_DELTA = 6
+REF_DELTA = 7
+
+PACK_INDEX_SIGNATURE = b"\xfftOc"
+PACK_SIGNATURE = b"PACK"
+
+# Initial amount of compressed data that is fed into the
+# decompressor, relative to the uncompressed size.
+INFLATE_CHUNK_OVERHEAD = 64
+
+
+def _read_size(data: bytes, position: int) -> Tuple[int, int]:
+    """ Read a little-endian base-128 size from delta data """
+    size = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        size |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return size, position
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    _, position = _read_size(delta, 0)
+    target_size, position = _read_size(delta, position)
+
+    result = bytearray()
+    while position < len(delta):
+        opcode = delta[position]
+        position += 1
+        if opcode & 0x80:
+            # Copy a range from the base object
+            offset = size = 0
+            for bit in range(4):
+                if opcode & (1 << bit):
+                    offset |= delta[position] << (8 * bit)
+                    position += 1
+            for bit in range(3):
+                if opcode & (0x10 << bit):
+                    size |= delta[position] << (8 * bit)
+                    position += 1
+            result += base[offset:offset + (size or 0x10000)]
+        elif opcode:
+            # Insert data from the delta
+            result += delta[position:position + opcode]
+            position += opcode
+        else:
+            raise ValueError("Invalid delta opcode: 0")
+
+    if len(result) != target_size:
+        raise ValueError(
+            f"Delta result has wrong size: {len(result)}, "
+            f"expected: {target_size}")
+    return bytes(result)
+
+
+def parse_tree(content: bytes,
+               hash_size: int
+               ) -> List[Tuple[str, str, str]]:
+    """ Return (mode, object hash, name)-tuples of a binary tree object """
+    entries = []
+    position = 0
+    while position < len(content):
+        space_position = content.index(b" ", position)
+        name_end = content.index(b"\0", space_position)
+        hash_end = name_end + 1 + hash_size
+        entries.append((
+            content[position:space_position].decode(),
+            content[name_end + 1:hash_end].hex(),
+            content[space_position + 1:name_end].decode()))
+        position = hash_end
+    return entries
+
+
+def _map_file(path: Path) -> mmap.mmap:
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class PackIndex:
+    """ A memory mapped version 2 pack index """
+    def __init__(self, path: Path, hash_size: int):
+        self.data = _map_file(path)
+        if self.data[:4] != PACK_INDEX_SIGNATURE \
+                or struct.unpack_from(">I", self.data, 4)[0] != 2:
+            raise ValueError(f"Unsupported pack index format: {path}")
+
+        self.hash_size = hash_size
+        self.fanout = struct.unpack_from(">256I", self.data, 8)
+        object_count = self.fanout[255]
+        self.hash_table_start = 8 + 256 * 4
+        self.offset_table_start = (
+            self.hash_table_start
+            + object_count * hash_size
+            + object_count * 4)
+        self.large_offset_table_start = (
+            self.offset_table_start
+            + object_count * 4)
+
+    def get_offset(self, object_hash: bytes) -> Optional[int]:
+        first_byte = object_hash[0]
+        low = self.fanout[first_byte - 1] if first_byte else 0
+        high = self.fanout[first_byte]
+        while low < high:
+            middle = (low + high) // 2
+            start = self.hash_table_start + middle * self.hash_size
+            current_hash = self.data[start:start + self.hash_size]
+            if current_hash < object_hash:
+                low = middle + 1
+            elif current_hash > object_hash:
+                high = middle
+            else:
+                return self._get_offset(middle)
+        return None
+
+    def _get_offset(self, index: int) -> int:
+        offset = struct.unpack_from(
+            ">I",
+            self.data,
+            self.offset_table_start + index * 4)[0]
+        if offset & 0x80000000:
+            offset = struct.unpack_from(
+                ">Q",
+                self.data,
+                self.large_offset_table_start + (offset & 0x7fffffff) * 8)[0]
+        return offset
+
+    def close(self):
+        self.data.close()
+
+
+class PackFile:
+    """ A memory mapped packfile and its index """
+    def __init__(self, index_path: Path, hash_size: int):
+        self.index = PackIndex(index_path, hash_size)
+        self.data = _map_file(index_path.with_suffix(".pack"))
+        if self.data[:4] != PACK_SIGNATURE:
+            raise ValueError(f"Not a packfile: {index_path}")
+        self.hash_size = hash_size
+
+    def _read_header(self, offset: int) -> Tuple[int, int, int]:
+        byte = self.data[offset]
+        offset += 1
+        type_number = (byte >> 4) & 0x07
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = self.data[offset]
+            offset += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+        return type_number, size, offset
+
+    def _inflate(self, offset: int, size: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        chunks = []
+        chunk_size = size + INFLATE_CHUNK_OVERHEAD
+        while not decompressor.eof:
+            chunk = self.data[offset:offset + chunk_size]
+            if not chunk:
+                raise ValueError(f"Truncated object data at offset {offset}")
+            chunks.append(decompressor.decompress(chunk))
+            offset += chunk_size
+        content = b"".join(chunks)
+        if len(content) != size:
+            raise ValueError(
+                f"Inflated object has wrong size: {len(content)}, "
+                f"expected: {size}")
+        return content
+
+    def _get_base_offset(self, offset: int) -> Tuple[int, int]:
+        byte = self.data[offset]
+        offset += 1
+        base_distance = byte & 0x7f
+        while byte & 0x80:
+            byte = self.data[offset]
+            offset += 1
+            base_distance = ((base_distance + 1) << 7) | (byte & 0x7f)
+        return base_distance, offset
+
+    def read_object_at(self,
+                       offset: int,
+                       object_database: "ObjectDatabase"
+                       ) -> Tuple[str, bytes]:
+
+        deltas = []
+        while True:
+            type_number, size, data_offset = self._read_header(offset)
+            if type_number == OFS_DELTA:
+                base_distance, data_offset = self._get_base_offset(data_offset)
+                deltas.append(self._inflate(data_offset, size))
+                offset -= base_distance
+            elif type_number == REF_DELTA:
+                base_hash = self.data[data_offset:data_offset + self.hash_size]
+                deltas.append(
+                    self._inflate(data_offset + self.hash_size, size))
+                base_object = object_database.read_object(base_hash.hex())
+                if base_object is None:
+                    raise ValueError(
+                        f"Delta base object not found: {base_hash.hex()}")
+                object_type, content = base_object
+                break
+            else:
+                object_type = OBJECT_TYPE_NAMES[type_number]
+                content = self._inflate(data_offset, size)
+                break
+
+        for delta in reversed(deltas):
+            content = apply_delta(content, delta)
+        return object_type, content
+
+    def read_object(self,
+                    object_hash: bytes,
+                    object_database: "ObjectDatabase"
+                    ) -> Optional[Tuple[str, bytes]]:
+
+        offset = self.index.get_offset(object_hash)
+        if offset is None:
+            return None
+        return self.read_object_at(offset, object_database)
+
+    def close(self):
+        self.index.close()
+        self.data.close()
+
+
+class ObjectDatabase:
+    """
+    Read objects and references of a single repository in process.
+    """
+    def __init__(self, repo_dir: str):
+        self.git_dir = Path(repo_dir) / ".git"
+        self.object_dir = self.git_dir / "objects"
+        self.hash_size = hashlib.new(get_object_format(repo_dir)).digest_size
+        self.pack_files: Dict[str, PackFile] = dict()
+        # Objects that are not yet written to the repository, e.g.
+        # the objects of an unfinished packwriter.PackWriter
+        self.pending_objects = None
+        self.scan_pack_files()
+
+    def scan_pack_files(self) -> bool:
+        """ Open new packfiles, return True if new packfiles were found """
+        found_new = False
+        for index_path in sorted((self.object_dir / "pack").glob("*.idx")):
+            if index_path.name not in self.pack_files:
+                self.pack_files[index_path.name] = PackFile(
+                    index_path,
+                    self.hash_size)
+                found_new = True
+        return found_new
+
+    def _read_packed_object(self,
+                            object_hash: bytes
+                            ) -> Optional[Tuple[str, bytes]]:
+        for pack_file in self.pack_files.values():
+            result = pack_file.read_object(object_hash, self)
+            if result is not None:
+                return result
+        return None
+
+    def _read_loose_object(self,
+                           object_hash: str
+                           ) -> Optional[Tuple[str, bytes]]:
+        try:
+            with open(self.object_dir / object_hash[:2] / object_hash[2:],
+                      "rb") as file:
+                data = zlib.decompress(file.read())
+        except FileNotFoundError:
+            return None
+        header_end = data.index(b"\0")
+        object_type, _ = data[:header_end].decode().split()
+        return object_type, data[header_end + 1:]
+
+    def is_object_hash(self, name: str) -> bool:
+        if len(name) != 2 * self.hash_size:
+            return False
+        try:
+            bytes.fromhex(name)
+            return True
+        except ValueError:
+            return False
+
+    def has_object(self, object_hash: str) -> bool:
+        """ Check whether the object is stored in the repository """
+        binary_hash = bytes.fromhex(object_hash)
+        return (
+            any(
+                pack_file.index.get_offset(binary_hash) is not None
+                for pack_file in self.pack_files.values())
+            or (self.object_dir / object_hash[:2] / object_hash[2:]).exists())
+
+    def read_object(self, object_hash: str) -> Optional[Tuple[str, bytes]]:
+        if self.pending_objects is not None:
+            result = self.pending_objects.read_object(object_hash)
+            if result is not None:
+                return result
+        binary_hash = bytes.fromhex(object_hash)
+        result = (
+            self._read_packed_object(binary_hash)
+            or self._read_loose_object(object_hash))
+        if result is None and self.scan_pack_files():
+            result = self._read_packed_object(binary_hash)
+        return result
+
+    def _read_packed_reference(self, name: str) -> Optional[str]:
+        try:
+            with open(self.git_dir / "packed-refs", "rt") as file:
+                for line in file:
+                    if line.startswith(("#", "^")):
+                        continue
+                    object_hash, reference_name = line.split()
+                    if reference_name == name:
+                        return object_hash
+        except FileNotFoundError:
+            pass
+        return None
+
+    def resolve_reference(self, name: str) -> Optional[str]:
+        """
+        Resolve object hashes, and fully qualified reference names.
+        Return None for all other names.
+        """
+        if self.is_object_hash(name):
+            return name.lower()
+        if name != "HEAD" and not name.startswith("refs/"):
+            return None
+        try:
+            with open(self.git_dir / name, "rt") as file:
+                content = file.read().strip()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return self._read_packed_reference(name)
+        if content.startswith("ref: "):
+            return self.resolve_reference(content[5:])
+        return content
+
+    def read_tree(self, object_hash: str) -> List[Tuple[str, str, str]]:
+        """ Read a tree or the tree of a commit """
+        result = self.read_object(object_hash)
+        if result is None:
+            raise RuntimeError(f"Object not found: {object_hash}")
+        object_type, content = result
+        if object_type == "commit":
+            return self.read_tree(content[5:5 + 2 * self.hash_size].decode())
+        if object_type != "tree":
+            raise RuntimeError(f"Not a tree object: {object_hash}")
+        return parse_tree(content, self.hash_size)
+
+    def close(self):
+        for pack_file in self.pack_files.values():
+            pack_file.close()
+        self.pack_files.clear()
@@ -0,0 +1,203 @@
+"""
+Write git objects directly into a packfile and create the
+matching version 2 pack index (.idx).
+
+Objects are compressed and appended to a temporary file while
+they are added. When the pack writer is finished, the pack
+header, the collected object data, and the pack checksum are
+written into a new packfile in the object directory, followed
+by the pack index. Objects are not stored as deltas.
+"""
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+OBJECT_TYPE_NUMBERS = {
+    "commit": 1,
+    "tree": 2,
+    "blob": 3,
+    "tag": 4
+}
+
+PACK_HEADER_SIZE = 12
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _encode_object_header(type_number: int, size: int) -> bytes:
+    header = bytearray()
+    byte = (type_number << 4) | (size & 0x0f)
+    size >>= 4
+    while size:
+        header.append(byte | 0x80)
+        byte = size & 0x7f
+        size >>= 7
+    header.append(byte)
+    return bytes(header)
+
+
+class PackedObjectInfo(NamedTuple):
+    object_type: str
+    offset: int
+    length: int
+    crc32: int
+
+
+class PackWriter:
+    def __init__(self, object_dir: Path, hash_name: str):
+        self.pack_dir = object_dir / "pack"
+        self.hash_name = hash_name
+        self.objects: Dict[str, PackedObjectInfo] = dict()
+        self.body_file = tempfile.TemporaryFile()
+        self.body_size = 0
+
+    def __contains__(self, object_hash: str) -> bool:
+        return object_hash in self.objects
+
+    def add_object(self, object_hash: str, object_type: str, content: bytes):
+        self.add_object_chunks(object_hash, object_type, len(content), [content])
+
+    def add_object_chunks(self,
+                          object_hash: str,
+                          object_type: str,
+                          size: int,
+                          chunks: Iterable[bytes]):
+        """
+        Add an object of the given size, whose content is the
+        concatenation of chunks. The chunks are compressed and
+        written one by one.
+        """
+        if object_hash in self.objects:
+            return
+        compressor = zlib.compressobj()
+        data = _encode_object_header(OBJECT_TYPE_NUMBERS[object_type], size)
+        length, crc32 = len(data), zlib.crc32(data)
+        try:
+            self.body_file.write(data)
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                self.body_file.write(data)
+                length, crc32 = length + len(data), zlib.crc32(data, crc32)
+            data = compressor.flush()
+            self.body_file.write(data)
+            length, crc32 = length + len(data), zlib.crc32(data, crc32)
+        except BaseException:
+            # Remove the partially written object
+            self.body_file.seek(self.body_size)
+            self.body_file.truncate()
+            raise
+        self.objects[object_hash] = PackedObjectInfo(
+            object_type,
+            PACK_HEADER_SIZE + self.body_size,
+            length,
+            crc32)
+        self.body_size += length
+
+    def read_object(self, object_hash: str) -> Optional[Tuple[str, bytes]]:
+        object_info = self.objects.get(object_hash, None)
+        if object_info is None:
+            return None
+        self.body_file.seek(object_info.offset - PACK_HEADER_SIZE)
+        data = self.body_file.read(object_info.length)
+        self.body_file.seek(0, os.SEEK_END)
+        header_end = 0
+        while data[header_end] & 0x80:
+            header_end += 1
+        return object_info.object_type, zlib.decompress(data[header_end + 1:])
+
+    def _write_pack(self, pack_file) -> bytes:
+        pack_hash = hashlib.new(self.hash_name)
+        header = b"PACK" + struct.pack(">II", 2, len(self.objects))
+        pack_file.write(header)
+        pack_hash.update(header)
+        self.body_file.seek(0)
+        while True:
+            chunk = self.body_file.read(COPY_BUFFER_SIZE)
+            if not chunk:
+                break
+            pack_file.write(chunk)
+            pack_hash.update(chunk)
+        pack_checksum = pack_hash.digest()
+        pack_file.write(pack_checksum)
+        return pack_checksum
+
+    def _write_index(self, index_file, pack_checksum: bytes):
+        sorted_hashes = sorted(self.objects.keys())
+        binary_hashes = [bytes.fromhex(h) for h in sorted_hashes]
+
+        fanout = [0] * 256
+        for binary_hash in binary_hashes:
+            fanout[binary_hash[0]] += 1
+        for index in range(1, 256):
+            fanout[index] += fanout[index - 1]
+
+        offsets = []
+        large_offsets = []
+        for object_hash in sorted_hashes:
+            offset = self.objects[object_hash].offset
+            if offset < 0x80000000:
+                offsets.append(offset)
+            else:
+                offsets.append(0x80000000 | len(large_offsets))
+                large_offsets.append(offset)
+
+        index_data = b"".join([
+            b"\xfftOc",
+            struct.pack(">I", 2),
+            struct.pack(">256I", *fanout),
+            *binary_hashes,
+            *[
+                struct.pack(">I", self.objects[object_hash].crc32)
+                for object_hash in sorted_hashes
+            ],
+            struct.pack(f">{len(offsets)}I", *offsets),
+            struct.pack(f">{len(large_offsets)}Q", *large_offsets),
+            pack_checksum])
+        index_file.write(index_data)
+        index_file.write(hashlib.new(self.hash_name, index_data).digest())
+
+    def _write_file(self, suffix: str, writer, *args) -> Tuple[str, Any]:
+        file_descriptor, temp_path = tempfile.mkstemp(
+            prefix="tmp_pack_",
+            suffix=suffix,
+            dir=str(self.pack_dir))
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                result = writer(file, *args)
+            os.chmod(temp_path, 0o444)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return temp_path, result
+
+    def finish(self) -> Optional[str]:
+        """
+        Write the packfile and its index into the object directory.
+        Return the name of the pack, or None, if no objects were added.
+        The index is moved into place after the packfile, because git
+        considers a pack to be available as soon as its index exists.
+        """
+        try:
+            if not self.objects:
+                return None
+
+            self.pack_dir.mkdir(parents=True, exist_ok=True)
+            pack_path, pack_checksum = self._write_file(
+                ".pack",
+                self._write_pack)
+            index_path, _ = self._write_file(
+                ".idx",
+                self._write_index,
+                pack_checksum)
+
+            pack_name = "pack-" + pack_checksum.hex()
+            os.replace(pack_path, str(self.pack_dir / (pack_name + ".pack")))
+            os.replace(index_path, str(self.pack_dir / (pack_name + ".idx")))
+            return pack_name
+        finally:
+            self.objects.clear()
+            self.body_file.close()
@@ -1,7 +1,19 @@
-import json
+import atexit
 import shlex
+import shutil
 import subprocess
-from typing import Any, Dict, List, Optional, Tuple, Union
+import threading
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from dataladmetadatamodel.jsoncodec import dumps, loads
+
+
+# Upper bound for the number of request bytes that are written to
+# a cat-file process before its responses are read. This keeps the
+# pending requests well below the pipe buffer size and prevents a
+# dead-lock between the request writer and the git process.
+MAX_PIPELINED_REQUEST_BYTES = 16384
 
 
 def execute_with_output(arguments: Union[str, List[str]],
@@ -63,52 +75,320 @@ def git_command_line(repo_dir: str,
            ] + arguments
 
 
+def get_object_format(repo_dir: str) -> str:
+    try:
+        return checked_execute(
+            git_command_line(
+                repo_dir,
+                "rev-parse",
+                ["--show-object-format"]))[0][0]
+    except RuntimeError:
+        return "sha1"
+
+
 def git_text_result(cmd_line):
     result = checked_execute(cmd_line)[0]
     return "\n".join(result)
 
 
+class GitObjectReader:
+    """
+    A long-lived `git cat-file --batch` process that reads
+    objects from a single repository. Object requests are
+    pipelined, i.e. a number of requests is written to the
+    process before the responses are read.
+    """
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            git_command_line(repo_dir, "cat-file", ["--batch"]),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE)
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_response(self) -> Optional[bytes]:
+        header = self.process.stdout.readline()
+        if not header:
+            raise RuntimeError(
+                f"git cat-file process for {self.repo_dir} terminated "
+                f"unexpectedly (exit code: {self.process.poll()})")
+        header_elements = header.split()
+        if header_elements[-1] in (b"missing", b"ambiguous"):
+            return None
+        content = self.process.stdout.read(int(header_elements[2]) + 1)
+        return content[:-1]
+
+    def read_objects(self, object_references: List[str]) -> List[bytes]:
+        missing_references = []
+        result = []
+        with self.lock:
+            start = 0
+            while start < len(object_references):
+                end, request_bytes = start, 0
+                while (end < len(object_references)
+                       and request_bytes < MAX_PIPELINED_REQUEST_BYTES):
+                    request_bytes += len(object_references[end]) + 1
+                    end += 1
+                self.process.stdin.write(
+                    "".join(
+                        object_reference + "\n"
+                        for object_reference in object_references[start:end]
+                    ).encode())
+                self.process.stdin.flush()
+                for object_reference in object_references[start:end]:
+                    content = self._read_response()
+                    if content is None:
+                        missing_references.append(object_reference)
+                    result.append(content)
+                start = end
+
+        if missing_references:
+            raise RuntimeError(
+                f"Object(s) not found in {self.repo_dir}: "
+                f"{', '.join(missing_references)}")
+        return result
+
+    def read_object(self, object_reference: str) -> bytes:
+        return self.read_objects([object_reference])[0]
+
+    def close(self):
+        if self.is_alive():
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+git_object_readers: Dict[str, GitObjectReader] = dict()
+
+
+def get_object_reader(repo_dir) -> GitObjectReader:
+    repo_dir = str(repo_dir)
+    reader = git_object_readers.get(repo_dir, None)
+    if reader is None or not reader.is_alive():
+        reader = GitObjectReader(repo_dir)
+        git_object_readers[repo_dir] = reader
+    return reader
+
+
+@atexit.register
+def close_object_readers():
+    for reader in git_object_readers.values():
+        reader.close()
+    git_object_readers.clear()
+
+
+class GitObjectWriter:
+    """
+    Long-lived git processes that write objects into a single
+    repository. Blobs are streamed into a `git fast-import`
+    process, trees are created by a `git mktree --batch` process.
+
+    Blobs that are written by fast-import become visible to other
+    git processes only after a checkpoint. Therefore sync() has to
+    be called before written blobs are read, or before references
+    to them are updated.
+    """
+
+    # All blobs use the same mark, we are only interested
+    # in the object hash of the most recently written blob.
+    blob_mark = ":1"
+
+    def __init__(self, repo_dir: str):
+        self.repo_dir = repo_dir
+        self.lock = threading.Lock()
+        self.has_pending_blobs = False
+        self.fast_import_process = subprocess.Popen(
+            git_command_line(repo_dir, "fast-import", ["--quiet"]),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE)
+        self.mktree_process = subprocess.Popen(
+            git_command_line(repo_dir, "mktree", ["--missing", "--batch"]),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE)
+
+    def is_alive(self) -> bool:
+        return (
+            self.fast_import_process.poll() is None
+            and self.mktree_process.poll() is None)
+
+    @staticmethod
+    def _read_object_hash(process: subprocess.Popen, command: str) -> str:
+        object_hash = process.stdout.readline().decode().strip()
+        if not object_hash:
+            raise RuntimeError(
+                f"git {command} process terminated unexpectedly "
+                f"(exit code: {process.poll()})")
+        return object_hash
+
+    def _get_blob_mark(self) -> str:
+        self.fast_import_process.stdin.write(
+            f"get-mark {self.blob_mark}\n".encode())
+        self.fast_import_process.stdin.flush()
+        return self._read_object_hash(self.fast_import_process, "fast-import")
+
+    def write_blob(self, content: bytes) -> str:
+        with self.lock:
+            self.fast_import_process.stdin.write(
+                f"blob\nmark {self.blob_mark}\ndata {len(content)}\n".encode())
+            self.fast_import_process.stdin.write(content)
+            self.fast_import_process.stdin.write(b"\n")
+            self.has_pending_blobs = True
+            return self._get_blob_mark()
+
+    def write_blob_file(self, file: BinaryIO, size: int) -> str:
+        """ Write the size bytes that are read from file as blob """
+        with self.lock:
+            self.fast_import_process.stdin.write(
+                f"blob\nmark {self.blob_mark}\ndata {size}\n".encode())
+            shutil.copyfileobj(file, self.fast_import_process.stdin)
+            self.fast_import_process.stdin.write(b"\n")
+            self.has_pending_blobs = True
+            return self._get_blob_mark()
+
+    def write_tree(self, tree_spec: str) -> str:
+        with self.lock:
+            self.mktree_process.stdin.write((tree_spec + "\n").encode())
+            self.mktree_process.stdin.flush()
+            return self._read_object_hash(self.mktree_process, "mktree")
+
+    def sync(self):
+        """
+        Make all written blobs visible to other git processes.
+        Fast-import processes commands sequentially, i.e. it has
+        finished the checkpoint when it answers the get-mark command.
+        """
+        with self.lock:
+            if self.has_pending_blobs:
+                self.fast_import_process.stdin.write(b"checkpoint\n")
+                self._get_blob_mark()
+                self.has_pending_blobs = False
+
+    def close(self):
+        for process in (self.fast_import_process, self.mktree_process):
+            if process.poll() is None:
+                process.stdin.close()
+                process.wait()
+            process.stdout.close()
+        self.has_pending_blobs = False
+
+
+git_object_writers: Dict[str, GitObjectWriter] = dict()
+
+
+def get_object_writer(repo_dir) -> GitObjectWriter:
+    repo_dir = str(repo_dir)
+    writer = git_object_writers.get(repo_dir, None)
+    if writer is None or not writer.is_alive():
+        writer = GitObjectWriter(repo_dir)
+        git_object_writers[repo_dir] = writer
+    return writer
+
+
+def sync_object_writer(repo_dir):
+    writer = git_object_writers.get(str(repo_dir), None)
+    if writer is not None:
+        writer.sync()
+
+
+@atexit.register
+def close_object_writers():
+    for writer in git_object_writers.values():
+        writer.close()
+    git_object_writers.clear()
+
+
+@contextmanager
+def pack_session(repo_dir):
+    """
+    Fast-import already stores the written blobs in a packfile,
+    make them visible to other git processes, when the session ends.
+    """
+    try:
+        yield
+    finally:
+        sync_object_writer(repo_dir)
+
+
+def git_load_bytes(repo_dir, object_reference) -> bytes:
+    sync_object_writer(repo_dir)
+    return get_object_reader(repo_dir).read_object(object_reference)
+
+
 def git_load_str(repo_dir, object_reference) -> str:
-    cmd_line = git_command_line(repo_dir, "show", [object_reference])
-    return git_text_result(cmd_line)
+    return git_load_bytes(repo_dir, object_reference).decode()
+
+
+def git_load_str_list(repo_dir, object_references: List[str]) -> List[str]:
+    sync_object_writer(repo_dir)
+    return [
+        content.decode()
+        for content in get_object_reader(repo_dir).read_objects(
+            object_references)
+    ]
 
 
 def git_load_json(repo_dir, object_reference) -> Union[Dict, List]:
-    return json.loads(git_load_str(repo_dir, object_reference))
+    return loads(git_load_str(repo_dir, object_reference))
+
+
+def _git_ls_tree_lines(cmd_line: List[str]) -> List[str]:
+    # Use NUL-terminated output, which contains unquoted path names
+    result = execute(cmd_line)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Command failed (exit code: {result.returncode}) "
+            f"{' '.join(cmd_line)}:\n"
+            f"STDERR:\n"
+            f"{result.stderr.decode()}")
+    return result.stdout.decode().split("\0")[:-1]
 
 
 def git_ls_tree(repo_dir, object_reference) -> List[str]:
-    cmd_line = git_command_line(repo_dir, "ls-tree", [object_reference])
-    return checked_execute(cmd_line)[0]
+    cmd_line = git_command_line(repo_dir, "ls-tree", ["-z", object_reference])
+    return _git_ls_tree_lines(cmd_line)
 
 
 def git_ls_tree_recursive(repo_dir, object_reference) -> List[str]:
-    cmd_line = git_command_line(repo_dir, "ls-tree", ["-r", object_reference])
-    return checked_execute(cmd_line)[0]
+    cmd_line = git_command_line(
+        repo_dir,
+        "ls-tree",
+        ["-z", "-r", object_reference])
+    return _git_ls_tree_lines(cmd_line)
+
+
+def git_save_bytes(repo_dir, content: bytes) -> str:
+    return get_object_writer(repo_dir).write_blob(content)
 
 
 def git_save_str(repo_dir, content: str) -> str:
-    cmd_line = git_command_line(repo_dir, "hash-object", ["-w", "--stdin"])
-    return checked_execute(cmd_line, stdin_content=content)[0][0]
+    return git_save_bytes(repo_dir, content.encode())
+
+
+def git_save_file(repo_dir, file: BinaryIO, size: int) -> str:
+    return get_object_writer(repo_dir).write_blob_file(file, size)
 
 
 def git_save_json(repo_dir, json_object: Union[Dict, List]) -> str:
-    return git_save_str(repo_dir, json.dumps(json_object))
+    return git_save_str(repo_dir, dumps(json_object))
 
 
 def git_save_tree(repo_dir,
                   entry_list: List[Tuple[str, str, str, str]]
                   ) -> str:
 
-    tree_spec = "\n".join([
-        f"{flag} {node_type} {object_hash}\t{name}"
+    tree_spec = "".join([
+        f"{flag} {node_type} {object_hash}\t{name}\n"
         for flag, node_type, object_hash, name in entry_list
-    ]) + "\n"
-    cmd_line = git_command_line(repo_dir, "mktree", ["--missing", ])
-    return checked_execute(cmd_line, stdin_content=tree_spec)[0][0]
+    ])
+    return get_object_writer(repo_dir).write_tree(tree_spec)
 
 
 def git_update_ref(repo_dir: str, ref_name: str, location: str) -> None:
+    # Ensure that the referenced object is visible to update-ref
+    sync_object_writer(repo_dir)
     cmd_line = git_command_line(
         repo_dir,
         "update-ref",
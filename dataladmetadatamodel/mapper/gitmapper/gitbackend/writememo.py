@@ -0,0 +1,120 @@
+"""
+A memo of the blobs that were written into a realm.
+
+The memo maps a digest of the blob content to the object hash
+of the blob. Content that is found in the memo does not have to
+be handed to the git backend again.
+
+The memo of a realm can be persisted in the git directory of
+the realm. Because git might remove objects, e.g. unreferenced
+objects during `git gc` or `git prune`, the objects of a persisted
+memo are looked up when the memo is loaded. Entries of objects that
+no longer exist are discarded.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from dataladmetadatamodel.jsoncodec import dumps, loads
+
+from .subprocess import execute, git_command_line
+
+
+WRITE_MEMO_FILE_NAME = "datalad-metadata-model-write-memo"
+WRITE_MEMO_VERSION = 2
+
+DIGEST_SIZE = 16
+
+
+def _get_existing_objects(repo_dir: str,
+                          object_hashes: Iterable[str]
+                          ) -> Set[str]:
+    """
+    Return the object hashes, whose objects exist in the
+    repository. All objects are looked up by a single
+    `git cat-file --batch-check` process.
+    """
+    result = execute(
+        git_command_line(repo_dir, "cat-file", ["--batch-check"]),
+        "".join(object_hash + "\n" for object_hash in object_hashes))
+    if result.returncode != 0:
+        return set()
+    return set(
+        line.split()[0]
+        for line in result.stdout.decode().splitlines()
+        if not line.endswith(" missing"))
+
+
+class WriteMemo:
+    def __init__(self, repo_dir: str, max_entries: int):
+        self.repo_dir = repo_dir
+        self.max_entries = max_entries
+        self.entries: Dict[bytes, str] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_digest(content: bytes) -> bytes:
+        return hashlib.blake2b(content, digest_size=DIGEST_SIZE).digest()
+
+    @staticmethod
+    def get_digest_builder():
+        """ Return a hash object that calculates a digest incrementally """
+        return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+    def get(self, digest: bytes) -> Optional[str]:
+        object_hash = self.entries.get(digest, None)
+        if object_hash is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return object_hash
+
+    def put(self, digest: bytes, object_hash: str):
+        if len(self.entries) >= self.max_entries:
+            # Remove the oldest entry
+            del self.entries[next(iter(self.entries))]
+        self.entries[digest] = object_hash
+
+    def get_path(self) -> Path:
+        return Path(self.repo_dir) / ".git" / WRITE_MEMO_FILE_NAME
+
+    def load(self):
+        try:
+            with self.get_path().open("rt") as file:
+                json_object = loads(file.read())
+        except (FileNotFoundError, ValueError):
+            return
+        if json_object.get("version", None) != WRITE_MEMO_VERSION:
+            return
+        entries = json_object["entries"]
+        existing_objects = _get_existing_objects(
+            self.repo_dir,
+            entries.values())
+        for digest, object_hash in entries.items():
+            if object_hash in existing_objects:
+                self.entries.setdefault(bytes.fromhex(digest), object_hash)
+
+    def save(self):
+        json_object = {
+            "version": WRITE_MEMO_VERSION,
+            "entries": {
+                digest.hex(): object_hash
+                for digest, object_hash in self.entries.items()
+            }
+        }
+        path = self.get_path()
+        file_descriptor, temp_path = tempfile.mkstemp(
+            prefix="tmp_write_memo_",
+            dir=str(path.parent))
+        try:
+            with os.fdopen(file_descriptor, "wt") as file:
+                # The memo is not a git object, it does not have to
+                # be encoded canonically.
+                file.write(dumps(json_object, canonical=False))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
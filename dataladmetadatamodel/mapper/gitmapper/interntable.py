@@ -0,0 +1,167 @@
+"""
+Intern tables store the extractor configurations and the provenance,
+i.e. author name and author email, of the metadata of a file tree once,
+instead of once per metadata instance.
+
+Every configuration and every provenance is saved as a blob of its
+own, an intern table entry. Metadata that is saved with a file tree is
+saved in the interned format, in which instances refer to entries by
+the location of their blob:
+
+  - Metadata: version INTERNED_METADATA_VERSION
+  - MetadataInstanceSet: "parameter_set" is a list of configuration
+    locations
+  - MetadataInstance: "configuration" is a configuration location,
+    "provenance" is a provenance location that replaces "author" and
+    "author_email"
+
+Entry locations are content-addressed, i.e. the interned form of a
+metadata object depends only on the metadata object itself. Equal
+metadata is saved in equal blobs, independent of the file tree that
+contains it, and interned metadata can be resolved without the table.
+
+The table, i.e. the locations of all entries of a file tree, is saved
+as an entry of the root tree of the file tree, which keeps the entries
+alive as long as the file tree is alive, see filetreemapper.py. An
+incremental save keeps the entries of the previous table, because the
+entries of unchanged metadata are not known without loading it. That
+means, entries of removed metadata remain in the table, until the file
+tree is saved completely, e.g. as a copy.
+
+Interned metadata is converted back to the plain format when it is
+mapped, i.e. the Metadata class only handles the plain format.
+"""
+from typing import Dict, Iterable, Set
+
+from .codec import load_json_object, save_json_object
+from ... import JSONObject, check_serialized_version, version_string
+from ...jsoncodec import dumps
+
+
+INTERNED_METADATA_VERSION = "2.1"
+
+
+class InternTable:
+    def __init__(self,
+                 realm: str,
+                 entry_locations: Iterable[str] = ()):
+        self.realm = realm
+        self.entry_locations: Set[str] = set(entry_locations)
+        # Map the encoding of entries to their location. The encoding
+        # is only used within the process, it need not be canonical.
+        self.interned_locations: Dict[str, str] = dict()
+
+    def _intern(self, entry: JSONObject) -> str:
+        key = dumps(entry, canonical=False)
+        location = self.interned_locations.get(key, None)
+        if location is None:
+            location = save_json_object(self.realm, entry)
+            self.interned_locations[key] = location
+            self.entry_locations.add(location)
+        return location
+
+    def _intern_instance(self, json_obj: JSONObject) -> JSONObject:
+        # Entries that are not interned, e.g. the content, or the
+        # location of separately stored content, are copied.
+        interned = dict()
+        for key, value in json_obj.items():
+            if key == "author":
+                interned["provenance"] = self._intern(
+                    [value, json_obj["author_email"]])
+            elif key == "configuration":
+                interned[key] = self._intern(value)
+            elif key != "author_email":
+                interned[key] = value
+        return interned
+
+    def _intern_instance_set(self, json_obj: JSONObject) -> JSONObject:
+        return {
+            "@": json_obj["@"],
+            "parameter_set": [
+                self._intern(configuration)
+                for configuration in json_obj["parameter_set"]
+            ],
+            "instance_set": {
+                instance_key: self._intern_instance(instance)
+                for instance_key, instance in json_obj["instance_set"].items()
+            }
+        }
+
+    def intern_metadata(self, json_obj: JSONObject) -> JSONObject:
+        """
+        Save the configurations and provenances of the metadata
+        JSON object as entries of the table, if they are not
+        saved yet, and return its interned form.
+        """
+        assert json_obj["@"]["type"] == "Metadata"
+        check_serialized_version(json_obj)
+        return {
+            "@": dict(
+                type="Metadata",
+                version=INTERNED_METADATA_VERSION
+            ),
+            "mapper_family": json_obj["mapper_family"],
+            "realm": json_obj["realm"],
+            "instance_sets": {
+                format_name: self._intern_instance_set(instance_set)
+                for format_name, instance_set
+                in json_obj["instance_sets"].items()
+            }
+        }
+
+
+def _resolve_instance(realm: str, json_obj: JSONObject) -> JSONObject:
+    resolved = dict()
+    for key, value in json_obj.items():
+        if key == "provenance":
+            resolved["author"], resolved["author_email"] = \
+                load_json_object(realm, value)
+        elif key == "configuration":
+            resolved[key] = load_json_object(realm, value)
+        else:
+            resolved[key] = value
+    return resolved
+
+
+def _resolve_instance_set(realm: str, json_obj: JSONObject) -> JSONObject:
+    return {
+        "@": json_obj["@"],
+        "parameter_set": [
+            load_json_object(realm, location)
+            for location in json_obj["parameter_set"]
+        ],
+        "instance_set": {
+            instance_key: _resolve_instance(realm, instance)
+            for instance_key, instance in json_obj["instance_set"].items()
+        }
+    }
+
+
+def resolve_metadata(realm: str, json_obj: JSONObject) -> JSONObject:
+    """
+    Return the plain form of a metadata JSON object. Interned
+    metadata is resolved with the entries it refers to, plain
+    metadata is returned unchanged.
+
+    The configurations of resolved metadata are shared with the
+    cached entries. That is safe, because configurations are
+    immutable, they are used as keys of configuration indices.
+    """
+    stored_version = check_serialized_version(
+        json_obj,
+        (version_string, INTERNED_METADATA_VERSION))
+    if stored_version == version_string:
+        return json_obj
+
+    return {
+        "@": dict(
+            type="Metadata",
+            version=version_string
+        ),
+        "mapper_family": json_obj["mapper_family"],
+        "realm": json_obj["realm"],
+        "instance_sets": {
+            format_name: _resolve_instance_set(realm, instance_set)
+            for format_name, instance_set in json_obj["instance_sets"].items()
+        }
+    }
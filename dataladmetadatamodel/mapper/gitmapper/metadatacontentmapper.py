@@ -0,0 +1,97 @@
+from itertools import chain
+from typing import Optional
+
+from .codec import JSONCodec, decode, get_codec
+from .objectreference import GitReference, add_blob_reference
+from .gitbackend import git_load_bytes, git_save_bytes, git_save_str_chunks
+from ..basemapper import BaseMapper
+from ..reference import Reference
+from ... import JSONObject
+from ...jsoncodec import iter_dumps
+
+
+# Metadata content, whose encoding is larger than this number of
+# bytes, is stored in its own blob. Smaller content is stored inline,
+# in the blob of the metadata object.
+MAX_INLINE_CONTENT_SIZE = 64 * 1024
+
+# Depth up to which the JSON-encoding of content is streamed item by
+# item, instead of being held in memory as a whole.
+CONTENT_ENCODING_DEPTH = 3
+
+
+def _save_content(realm: str,
+                  content: JSONObject,
+                  min_size: int = 0
+                  ) -> Optional[str]:
+    """
+    Save content, if its encoding is larger than min_size bytes, and
+    return its location. Return None, if the encoding is not larger.
+
+    Content is encoded only once. The size of the JSON-encoding is
+    measured while it is streamed, only the first min_size bytes of
+    the encoding are buffered.
+    """
+    codec = get_codec()
+    if isinstance(codec, JSONCodec):
+        chunks = iter_dumps(content, CONTENT_ENCODING_DEPTH)
+        buffered_chunks = []
+        size = 0
+        for chunk in chunks:
+            buffered_chunks.append(chunk)
+            # The encoding is ASCII, i.e. characters are bytes
+            size += len(chunk)
+            if size > min_size:
+                break
+        else:
+            return None
+        location = git_save_str_chunks(realm, chain(buffered_chunks, chunks))
+    else:
+        encoded_content = codec.encode(content)
+        if len(encoded_content) <= min_size:
+            return None
+        location = git_save_bytes(realm, encoded_content)
+    add_blob_reference(GitReference.METADATA, location)
+    return location
+
+
+class MetadataContentGitMapper(BaseMapper):
+    """
+    Map the separately stored content of metadata instances. The
+    content is loaded when a metadata instance's content is first
+    accessed.
+    """
+
+    def map(self, ref: Reference) -> JSONObject:
+        # Content is decoded for every mapping, because the caller
+        # owns, and might modify, the returned object.
+        return decode(git_load_bytes(self.realm, ref.location))
+
+    def unmap(self, obj: JSONObject) -> str:
+        return _save_content(self.realm, obj)
+
+
+def store_large_contents(realm: str, metadata: "Metadata"):
+    """
+    Store large content of decoded metadata instances separately.
+    Instances that were not decoded are stored as they were read.
+
+    Content that was not loaded cannot have been modified, it remains
+    at its location. Loaded content might have been modified in place,
+    it is therefore saved again. If it is unchanged, the write memo
+    yields its location without writing it.
+    """
+    for instance_set in metadata.instance_sets.values():
+        if not instance_set.are_instances_decoded():
+            continue
+        for instance in instance_set.instances.values():
+            if not instance.is_content_loaded():
+                continue
+            location = _save_content(
+                realm,
+                instance.metadata_content,
+                MAX_INLINE_CONTENT_SIZE)
+            instance.content_reference = (
+                None
+                if location is None
+                else Reference("git", realm, "MetadataContent", location))
@@ -1,22 +1,57 @@
+from typing import Optional
 
+from .codec import JSONCodec, decode, get_codec
 from .objectreference import GitReference, add_blob_reference
-from .gitbackend.subprocess import git_load_str, git_save_str
+from .gitbackend import git_load_bytes, git_save_bytes, git_save_str_chunks
+from .interntable import InternTable, resolve_metadata
+from .metadatacontentmapper import store_large_contents
 from ..basemapper import BaseMapper
 from ..reference import Reference
 
 
 class MetadataGitMapper(BaseMapper):
+    """
+    Map Metadata. If an intern table is given, e.g. by the file tree
+    mapper, metadata is saved in the interned format, see
+    interntable.py.
+    """
+    def __init__(self,
+                 realm: Optional[str] = None,
+                 intern_table: Optional[InternTable] = None):
+        super().__init__(realm)
+        self.intern_table = intern_table
 
     def map(self, ref: Reference) -> "Metadata":
         from dataladmetadatamodel.metadata import Metadata
-        return Metadata.from_json(
-            git_load_str(self.realm, ref.location)
-        )
+
+        # Metadata is decoded for every mapping, instead of sharing a
+        # decoded object via load_json_object(), because metadata
+        # objects keep, and might modify, parts of the decoded object.
+        content = git_load_bytes(self.realm, ref.location)
+        metadata = Metadata.from_json_obj(
+            resolve_metadata(self.realm, decode(content)))
+        metadata.serialized_size = len(content)
+        return metadata
 
     def unmap(self, obj) -> str:
         from dataladmetadatamodel.metadata import Metadata
         assert isinstance(obj, Metadata)
 
-        metadata_object_hash = git_save_str(self.realm, obj.to_json())
+        store_large_contents(self.realm, obj)
+        json_obj = (
+            None
+            if self.intern_table is None
+            else self.intern_table.intern_metadata(obj.to_json_obj()))
+        codec = get_codec()
+        if isinstance(codec, JSONCodec):
+            metadata_object_hash = git_save_str_chunks(
+                self.realm,
+                obj.iter_json(json_obj))
+        else:
+            if json_obj is None:
+                json_obj = obj.to_json_obj()
+            content = codec.encode(json_obj)
+            obj.serialized_size = len(content)
+            metadata_object_hash = git_save_bytes(self.realm, content)
         add_blob_reference(GitReference.METADATA, metadata_object_hash)
         return metadata_object_hash
@@ -1,7 +1,7 @@
 from typing import Any
 from uuid import UUID
 
-from .gitbackend.subprocess import git_load_json, git_save_json
+from .codec import load_json_object, save_json_object
 from ..basemapper import BaseMapper
 from ..reference import Reference
 
@@ -22,7 +22,7 @@ class MetadataRootRecordGitMapper(BaseMapper):
         assert isinstance(ref, Reference)
         assert ref.mapper_family == Strings.GIT
 
-        json_object = git_load_json(self.realm, ref.location)
+        json_object = load_json_object(self.realm, ref.location)
         return MetadataRootRecord(
             Strings.GIT,
             self.realm,
@@ -45,4 +45,4 @@ class MetadataRootRecordGitMapper(BaseMapper):
             Strings.FILE_TREE:
                 obj.file_tree.save_object().to_json_obj()
         }
-        return git_save_json(self.realm, json_object)
+        return save_json_object(self.realm, json_object)
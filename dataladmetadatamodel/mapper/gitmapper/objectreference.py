@@ -3,7 +3,11 @@ from pathlib import Path
 from typing import Dict, List, Tuple
 
 from .utils import lock_backend, unlock_backend
-from .gitbackend.subprocess import git_ls_tree, git_update_ref, git_save_tree
+from .gitbackend import (
+    git_ls_tree,
+    git_save_tree,
+    git_update_ref,
+    save_write_memo)
 
 
 class GitReference(enum.Enum):
@@ -52,6 +56,7 @@ def flush_object_references(realm: Path):
         unlock_backend(realm)
 
     CACHED_OBJECT_REFERENCES = dict()
+    save_write_memo(realm)
 
 
 def add_tree_reference(git_reference: GitReference, object_hash: str):
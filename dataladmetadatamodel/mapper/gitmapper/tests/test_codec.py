@@ -0,0 +1,175 @@
+import json
+import subprocess
+import tempfile
+import unittest
+
+from dataladmetadatamodel.connector import Connector
+from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
+from dataladmetadatamodel.metadatapath import MetadataPath
+from dataladmetadatamodel.tests.utils import (
+    assert_dataset_trees_equal,
+    create_dataset_tree)
+from dataladmetadatamodel.versionlist import TreeVersionList
+
+from ..codec import (
+    COMPACT_MAGIC,
+    CODECS,
+    decode,
+    get_codec,
+    load_json_object,
+    save_json_object,
+    set_codec)
+from ..gitbackend import git_load_bytes, git_load_json, git_save_json
+
+
+json_objects = [
+    None,
+    True,
+    "",
+    "äöü",
+    0,
+    63,
+    64,
+    -1,
+    2 ** 70,
+    -(2 ** 70),
+    1.5,
+    [],
+    {},
+    {
+        "@": {"type": "Metadata", "version": "2.0"},
+        "list": [None, False, True, 1.0e-300, ["nested"]],
+        "strings": [f"string {i % 150}" for i in range(300)],
+        "dict": {f"key {i}": i for i in range(200)}
+    }
+]
+
+
+class TestCompactCodec(unittest.TestCase):
+
+    codec = CODECS["compact"]
+
+    def test_round_trip(self):
+        for json_object in json_objects:
+            content = self.codec.encode(json_object)
+            self.assertTrue(content.startswith(COMPACT_MAGIC))
+            self.assertEqual(self.codec.decode(content), json_object)
+            self.assertEqual(decode(content), json_object)
+
+    def test_keys_are_converted_like_json(self):
+        json_object = {1: "a", 1.5: "b", True: "c", None: "d"}
+        self.assertEqual(
+            self.codec.decode(self.codec.encode(json_object)),
+            json.loads(json.dumps(json_object)))
+
+    def test_strings_are_stored_once(self):
+        json_object = [
+            {"author": "Some Author", "email": "author@example.com"}
+        ] * 100
+        content = self.codec.encode(json_object)
+        self.assertEqual(content.count(b"Some Author"), 1)
+        self.assertLess(len(content), len(json.dumps(json_object)) / 5)
+
+    def test_unsupported_objects(self):
+        self.assertRaises(TypeError, self.codec.encode, {"a": object()})
+
+    def test_unsupported_version(self):
+        content = self.codec.encode({"a": 1})
+        version_start = len(COMPACT_MAGIC) + 1
+        content = (
+            content[:version_start]
+            + b"9.9"
+            + content[version_start + 3:])
+        self.assertRaisesRegex(
+            ValueError,
+            r"Unsupported compact format version \(9\.9\)",
+            decode,
+            content)
+
+    def test_malformed_content(self):
+        content = self.codec.encode({"a": [1, 2, 3]})
+        self.assertRaises(ValueError, decode, content[:-1])
+        self.assertRaises(ValueError, decode, content + b"\0")
+
+
+class TestCodecSelection(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.previous_codec = get_codec()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+
+    def tearDown(self) -> None:
+        set_codec(self.previous_codec.name)
+        self.temp_dir.cleanup()
+
+    def test_unknown_codec(self):
+        self.assertRaises(ValueError, set_codec, "unknown")
+
+    def test_json_codec_is_compatible(self):
+        set_codec("json")
+        json_object = {"a": [1, "b"]}
+        location = save_json_object(self.realm, json_object)
+        self.assertEqual(location, git_save_json(self.realm, json_object))
+        self.assertEqual(git_load_json(self.realm, location), json_object)
+
+    def test_mixed_codecs(self):
+        json_location = git_save_json(self.realm, {"a": 1})
+        set_codec("compact")
+        compact_location = save_json_object(self.realm, {"b": 2})
+        self.assertTrue(
+            git_load_bytes(self.realm, compact_location).startswith(
+                COMPACT_MAGIC))
+        self.assertEqual(
+            load_json_object(self.realm, json_location),
+            {"a": 1})
+        self.assertEqual(
+            load_json_object(self.realm, compact_location),
+            {"b": 2})
+
+    def test_compact_metadata(self):
+        set_codec("compact")
+        metadata = Metadata("git", self.realm)
+        metadata.add_extractor_run(
+            1.0,
+            "test-extractor",
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {"a": 1}),
+            {"info": "\u00e4\u00f6\u00fc"})
+        reference = Connector.from_object(metadata).save_object()
+        self.assertTrue(
+            git_load_bytes(self.realm, reference.location).startswith(
+                COMPACT_MAGIC))
+
+        set_codec("json")
+        self.assertEqual(
+            Connector.from_reference(reference).load_object(),
+            metadata)
+
+    def test_compact_model(self):
+        set_codec("compact")
+        dataset_tree = create_dataset_tree(
+            "git",
+            self.realm,
+            [MetadataPath(""), MetadataPath("d1")],
+            [MetadataPath("a/b"), MetadataPath("c")])
+        tree_version_list = TreeVersionList("git", self.realm)
+        tree_version_list.set_dataset_tree("v1", "0", dataset_tree)
+        reference = tree_version_list.save()
+
+        # Objects written with the compact codec are read with
+        # any selected codec.
+        set_codec("json")
+        tree_version_list = Connector.from_reference(reference).load_object()
+        _, loaded_dataset_tree = tree_version_list.get_dataset_tree("v1")
+        assert_dataset_trees_equal(
+            self,
+            loaded_dataset_tree,
+            dataset_tree,
+            True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,496 @@
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ..gitbackend import (
+    get_git_backend_name,
+    get_object_cache,
+    git_load_json,
+    git_load_str,
+    git_load_str_list,
+    git_ls_tree,
+    git_ls_tree_recursive,
+    git_save_json,
+    git_save_str,
+    git_save_str_chunks,
+    git_save_tree,
+    git_update_ref,
+    pack_session,
+    save_write_memo,
+    set_git_backend)
+from ..gitbackend import subprocess as subprocess_backend
+from ..gitbackend.cache import ObjectCache, is_object_hash
+from ..gitbackend.objectstore import get_object_database
+from ..gitbackend.writememo import WriteMemo
+from ..gitbackend.subprocess import (
+    checked_execute,
+    get_object_reader,
+    get_object_writer,
+    git_command_line)
+
+
+class GitBackendTestBase(unittest.TestCase):
+
+    backend_name = "subprocess"
+
+    def setUp(self) -> None:
+        self.previous_backend_name = get_git_backend_name()
+        set_git_backend(self.backend_name)
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+
+    def tearDown(self) -> None:
+        get_object_reader(self.realm).close()
+        get_object_writer(self.realm).close()
+        self.temp_dir.cleanup()
+        set_git_backend(self.previous_backend_name)
+
+    def git(self, command, arguments, stdin_content=None):
+        return checked_execute(
+            git_command_line(self.realm, command, arguments),
+            stdin_content)[0]
+
+
+class TestObjectReader(GitBackendTestBase):
+
+    def test_load_saved_objects(self):
+        location = git_save_str(self.realm, "some content\n")
+        self.assertEqual(git_load_str(self.realm, location), "some content\n")
+
+        json_object = {"a": [1, 2, {"b": "c"}]}
+        location = git_save_json(self.realm, json_object)
+        self.assertEqual(git_load_json(self.realm, location), json_object)
+
+    def test_reader_is_reused(self):
+        reader = get_object_reader(self.realm)
+        git_load_str(self.realm, git_save_str(self.realm, "x"))
+        self.assertIs(get_object_reader(self.realm), reader)
+
+    def test_pipelined_loading(self):
+        # Request more objects than fit into a single pipelined chunk
+        contents = [f"content {i}" for i in range(20)]
+        locations = [git_save_str(self.realm, c) for c in contents] * 100
+        self.assertEqual(
+            git_load_str_list(self.realm, locations),
+            contents * 100)
+
+    def test_updated_reference(self):
+        ref_name = "refs/datalad/test"
+        for content in ("first", "second"):
+            git_update_ref(
+                self.realm,
+                ref_name,
+                git_save_str(self.realm, content))
+            self.assertEqual(git_load_str(self.realm, ref_name), content)
+
+    def test_missing_object(self):
+        location = git_save_str(self.realm, "existing")
+        self.assertRaises(
+            RuntimeError,
+            git_load_str_list,
+            self.realm,
+            [location, "0" * 40, location])
+
+        # Ensure that the reader is still in sync
+        self.assertEqual(git_load_str(self.realm, location), "existing")
+        self.assertRaises(
+            RuntimeError,
+            git_load_str,
+            self.realm,
+            "refs/datalad/does-not-exist")
+
+
+class TestObjectWriter(GitBackendTestBase):
+
+    def test_blob_hashes(self):
+        for content in ("", "a", "a\n", "\u00e4\u00f6\u00fc" * 1000):
+            self.assertEqual(
+                git_save_str(self.realm, content),
+                self.git("hash-object", ["--stdin"], content)[0])
+
+    def test_chunked_blob_hashes(self):
+        chunks = ["a", "\u00e4\u00f6\u00fc" * 1000, "", "b\n"]
+        for max_size in (10, 100000):
+            with mock.patch(
+                    "dataladmetadatamodel.mapper.gitmapper.gitbackend"
+                    ".MAX_IN_MEMORY_BLOB_SIZE",
+                    max_size):
+                for index in range(len(chunks)):
+                    location = git_save_str_chunks(self.realm, chunks[index:])
+                    self.assertEqual(
+                        location,
+                        self.git(
+                            "hash-object",
+                            ["--stdin"],
+                            "".join(chunks[index:]))[0])
+                    self.assertEqual(
+                        git_load_str(self.realm, location),
+                        "".join(chunks[index:]))
+
+    def test_tree_hashes(self):
+        blob_location = git_save_str(self.realm, "blob content")
+        entries = [
+            ("100644", "blob", blob_location, "file name"),
+            ("100644", "blob", blob_location, "object_reference:1"),
+            ("100644", "blob", blob_location, "a.b"),
+            ("100644", "blob", blob_location, "a-b"),
+            ("100644", "blob", blob_location, "a0")]
+        sub_tree_location = git_save_tree(self.realm, entries)
+        entries.append(("040000", "tree", sub_tree_location, "a"))
+        tree_location = git_save_tree(self.realm, entries)
+
+        tree_spec = "".join(
+            f"{flag} {node_type} {location}\t{name}\n"
+            for flag, node_type, location, name in entries)
+        self.assertEqual(
+            tree_location,
+            self.git("mktree", ["--missing"], tree_spec)[0])
+
+        git_update_ref(self.realm, "refs/datalad/test", tree_location)
+        self.assertEqual(
+            sorted(git_ls_tree(self.realm, "refs/datalad/test")),
+            sorted(tree_spec.splitlines()))
+
+    def test_empty_tree(self):
+        self.assertEqual(
+            git_save_tree(self.realm, []),
+            self.git("mktree", [], "")[0])
+
+    def test_blobs_visible_after_reference_update(self):
+        location = git_save_str(self.realm, "content")
+        git_update_ref(self.realm, "refs/datalad/test", location)
+        self.assertEqual(
+            self.git("cat-file", ["blob", "refs/datalad/test"]),
+            ["content"])
+
+    def test_repository_consistency(self):
+        blob_location = git_save_json(self.realm, {"a": "b"})
+        tree_location = git_save_tree(
+            self.realm,
+            [("100644", "blob", blob_location, "b")])
+        tree_location = git_save_tree(
+            self.realm,
+            [("040000", "tree", tree_location, "a")])
+        git_update_ref(self.realm, "refs/datalad/test", tree_location)
+        self.git("fsck", ["--strict", "--no-dangling"])
+
+
+class TestObjectStoreReader(TestObjectReader):
+    backend_name = "objectstore"
+
+
+class TestObjectStoreWriter(TestObjectWriter):
+    backend_name = "objectstore"
+
+
+class TestPackedObjects(GitBackendTestBase):
+
+    backend_name = "objectstore"
+
+    def create_packed_objects(self, use_offset_deltas: bool):
+        # Create similar blobs, that will be stored as deltas
+        base_content = "".join(f"line {i}\n" for i in range(1000))
+        self.contents = [
+            base_content + f"modification {i}\n" * i
+            for i in range(20)]
+        self.locations = [
+            git_save_str(self.realm, content)
+            for content in self.contents]
+
+        sub_tree_location = git_save_tree(
+            self.realm,
+            [
+                ("100644", "blob", location, f"file {index}")
+                for index, location in enumerate(self.locations[:10])
+            ])
+        tree_location = git_save_tree(
+            self.realm,
+            [
+                ("040000", "tree", sub_tree_location, "dir \u00e4"),
+                *[
+                    ("100644", "blob", location, f"file {index}")
+                    for index, location in enumerate(self.locations[10:])
+                ]
+            ])
+        git_update_ref(self.realm, "refs/datalad/test", tree_location)
+
+        self.git(
+            "config",
+            ["repack.useDeltaBaseOffset", str(use_offset_deltas).lower()])
+        self.git("repack", ["-a", "-d", "-f", "-q"])
+        self.git("pack-refs", ["--all"])
+
+    def assert_packed_objects_readable(self):
+        object_database = get_object_database(self.realm)
+        object_database.scan_pack_files()
+        self.assertTrue(object_database.pack_files)
+        self.assertIn("count: 0", self.git("count-objects", ["-v"]))
+
+        for location, content in zip(self.locations, self.contents):
+            self.assertEqual(git_load_str(self.realm, location), content)
+
+        for ls_tree in ("git_ls_tree", "git_ls_tree_recursive"):
+            self.assertEqual(
+                globals()[ls_tree](self.realm, "refs/datalad/test"),
+                getattr(subprocess_backend, ls_tree)(
+                    self.realm,
+                    "refs/datalad/test"))
+
+    def test_offset_deltas(self):
+        self.create_packed_objects(True)
+        self.assert_packed_objects_readable()
+
+    def test_reference_deltas(self):
+        self.create_packed_objects(False)
+        self.assert_packed_objects_readable()
+
+    def test_unresolvable_names(self):
+        self.create_packed_objects(True)
+        self.assertEqual(
+            git_load_str(self.realm, self.locations[3][:12]),
+            self.contents[3])
+        self.assertRaises(
+            RuntimeError,
+            git_load_str,
+            self.realm,
+            "refs/datalad/does-not-exist")
+        self.assertRaises(
+            RuntimeError,
+            git_load_str,
+            self.realm,
+            "0" * 40)
+
+
+class TestPackSession(GitBackendTestBase):
+
+    backend_name = "objectstore"
+
+    def get_pack_names(self):
+        return sorted(
+            path.name
+            for path in (Path(self.realm) / ".git/objects/pack").glob("*.pack"))
+
+    def save_objects(self, count: int):
+        locations = [
+            git_save_str(self.realm, f"content {i}")
+            for i in range(count)]
+        return locations, git_save_tree(
+            self.realm,
+            [
+                ("100644", "blob", location, f"file {index}")
+                for index, location in enumerate(locations)
+            ])
+
+    def test_objects_are_packed(self):
+        with pack_session(self.realm):
+            with pack_session(self.realm):
+                locations, tree_location = self.save_objects(300)
+            self.assertEqual(self.get_pack_names(), [])
+            # Pending objects are readable within the session
+            self.assertEqual(git_load_str(self.realm, locations[7]), "content 7")
+            self.assertEqual(len(git_ls_tree(self.realm, tree_location)), 300)
+
+        pack_names = self.get_pack_names()
+        self.assertEqual(len(pack_names), 1)
+        self.assertIn("count: 0", self.git("count-objects", ["-v"]))
+        self.git(
+            "verify-pack",
+            [str(Path(self.realm) / ".git/objects/pack" / pack_names[0])])
+
+        git_update_ref(self.realm, "refs/datalad/test", tree_location)
+        self.git("fsck", ["--strict", "--no-dangling"])
+        self.assertEqual(
+            self.git("cat-file", ["blob", locations[299]]),
+            ["content 299"])
+        self.assertEqual(
+            git_ls_tree(self.realm, "refs/datalad/test"),
+            subprocess_backend.git_ls_tree(self.realm, "refs/datalad/test"))
+
+    def test_existing_objects_are_not_packed(self):
+        existing_location = git_save_str(self.realm, "content 1")
+        with pack_session(self.realm):
+            locations, _ = self.save_objects(3)
+        self.assertEqual(locations[1], existing_location)
+        self.assertEqual(
+            len(self.git("show-index", [], (
+                Path(self.realm) / ".git/objects/pack"
+                / self.get_pack_names()[0]).with_suffix(".idx").read_bytes())),
+            3)
+
+    def test_reference_update_writes_pack(self):
+        with pack_session(self.realm):
+            location = git_save_str(self.realm, "content")
+            git_update_ref(self.realm, "refs/datalad/test", location)
+            self.assertEqual(len(self.get_pack_names()), 1)
+            self.assertEqual(
+                self.git("cat-file", ["blob", "refs/datalad/test"]),
+                ["content"])
+            git_save_str(self.realm, "other content")
+        self.assertEqual(len(self.get_pack_names()), 2)
+
+    def test_chunked_objects_are_packed(self):
+        content = "".join(f"line {i}\n" for i in range(1000))
+        with mock.patch(
+                "dataladmetadatamodel.mapper.gitmapper.gitbackend"
+                ".MAX_IN_MEMORY_BLOB_SIZE",
+                100):
+            with pack_session(self.realm):
+                location = git_save_str_chunks(
+                    self.realm,
+                    content.splitlines(keepends=True))
+                self.assertEqual(git_load_str(self.realm, location), content)
+
+        git_update_ref(self.realm, "refs/datalad/test", location)
+        self.assertEqual(len(self.get_pack_names()), 1)
+        self.assertEqual(
+            self.git("cat-file", ["blob", "refs/datalad/test"]),
+            content.splitlines())
+        self.git("fsck", ["--strict", "--no-dangling"])
+
+    def test_empty_session(self):
+        with pack_session(self.realm):
+            pass
+        self.assertEqual(self.get_pack_names(), [])
+
+
+class TestObjectCache(GitBackendTestBase):
+
+    def test_object_hash_detection(self):
+        self.assertTrue(is_object_hash("a" * 40))
+        self.assertTrue(is_object_hash("0123456789ABCDEF" * 4))
+        self.assertFalse(is_object_hash("a" * 39))
+        self.assertFalse(is_object_hash("g" * 40))
+        self.assertFalse(is_object_hash("refs/datalad/test"))
+
+    def test_eviction(self):
+        object_cache = ObjectCache(10)
+        object_cache.put("r", "1" * 40, "aaaa")
+        object_cache.put("r", "2" * 40, "bbbb")
+        self.assertEqual(object_cache.get("r", "1" * 40).content, "aaaa")
+
+        # Least recently used entry "2" is evicted
+        object_cache.put("r", "3" * 40, "cccc")
+        self.assertIsNone(object_cache.get("r", "2" * 40))
+        self.assertIsNotNone(object_cache.get("r", "3" * 40))
+
+        # The parsed JSON object is accounted as well
+        object_cache.put_json_object("r", "3" * 40, "c")
+        self.assertIsNone(object_cache.get("r", "1" * 40))
+        self.assertEqual(object_cache.get("r", "3" * 40).json_object, "c")
+
+        self.assertEqual(
+            object_cache.get_statistics(),
+            {
+                "hits": 3,
+                "misses": 2,
+                "evictions": 2,
+                "entries": 1,
+                "size": 8,
+                "max_size": 10
+            })
+
+    def test_cached_loading(self):
+        object_cache = get_object_cache()
+        location = git_save_json(self.realm, {"a": 1})
+        self.assertEqual(git_load_json(self.realm, location), {"a": 1})
+
+        hits = object_cache.hits
+        self.assertIs(
+            git_load_json(self.realm, location),
+            git_load_json(self.realm, location))
+        self.assertEqual(
+            git_load_str_list(self.realm, [location, location]),
+            ['{"a": 1}', '{"a": 1}'])
+        self.assertEqual(object_cache.hits, hits + 4)
+
+    def test_references_are_not_cached(self):
+        ref_name = "refs/datalad/test"
+        for content in ("first", "second"):
+            git_update_ref(
+                self.realm,
+                ref_name,
+                git_save_str(self.realm, content))
+            self.assertEqual(git_load_str(self.realm, ref_name), content)
+            self.assertEqual(git_load_str_list(self.realm, [ref_name]), [content])
+
+
+class TestWriteMemo(GitBackendTestBase):
+
+    def test_saved_content_is_not_written_again(self):
+        location = git_save_json(self.realm, {"a": 1})
+        with mock.patch.object(subprocess_backend, "git_save_bytes") as save:
+            self.assertEqual(git_save_json(self.realm, {"a": 1}), location)
+            self.assertEqual(git_save_str(self.realm, '{"a": 1}'), location)
+            save.assert_not_called()
+
+            git_save_str(self.realm, "new content")
+            save.assert_called_once_with(self.realm, b"new content")
+
+    def test_persistence(self):
+        location = git_save_str(self.realm, "content")
+        unreferenced_location = git_save_str(self.realm, "unreferenced")
+        git_update_ref(self.realm, "refs/datalad/test", location)
+        self.git("repack", ["-q"])
+        with mock.patch(
+                "dataladmetadatamodel.mapper.gitmapper.gitbackend"
+                ".PERSIST_WRITE_MEMOS",
+                True):
+            save_write_memo(self.realm)
+
+        write_memo = WriteMemo(self.realm, 10)
+        write_memo.load()
+        self.assertEqual(
+            write_memo.get(write_memo.get_digest(b"content")),
+            location)
+        self.assertEqual(
+            write_memo.get(write_memo.get_digest(b"unreferenced")),
+            unreferenced_location)
+
+        # Repacking and pruning removes the unreferenced object, its
+        # entry is discarded. Entries of existing objects are kept.
+        self.git("repack", ["-a", "-d", "-q"])
+        self.git("prune", ["--expire=now"])
+
+        write_memo = WriteMemo(self.realm, 10)
+        write_memo.load()
+        self.assertEqual(
+            write_memo.entries,
+            {write_memo.get_digest(b"content"): location})
+
+    def test_persistence_with_loose_objects(self):
+        # A realm without packfiles, i.e. only with loose objects
+        write_memo = WriteMemo(self.realm, 10)
+        for content in ("content", "unreferenced"):
+            object_hash, = self.git(
+                "hash-object",
+                ["-w", "--stdin"],
+                content)
+            write_memo.put(
+                write_memo.get_digest(content.encode()),
+                object_hash)
+            if content == "content":
+                location = object_hash
+                git_update_ref(self.realm, "refs/datalad/test", location)
+        write_memo.save()
+
+        # Pruning removes the unreferenced loose object, its entry
+        # is discarded.
+        self.git("prune", ["--expire=now"])
+        write_memo = WriteMemo(self.realm, 10)
+        write_memo.load()
+        self.assertEqual(
+            write_memo.entries,
+            {write_memo.get_digest(b"content"): location})
+
+    def test_maximum_entries(self):
+        write_memo = WriteMemo(self.realm, 2)
+        for index in range(3):
+            write_memo.put(bytes([index]), str(index))
+        self.assertEqual(list(write_memo.entries.values()), ["1", "2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
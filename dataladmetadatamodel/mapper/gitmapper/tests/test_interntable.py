@@ -0,0 +1,233 @@
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from dataladmetadatamodel.connector import Connector
+from dataladmetadatamodel.filetree import FileTree
+from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
+from dataladmetadatamodel.metadatapath import MetadataPath
+from dataladmetadatamodel.tests.utils import assert_file_trees_equal
+
+from .. import interntable
+from ..codec import decode, load_json_object
+from ..filetreemapper import INTERN_TABLE_NAME
+from ..gitbackend import git_load_bytes, git_ls_tree
+from ..interntable import INTERNED_METADATA_VERSION
+
+def create_metadata(realm: str, index: int) -> Metadata:
+    metadata = Metadata("git", realm)
+    for extractor_name in ("extractor-a", "extractor-b"):
+        metadata.add_extractor_run(
+            1.0,
+            extractor_name,
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration(
+                "1.0",
+                {"extract-all": True, "format": "json-ld"}),
+            {"info": f"metadata of file {index}"})
+    return metadata
+
+
+class TestInternTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def create_file_tree(self, count: int) -> FileTree:
+        file_tree = FileTree("git", self.realm)
+        file_tree.add_metadata_entries(
+            (MetadataPath(f"d{index % 3}/f{index}"),
+             create_metadata(self.realm, index))
+            for index in range(count))
+        return file_tree
+
+    def load_metadata_json(self, location: str):
+        return decode(git_load_bytes(self.realm, location))
+
+    def get_tree_entries(self, location: str):
+        return {
+            line.split("\t", 1)[1]: line.split()[2]
+            for line in git_ls_tree(self.realm, location)
+        }
+
+    def get_table_entries(self, file_tree_location: str):
+        return set(
+            self.get_tree_entries(
+                self.get_tree_entries(
+                    file_tree_location)[INTERN_TABLE_NAME]).values())
+
+    def test_file_tree_metadata_is_interned(self):
+        file_tree = self.create_file_tree(10)
+        with mock.patch.object(
+                interntable,
+                "save_json_object",
+                wraps=interntable.save_json_object) as save_json_object:
+            reference = file_tree.save()
+            # One configuration and one provenance
+            self.assertEqual(save_json_object.call_count, 2)
+
+        entry_locations = set()
+        mapped_file_tree = Connector.from_reference(reference).load_object()
+        for _, connector in mapped_file_tree.get_paths_recursive():
+            json_obj = self.load_metadata_json(connector.reference.location)
+            self.assertEqual(
+                json_obj["@"]["version"],
+                INTERNED_METADATA_VERSION)
+            self.assertNotIn("intern_table", json_obj)
+            for instance_set in json_obj["instance_sets"].values():
+                entry_locations.update(instance_set["parameter_set"])
+                for instance in instance_set["instance_set"].values():
+                    entry_locations.add(instance["configuration"])
+                    entry_locations.add(instance["provenance"])
+
+        # All metadata refers to the configuration and the provenance
+        # entry, that are stored in the table of the file tree.
+        self.assertEqual(len(entry_locations), 2)
+        self.assertEqual(
+            self.get_table_entries(reference.location),
+            entry_locations)
+        self.assertIn(
+            ["test-author", "test@example.com"],
+            [
+                load_json_object(self.realm, location)
+                for location in entry_locations
+            ])
+
+        assert_file_trees_equal(
+            self,
+            self.create_file_tree(10),
+            mapped_file_tree,
+            True)
+
+    def test_interned_metadata_is_smaller(self):
+        file_tree = self.create_file_tree(1)
+        reference = file_tree.save()
+        interned_location = next(
+            connector.reference.location
+            for _, connector in file_tree.get_paths_recursive())
+
+        plain_location = Connector.from_object(
+            create_metadata(self.realm, 0)).save_object().location
+        interned_content = git_load_bytes(self.realm, interned_location)
+        self.assertNotIn(b"test-author", interned_content)
+        self.assertNotIn(b"json-ld", interned_content)
+        self.assertLess(
+            len(interned_content),
+            len(git_load_bytes(self.realm, plain_location)))
+
+        # Interned metadata is loaded like plain metadata
+        self.assertEqual(
+            Connector.from_reference(reference).load_object().get_metadata(
+                MetadataPath("d0/f0")),
+            Connector.from_reference(
+                Connector.from_object(
+                    create_metadata(self.realm, 0)).save_object()
+            ).load_object())
+
+    def test_equal_metadata_is_saved_in_equal_blobs(self):
+        small_file_tree = self.create_file_tree(1)
+        small_file_tree.save()
+        large_file_tree = self.create_file_tree(4)
+        large_file_tree.get_metadata(MetadataPath("d1/f1")).add_extractor_run(
+            2.0,
+            "extractor-c",
+            "other-author",
+            "other@example.com",
+            ExtractorConfiguration("2.0", {}),
+            {"info": "new"})
+        large_file_tree.save()
+
+        self.assertEqual(
+            small_file_tree.get_node_at_path(
+                MetadataPath("d0/f0")).value.reference.location,
+            large_file_tree.get_node_at_path(
+                MetadataPath("d0/f0")).value.reference.location)
+
+    def test_incremental_save(self):
+        reference = self.create_file_tree(4).save()
+        mapped_file_tree = Connector.from_reference(reference).load_object()
+        unchanged_location = mapped_file_tree.get_node_at_path(
+            MetadataPath("d0/f0")).value.reference.location
+
+        metadata = mapped_file_tree.get_metadata(MetadataPath("d1/f1"))
+        metadata.add_extractor_run(
+            2.0,
+            "extractor-c",
+            "other-author",
+            "other@example.com",
+            ExtractorConfiguration("2.0", {}),
+            {"info": "new"})
+        modified_reference = mapped_file_tree.save()
+
+        # The table holds the entries of the unchanged metadata and
+        # the entries of the modified metadata.
+        self.assertEqual(
+            len(self.get_table_entries(modified_reference.location)),
+            4)
+        self.assertEqual(
+            mapped_file_tree.get_node_at_path(
+                MetadataPath("d0/f0")).value.reference.location,
+            unchanged_location)
+
+        # The result is equal to the result of a complete save
+        expected_file_tree = self.create_file_tree(4)
+        expected_file_tree.get_metadata(
+            MetadataPath("d1/f1")).add_extractor_run(
+                2.0,
+                "extractor-c",
+                "other-author",
+                "other@example.com",
+                ExtractorConfiguration("2.0", {}),
+                {"info": "new"})
+        self.assertEqual(
+            expected_file_tree.save().location,
+            modified_reference.location)
+
+        # Saving an unchanged tree does not save the table
+        with mock.patch.object(
+                interntable,
+                "save_json_object",
+                wraps=interntable.save_json_object) as save_json_object:
+            self.assertEqual(
+                Connector.from_reference(
+                    modified_reference).load_object().save().location,
+                modified_reference.location)
+            save_json_object.assert_not_called()
+
+    def test_shared_metadata(self):
+        metadata = create_metadata(self.realm, 0)
+        file_tree = FileTree("git", self.realm)
+        file_tree.add_metadata(MetadataPath("a"), metadata)
+        file_tree.add_metadata(MetadataPath("b"), metadata)
+        file_tree.save()
+        self.assertEqual(
+            file_tree.get_node_at_path(
+                MetadataPath("a")).value.reference.location,
+            file_tree.get_node_at_path(
+                MetadataPath("b")).value.reference.location)
+
+    def test_standalone_metadata_is_not_interned(self):
+        location = Connector.from_object(
+            create_metadata(self.realm, 0)).save_object().location
+        json_obj = self.load_metadata_json(location)
+        self.assertEqual(json_obj["@"]["version"], "2.0")
+        self.assertIn(b"test-author", git_load_bytes(self.realm, location))
+
+    def test_file_tree_without_metadata_has_no_table(self):
+        file_tree = FileTree("git", self.realm)
+        file_tree.add_metadata(MetadataPath("a"), Metadata("git", self.realm))
+        file_tree.add_metadata(MetadataPath("b"), None)
+        self.assertNotIn(
+            INTERN_TABLE_NAME,
+            self.get_tree_entries(file_tree.save().location))
+
+
+if __name__ == '__main__':
+    unittest.main()
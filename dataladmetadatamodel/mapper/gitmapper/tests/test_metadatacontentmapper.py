@@ -0,0 +1,201 @@
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from dataladmetadatamodel.connector import Connector
+from dataladmetadatamodel.filetree import FileTree
+from dataladmetadatamodel.metadata import (
+    ExtractorConfiguration,
+    Metadata,
+    MetadataInstance)
+from dataladmetadatamodel.metadatapath import MetadataPath
+
+from .. import metadatacontentmapper
+from ..codec import decode
+from ..gitbackend import git_load_bytes
+
+
+large_content = {"values": [f"value {i}" for i in range(100)]}
+small_content = {"info": "small"}
+
+
+def create_metadata(realm: str) -> Metadata:
+    metadata = Metadata("git", realm)
+    for extractor_name, content in (("large", large_content),
+                                    ("small", small_content)):
+        metadata.add_extractor_run(
+            1.0,
+            extractor_name,
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {}),
+            content)
+    return metadata
+
+
+def get_instance(metadata: Metadata, extractor_name: str) -> MetadataInstance:
+    return next(metadata.instance_sets[extractor_name].get_instances())
+
+
+class TestMetadataContent(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dirs = [tempfile.TemporaryDirectory() for _ in range(2)]
+        self.realm, self.other_realm = [
+            temp_dir.name
+            for temp_dir in self.temp_dirs]
+        for realm in (self.realm, self.other_realm):
+            subprocess.run(["git", "init", realm], stdout=subprocess.PIPE)
+
+        patcher = mock.patch.object(
+            metadatacontentmapper,
+            "MAX_INLINE_CONTENT_SIZE",
+            1000)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        for temp_dir in self.temp_dirs:
+            temp_dir.cleanup()
+
+    def load_metadata_json(self, location: str):
+        return decode(git_load_bytes(self.realm, location))
+
+    def test_large_content_is_stored_separately(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+
+        instance_sets = self.load_metadata_json(
+            reference.location)["instance_sets"]
+        large_instance, = instance_sets["large"]["instance_set"].values()
+        small_instance, = instance_sets["small"]["instance_set"].values()
+        self.assertEqual(small_instance["metadata_content"], small_content)
+        self.assertNotIn("metadata_content", large_instance)
+        self.assertEqual(
+            self.load_metadata_json(
+                large_instance["metadata_content_location"]),
+            large_content)
+
+    def test_content_is_loaded_on_access(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+        metadata = Connector.from_reference(reference).load_object()
+
+        large_instance = get_instance(metadata, "large")
+        self.assertTrue(get_instance(metadata, "small").is_content_loaded())
+        self.assertFalse(large_instance.is_content_loaded())
+        self.assertEqual(large_instance.metadata_content, large_content)
+        self.assertTrue(large_instance.is_content_loaded())
+        self.assertEqual(metadata, create_metadata(self.realm))
+
+    def test_saving_does_not_load_content(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+        metadata = Connector.from_reference(reference).load_object()
+        large_instance = get_instance(metadata, "large")
+        metadata.add_extractor_run(
+            2.0,
+            "other",
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {}),
+            small_content)
+
+        with mock.patch.object(
+                metadatacontentmapper.MetadataContentGitMapper,
+                "map") as map_content:
+            metadata.save()
+            map_content.assert_not_called()
+        self.assertFalse(large_instance.is_content_loaded())
+
+    def test_setting_content(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+        metadata = Connector.from_reference(reference).load_object()
+
+        large_instance = get_instance(metadata, "large")
+        large_instance.metadata_content = small_content
+        self.assertIsNone(large_instance.content_reference)
+        metadata.touch()
+
+        metadata = Connector.from_reference(metadata.save()).load_object()
+        large_instance = get_instance(metadata, "large")
+        self.assertTrue(large_instance.is_content_loaded())
+        self.assertEqual(large_instance.metadata_content, small_content)
+
+    def test_modifying_loaded_content(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+        metadata = Connector.from_reference(reference).load_object()
+        large_instance = get_instance(metadata, "large")
+        location = large_instance.content_reference.location
+
+        # Saving unchanged loaded content yields the same location
+        self.assertEqual(large_instance.metadata_content, large_content)
+        metadata.touch()
+        self.assertEqual(metadata.save().location, reference.location)
+        self.assertEqual(large_instance.content_reference.location, location)
+
+        # Modifications of loaded content are saved
+        large_instance.metadata_content["added"] = 1
+        metadata.touch()
+        modified_reference = metadata.save()
+        self.assertNotEqual(modified_reference.location, reference.location)
+        self.assertNotEqual(
+            large_instance.content_reference.location,
+            location)
+
+        metadata = Connector.from_reference(modified_reference).load_object()
+        self.assertEqual(
+            get_instance(metadata, "large").metadata_content,
+            {**large_content, "added": 1})
+
+    def test_content_is_encoded_once(self):
+        codec = metadatacontentmapper.get_codec()
+        with mock.patch.object(
+                metadatacontentmapper,
+                "iter_dumps",
+                wraps=metadatacontentmapper.iter_dumps) as iter_dumps, \
+                mock.patch.object(
+                    codec,
+                    "encode",
+                    wraps=codec.encode) as encode:
+            Connector.from_object(create_metadata(self.realm)).save_object()
+        self.assertEqual(
+            [
+                call
+                for call in iter_dumps.call_args_list + encode.call_args_list
+                if call[0][0] is large_content
+            ],
+            [mock.call(large_content, mock.ANY)]
+            if iter_dumps.called
+            else [mock.call(large_content)])
+
+    def test_file_tree_content(self):
+        file_tree = FileTree("git", self.realm)
+        file_tree.add_metadata(MetadataPath("a"), create_metadata(self.realm))
+        reference = file_tree.save()
+
+        mapped_file_tree = Connector.from_reference(reference).load_object()
+        metadata = mapped_file_tree.get_metadata(MetadataPath("a"))
+        self.assertFalse(get_instance(metadata, "large").is_content_loaded())
+        self.assertEqual(metadata, create_metadata(self.realm))
+
+    def test_copy_to_other_realm(self):
+        reference = Connector.from_object(
+            create_metadata(self.realm)).save_object()
+        metadata = Connector.from_reference(reference).load_object()
+
+        copied_metadata = metadata.deepcopy("git", self.other_realm)
+        copied_reference = Connector.from_object(
+            copied_metadata).save_object()
+        self.temp_dirs[0].cleanup()
+
+        self.assertEqual(
+            Connector.from_reference(copied_reference).load_object(),
+            create_metadata(self.other_realm))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ from typing import Any
 from uuid import UUID
 
 from .objectreference import GitReference
-from .gitbackend.subprocess import git_ls_tree, git_save_tree, git_update_ref
+from .gitbackend import git_ls_tree, git_save_tree, git_update_ref
 from ..basemapper import BaseMapper
 from ..reference import Reference
 
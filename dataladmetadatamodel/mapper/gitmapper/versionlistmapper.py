@@ -1,7 +1,8 @@
 from typing import Any
 
 from .objectreference import GitReference
-from .gitbackend.subprocess import git_load_json, git_save_json, git_update_ref
+from .codec import load_json_object, save_json_object
+from .gitbackend import git_update_ref
 from ..basemapper import BaseMapper
 from ..reference import Reference
 
@@ -21,7 +22,7 @@ class VersionListGitMapper(BaseMapper):
         assert isinstance(ref, Reference)
         assert ref.mapper_family == "git"
 
-        json_object = git_load_json(self.realm, ref.location)
+        json_object = load_json_object(self.realm, ref.location)
         version_records = {
             pdm_assoc["primary_data_version"]: VersionRecord(
                 pdm_assoc["time_stamp"],
@@ -54,7 +55,7 @@ class VersionListGitMapper(BaseMapper):
             }
             for primary_data_version, version_record in obj.version_set.items()
         ]
-        return git_save_json(self.realm, json_object)
+        return save_json_object(self.realm, json_object)
 
 
 class TreeVersionListGitMapper(VersionListGitMapper):
@@ -1,7 +1,8 @@
-import json
+import sys
 from typing import Optional
 
 from .. import check_serialized_version, version_string
+from ..jsoncodec import dumps, loads
 
 
 none_class_name = "*None*"
@@ -10,15 +11,23 @@ none_mapper_family_name = "*None*"
 none_realm = "*None*"
 
 
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
 class Reference:
+    __slots__ = ("mapper_family", "realm", "class_name", "location")
+
     def __init__(self,
                  mapper_family: str,
                  realm: str,
                  class_name: str,
                  location: Optional[str] = None):
-        self.mapper_family = mapper_family
-        self.realm = realm
-        self.class_name = class_name
+        # Mapper family, realm, and class name are shared by many
+        # references, they are interned to store only one copy.
+        self.mapper_family = _intern(mapper_family)
+        self.realm = _intern(realm)
+        self.class_name = _intern(class_name)
         self.location = location
 
     def __str__(self):
@@ -35,7 +44,7 @@ class Reference:
         return self.location == none_location and self.class_name == none_class_name
 
     def to_json_str(self):
-        return json.dumps(self.to_json_obj())
+        return dumps(self.to_json_obj())
 
     def to_json_obj(self):
         return {
@@ -52,7 +61,7 @@ class Reference:
 
     @classmethod
     def from_json_str(cls, json_str: str) -> "Reference":
-        return cls.from_json_obj(json.loads(json_str))
+        return cls.from_json_obj(loads(json_str))
 
     @classmethod
     def from_json_obj(cls, obj) -> "Reference":
@@ -1,17 +1,31 @@
 import copy
-import json
 import time
-from typing import Dict, Generator, Iterable, List, Optional, Tuple
+from typing import Dict, Generator, Iterable, Iterator, List, Optional, Tuple
 
 from . import JSONObject, check_serialized_version, version_string
 from .connector import ConnectedObject
+from .jsoncodec import dumps, iter_dumps, loads
 from .mapper import get_mapper
 from .mapper.reference import Reference
 
 
+def _get_hashable(json_object: JSONObject):
+    """
+    Return a hashable representation of json_object. Equal JSON
+    objects have equal representations.
+    """
+    if isinstance(json_object, dict):
+        return tuple(sorted(
+            (key, _get_hashable(value))
+            for key, value in json_object.items()))
+    if isinstance(json_object, list):
+        return tuple(_get_hashable(value) for value in json_object)
+    return json_object
+
+
 class ParameterDict(dict):
     def __hash__(self):
-        return hash(tuple(sorted(self.items())))
+        return hash(_get_hashable(self))
 
 
 class ExtractorConfiguration:
@@ -36,7 +50,7 @@ class ExtractorConfiguration:
         }
 
     def to_json_str(self) -> str:
-        return json.dumps(self.to_json_obj())
+        return dumps(self.to_json_obj())
 
     def __eq__(self, other):
         return (
@@ -58,7 +72,13 @@ class ExtractorConfiguration:
 
     @classmethod
     def from_json_str(cls, json_str: str) -> "ExtractorConfiguration":
-        return cls.from_json_obj(json.loads(json_str))
+        return cls.from_json_obj(loads(json_str))
+
+
+# Version of serialized metadata instances, whose content is stored
+# separately. They record the location of the content in
+# "metadata_content_location" instead of the content itself.
+SEPARATE_CONTENT_VERSION = "2.1"
 
 
 class MetadataInstance:
@@ -68,6 +88,10 @@ class MetadataInstance:
     author, author_email, with a configuration, i.e.
     parameters, and with a source that points to
     the metadata itself.
+
+    Mappers might store large metadata content
+    separately. Separately stored content is loaded
+    when metadata_content is first accessed.
     """
     def __init__(self,
                  time_stamp,
@@ -80,10 +104,35 @@ class MetadataInstance:
         self.author_name = author_name
         self.author_email = author_email
         self.configuration = configuration
-        self.metadata_content = metadata_content
+        self._metadata_content = metadata_content
+        self._is_content_loaded = True
+        # Reference to the separately stored content, if the content
+        # is stored separately. Mappers set the reference when they
+        # store the content. Setting the content removes it.
+        self.content_reference: Optional[Reference] = None
+
+    @property
+    def metadata_content(self) -> JSONObject:
+        if not self._is_content_loaded:
+            self._metadata_content = get_mapper(
+                self.content_reference.mapper_family,
+                self.content_reference.class_name)(
+                    self.content_reference.realm).map(
+                        self.content_reference)
+            self._is_content_loaded = True
+        return self._metadata_content
+
+    @metadata_content.setter
+    def metadata_content(self, metadata_content: JSONObject):
+        self._metadata_content = metadata_content
+        self._is_content_loaded = True
+        self.content_reference = None
+
+    def is_content_loaded(self) -> bool:
+        return self._is_content_loaded
 
     def to_json_obj(self) -> JSONObject:
-        return {
+        json_obj = {
             "@": dict(
                 type="MetadataInstance",
                 version=version_string
@@ -91,12 +140,18 @@ class MetadataInstance:
             "time_stamp": self.time_stamp,
             "author": self.author_name,
             "author_email": self.author_email,
-            "configuration": self.configuration.to_json_obj(),
-            "metadata_content": self.metadata_content
+            "configuration": self.configuration.to_json_obj()
         }
+        if self.content_reference is None:
+            json_obj["metadata_content"] = self.metadata_content
+        else:
+            json_obj["@"]["version"] = SEPARATE_CONTENT_VERSION
+            json_obj["metadata_content_location"] = \
+                self.content_reference.location
+        return json_obj
 
     def to_json_str(self) -> str:
-        return json.dumps(self.to_json_obj())
+        return dumps(self.to_json_obj())
 
     def __eq__(self, other):
         return (
@@ -108,20 +163,51 @@ class MetadataInstance:
         )
 
     @classmethod
-    def from_json_obj(cls, obj: JSONObject) -> "MetadataInstance":
+    def from_json_obj(cls,
+                      obj: JSONObject,
+                      mapper_family: Optional[str] = None,
+                      realm: Optional[str] = None
+                      ) -> "MetadataInstance":
+        """
+        Separately stored content is loaded from the given
+        mapper family and realm.
+        """
         assert obj["@"]["type"] == "MetadataInstance"
-        check_serialized_version(obj)
-        return cls(
+        stored_version = check_serialized_version(
+            obj,
+            (version_string, SEPARATE_CONTENT_VERSION))
+
+        if stored_version == version_string:
+            return cls(
+                obj["time_stamp"],
+                obj["author"],
+                obj["author_email"],
+                ExtractorConfiguration.from_json_obj(obj["configuration"]),
+                obj["metadata_content"]
+            )
+
+        if mapper_family is None or realm is None:
+            raise ValueError(
+                "Cannot read separately stored metadata content without "
+                "mapper family and realm")
+        metadata_instance = cls(
             obj["time_stamp"],
             obj["author"],
             obj["author_email"],
             ExtractorConfiguration.from_json_obj(obj["configuration"]),
-            obj["metadata_content"]
+            None
         )
+        metadata_instance._is_content_loaded = False
+        metadata_instance.content_reference = Reference(
+            mapper_family,
+            realm,
+            "MetadataContent",
+            obj["metadata_content_location"])
+        return metadata_instance
 
     @classmethod
     def from_json_str(cls, json_str: str) -> "MetadataInstance":
-        return cls.from_json_obj(json.loads(json_str))
+        return cls.from_json_obj(loads(json_str))
 
 
 class MetadataInstanceSet:
@@ -130,22 +216,106 @@ class MetadataInstanceSet:
     run information records. Each instance is
     identified by its configuration, i.e. an
     instance of ExtractorConfiguration.
+
+    Instance sets that are read from JSON decode
+    their configurations and their instances when
+    they are first accessed.
     """
     def __init__(self,
                  initial_metadata_instances: Optional[Iterable[MetadataInstance]] = None):
 
-        self.parameter_set = list()
-        self.instances = dict()
+        self._parameter_set: List[ExtractorConfiguration] = list()
+        # Maps configurations to their index in self.parameter_set
+        self._configuration_indices: Dict[ExtractorConfiguration, int] = dict()
+        self._instances: Dict[int, MetadataInstance] = dict()
+        # Not yet decoded JSON objects of the parameter set and the
+        # instance set, see from_json_obj().
+        self._json_parameter_set: Optional[List[JSONObject]] = None
+        self._json_instance_set: Optional[Dict[str, JSONObject]] = None
+        # Mapper family and realm of the separately stored content of
+        # not yet decoded instances.
+        self._json_mapper_family: Optional[str] = None
+        self._json_realm: Optional[str] = None
         for metadata_instance in initial_metadata_instances or []:
             self.add_metadata_instance(metadata_instance)
 
+    @property
+    def parameter_set(self) -> List[ExtractorConfiguration]:
+        if self._json_parameter_set is not None:
+            self._decode_parameter_set()
+        return self._parameter_set
+
+    @parameter_set.setter
+    def parameter_set(self, parameter_set: List[ExtractorConfiguration]):
+        self._set_parameter_set(parameter_set)
+
+    @property
+    def configuration_indices(self) -> Dict[ExtractorConfiguration, int]:
+        if self._json_parameter_set is not None:
+            self._decode_parameter_set()
+        return self._configuration_indices
+
+    @property
+    def instances(self) -> Dict[int, MetadataInstance]:
+        if self._json_instance_set is not None:
+            self._decode_instances()
+        return self._instances
+
+    @instances.setter
+    def instances(self, instances: Dict[int, MetadataInstance]):
+        self._instances = instances
+        self._json_instance_set = None
+
+    def _decode_parameter_set(self):
+        self._set_parameter_set([
+            ExtractorConfiguration.from_json_obj(json_obj)
+            for json_obj in self._json_parameter_set
+        ])
+
+    def _decode_instances(self):
+        self.instances = {
+            int(configuration_id): MetadataInstance.from_json_obj(
+                json_obj,
+                self._json_mapper_family,
+                self._json_realm)
+            for configuration_id, json_obj in self._json_instance_set.items()
+        }
+
+    def is_decoded(self) -> bool:
+        return (
+            self._json_parameter_set is None
+            and self._json_instance_set is None)
+
+    def are_instances_decoded(self) -> bool:
+        return self._json_instance_set is None
+
     def __iter__(self):
         yield from self.instances.values()
 
+    def _set_parameter_set(self, parameter_set: List[ExtractorConfiguration]):
+        self._parameter_set = parameter_set
+        self._json_parameter_set = None
+        self._configuration_indices = dict()
+        for index, configuration in enumerate(parameter_set):
+            self._configuration_indices.setdefault(configuration, index)
+
+    def _get_configuration_index(self,
+                                 configuration: ExtractorConfiguration
+                                 ) -> int:
+        index = self.configuration_indices.get(configuration, None)
+        if index is None:
+            raise ValueError(f"{configuration} is not in parameter set")
+        return index
+
     def add_metadata_instance(self, metadata_instance: MetadataInstance):
-        if metadata_instance.configuration not in self.parameter_set:
+        instance_key = self.configuration_indices.get(
+            metadata_instance.configuration,
+            None)
+        if instance_key is None:
+            instance_key = len(self.parameter_set)
             self.parameter_set.append(metadata_instance.configuration)
-        instance_key = self.parameter_set.index(metadata_instance.configuration)
+            self.configuration_indices[
+                metadata_instance.configuration] = instance_key
         self.instances[instance_key] = metadata_instance
 
     def get_instances(self) -> Generator[MetadataInstance, None, None]:
@@ -158,50 +328,71 @@ class MetadataInstanceSet:
         return self.instances[index]
 
     def get_instance_for_configuration(self, configuration: ExtractorConfiguration):
-        return self.instances[self.parameter_set.index(configuration)]
+        return self.instances[self._get_configuration_index(configuration)]
 
     def to_json_obj(self) -> JSONObject:
+        # Parts that were not decoded are returned as they were read
         return {
             "@": dict(
                 type="MetadataInstanceSet",
                 version=version_string
             ),
-            "parameter_set": [
-                configuration.to_json_obj()
-                for configuration in self.parameter_set
-            ],
-            "instance_set": {
-                instance_key: instance.to_json_obj()
-                for instance_key, instance in self.instances.items()
-            }
+            "parameter_set": (
+                self._json_parameter_set
+                if self._json_parameter_set is not None
+                else [
+                    configuration.to_json_obj()
+                    for configuration in self._parameter_set
+                ]),
+            "instance_set": (
+                self._json_instance_set
+                if self._json_instance_set is not None
+                else {
+                    instance_key: instance.to_json_obj()
+                    for instance_key, instance in self._instances.items()
+                })
         }
 
     def to_json_str(self) -> str:
-        return json.dumps(self.to_json_obj())
+        return dumps(self.to_json_obj())
 
     @classmethod
-    def from_json_obj(cls, obj: JSONObject) -> "MetadataInstanceSet":
+    def from_json_obj(cls,
+                      obj: JSONObject,
+                      mapper_family: Optional[str] = None,
+                      realm: Optional[str] = None
+                      ) -> "MetadataInstanceSet":
+        """
+        Separately stored content of the instances is loaded from
+        the given mapper family and realm.
+        """
         assert obj["@"]["type"] == "MetadataInstanceSet"
         check_serialized_version(obj)
 
         metadata_instance_set = cls()
-        metadata_instance_set.parameter_set = [
-            ExtractorConfiguration.from_json_obj(json_obj)
-            for json_obj in obj["parameter_set"]
-        ]
-        metadata_instance_set.instances = {
-            int(configuration_id): MetadataInstance.from_json_obj(json_obj)
-            for configuration_id, json_obj in obj["instance_set"].items()
-        }
+        metadata_instance_set._json_parameter_set = obj["parameter_set"]
+        metadata_instance_set._json_instance_set = obj["instance_set"]
+        metadata_instance_set._json_mapper_family = mapper_family
+        metadata_instance_set._json_realm = realm
         return metadata_instance_set
 
     @classmethod
     def from_json_str(cls, json_str: str) -> "MetadataInstanceSet":
-        return cls.from_json_obj(json.loads(json_str))
+        return cls.from_json_obj(loads(json_str))
+
+    def _get_instances_by_configuration(self
+                                        ) -> Dict[ExtractorConfiguration,
+                                                  Optional[MetadataInstance]]:
+        return {
+            configuration: self.instances.get(index, None)
+            for configuration, index in self.configuration_indices.items()
+        }
 
     def __eq__(self, other: "MetadataInstanceSet"):
-        return sorted(self.parameter_set) == sorted(other.parameter_set) \
-               and self.instances == other.instances
+        # Compare independently from the order of the configurations
+        return (
+            self._get_instances_by_configuration()
+            == other._get_instances_by_configuration())
 
 
 class Metadata(ConnectedObject):
@@ -221,9 +412,16 @@ class Metadata(ConnectedObject):
         self.mapper_family = mapper_family
         self.realm = realm
         self.instance_sets: Dict[str, MetadataInstanceSet] = dict()
+        # Length of the JSON-serialized form, if known
+        self.serialized_size: Optional[int] = None
 
-    def to_json(self) -> str:
-        return json.dumps({
+    def get_size_estimate(self) -> int:
+        if self.serialized_size is None:
+            return super().get_size_estimate()
+        return self.serialized_size
+
+    def to_json_obj(self) -> JSONObject:
+        return {
             "@": dict(
                 type="Metadata",
                 version=version_string
@@ -234,7 +432,32 @@ class Metadata(ConnectedObject):
                 format_name: instance_set.to_json_obj()
                 for format_name, instance_set in self.instance_sets.items()
             }
-        })
+        }
+
+    def to_json(self) -> str:
+        json_str = dumps(self.to_json_obj())
+        self.serialized_size = len(json_str)
+        return json_str
+
+    def iter_json(self,
+                  json_obj: Optional[JSONObject] = None
+                  ) -> Iterator[str]:
+        """
+        Yield the result of to_json() in chunks. Every metadata
+        instance is encoded separately, i.e. the complete JSON
+        string is never held in memory. Mappers can pass another
+        serialized form of this object in json_obj, which is
+        encoded instead.
+        """
+        # Depth of the instances: instance_sets -> format name
+        # -> instance_set -> instance key
+        size = 0
+        if json_obj is None:
+            json_obj = self.to_json_obj()
+        for chunk in iter_dumps(json_obj, 4):
+            size += len(chunk)
+            yield chunk
+        self.serialized_size = size
 
     def save(self) -> Reference:
         self.un_touch()
@@ -278,7 +501,12 @@ class Metadata(ConnectedObject):
 
     @classmethod
     def from_json(cls, json_str: str):
-        obj = json.loads(json_str)
+        metadata = cls.from_json_obj(loads(json_str))
+        metadata.serialized_size = len(json_str)
+        return metadata
+
+    @classmethod
+    def from_json_obj(cls, obj: JSONObject):
         assert obj["@"]["type"] == "Metadata"
         check_serialized_version(obj)
 
@@ -289,7 +517,10 @@ class Metadata(ConnectedObject):
 
         for format_name, instance_set_json_obj in obj["instance_sets"].items():
             metadata.instance_sets[format_name] = \
-                MetadataInstanceSet.from_json_obj(instance_set_json_obj)
+                MetadataInstanceSet.from_json_obj(
+                    instance_set_json_obj,
+                    metadata.mapper_family,
+                    metadata.realm)
 
         return metadata
 
@@ -300,12 +531,22 @@ class Metadata(ConnectedObject):
         new_mapper_family = new_mapper_family or self.mapper_family
         new_realm = new_realm or self.realm
 
+        is_same_storage = (
+            new_mapper_family == self.mapper_family
+            and str(new_realm) == str(self.realm))
+
         copied_metadata = Metadata(new_mapper_family, new_realm)
         for extractor_name, instance_set in self.instance_sets.items():
 
             # copy the instance set, i.e. the model object
+            copied_instance_set = copy.deepcopy(instance_set)
+            if not is_same_storage:
+                # Separately stored content is loaded, in order to
+                # store it in the new realm.
+                for instance in copied_instance_set.instances.values():
+                    instance.metadata_content = instance.metadata_content
             copied_metadata.instance_sets[extractor_name] = \
-                copy.deepcopy(instance_set)
+                copied_instance_set
             del instance_set
 
         return copied_metadata
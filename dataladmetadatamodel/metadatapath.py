@@ -1,27 +1,68 @@
 import logging
+import sys
 from pathlib import PurePath, PurePosixPath
+from typing import Tuple
 
 
 logger = logging.getLogger("datalad.metadata.model")
 
 
 class MetadataPath(PurePosixPath):
+    """
+    A relative posix path. Absolute paths are converted into relative
+    paths.
+
+    The components of a metadata path are interned and cached in a
+    tuple, i.e. equal components of different paths share a single
+    string object, and accessing parts does not create a new tuple.
+    """
+    __slots__ = ("_interned_parts",)
+
     def __new__(cls, *args):
         original_path = PurePath(*args)
         if not original_path.is_absolute():
-            created_path = super().__new__(
-                cls,
-                "/".join(original_path.parts))
+            parts = original_path.parts
         else:
-            created_path = super().__new__(
-                cls,
-                "/".join(original_path.parts[1:]))
+            parts = original_path.parts[1:]
             logger.warning(
                 f"Denied creation of absolute metadata path: {original_path}, "
-                f"created {created_path} instead. This is considered an error "
-                f"in the calling code.")
+                f"created {'/'.join(parts)} instead. This is considered an "
+                f"error in the calling code.")
+
+        return cls.from_parts(tuple(sys.intern(part) for part in parts))
+
+    @classmethod
+    def from_parts(cls, parts: Tuple[str, ...]) -> "MetadataPath":
+        """
+        Create a metadata path from a tuple of interned path components.
+        Every component must be a non-empty string that does not contain
+        a "/" and that is not ".".
+        """
+        path = super().__new__(cls, "/".join(parts))
+        path._interned_parts = parts
+        return path
+
+    @property
+    def parts(self) -> Tuple[str, ...]:
+        # Paths that are derived from other paths, e.g. by joining,
+        # are not created by from_parts(), their cache is filled on
+        # the first access.
+        try:
+            return self._interned_parts
+        except AttributeError:
+            self._interned_parts = tuple(
+                sys.intern(part)
+                for part in super().parts)
+            return self._interned_parts
+
+    def is_relative_to(self, *other) -> bool:
+        # PurePath.is_relative_to() requires Python 3.9
+        other_parts = MetadataPath(*other).parts
+        return self.parts[:len(other_parts)] == other_parts
 
-        return created_path
+    def with_stem(self, stem: str) -> "MetadataPath":
+        # PurePath.with_stem() requires Python 3.9
+        return self.with_name(stem + self.suffix)
 
     def __str__(self):
         path_str = PurePosixPath.__str__(self)
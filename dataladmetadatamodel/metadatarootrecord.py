@@ -23,6 +23,10 @@ class MetadataRootRecord(ConnectedObject):
         self.dataset_level_metadata = dataset_level_metadata
         self.file_tree = file_tree
 
+        for connector in (dataset_level_metadata, file_tree):
+            if connector.is_mapped:
+                self.register_child(connector.object)
+
     def save(self) -> Reference:
         """
         This method persists the bottom-half of all modified
@@ -45,17 +49,18 @@ class MetadataRootRecord(ConnectedObject):
 
     def set_file_tree(self, file_tree: ConnectedObject):
         self.touch()
-        self.file_tree = Connector.from_object(file_tree)
+        self.file_tree = Connector.from_object(self.register_child(file_tree))
 
     def get_file_tree(self):
-        return self.file_tree.load_object()
+        return self.register_child(self.file_tree.load_object())
 
     def set_dataset_level_metadata(self, dataset_level_metadata: ConnectedObject):
         self.touch()
-        self.dataset_level_metadata = Connector.from_object(dataset_level_metadata)
+        self.dataset_level_metadata = Connector.from_object(
+            self.register_child(dataset_level_metadata))
 
     def get_dataset_level_metadata(self):
-        return self.dataset_level_metadata.load_object()
+        return self.register_child(self.dataset_level_metadata.load_object())
 
     def deepcopy(self,
                  new_mapper_family: Optional[str] = None,
@@ -13,7 +13,6 @@ for their persistence, instead they are
 mapped by mappers onto a specific backend.)
 """
 import abc
-import json
 import logging
 import subprocess
 from copy import deepcopy
@@ -21,6 +20,7 @@ from pathlib import Path
 from typing import IO, Optional
 
 from . import JSONObject, check_serialized_version, version_string
+from .jsoncodec import dumps, loads
 
 
 logger = logging.getLogger("datalad.metadata.model")
@@ -46,7 +46,7 @@ class MetadataSource(abc.ABC):
         raise NotImplementedError
 
     def to_json_str(self) -> str:
-        return json.dumps(self.to_json_obj())
+        return dumps(self.to_json_obj())
 
     @staticmethod
     def from_json_obj(json_obj: JSONObject) -> Optional["MetadataSource"]:
@@ -54,7 +54,7 @@ class MetadataSource(abc.ABC):
         if source_type is None:
             logger.error(
                 f"key `{MetadataSource.TYPE_KEY}´ not found in "
-                f"json object: {json.dumps(json_obj)}.")
+                f"json object: {dumps(json_obj)}.")
             return None
         if source_type == LocalGitMetadataSource.TYPE:
             return LocalGitMetadataSource.from_json_obj(json_obj)
@@ -66,7 +66,7 @@ class MetadataSource(abc.ABC):
 
     @staticmethod
     def from_json_str(json_string: str) -> Optional["MetadataSource"]:
-        return MetadataSource.from_json_obj(json.loads(json_string))
+        return MetadataSource.from_json_obj(loads(json_string))
 
 
 class LocalGitMetadataSource(MetadataSource):
@@ -157,7 +157,7 @@ class ImmediateMetadataSource(MetadataSource):
         pass
 
     def write_object_to(self, file_descriptor: IO):
-        json.dump(self.content, file_descriptor)
+        file_descriptor.write(dumps(self.content))
 
     def deepcopy(self):
         return ImmediateMetadataSource(deepcopy(self.content))
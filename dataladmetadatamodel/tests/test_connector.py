@@ -0,0 +1,412 @@
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from dataladmetadatamodel.connector import Connector
+from dataladmetadatamodel.connectorcache import (
+    get_connector_cache,
+    set_connector_budget)
+from dataladmetadatamodel.filetree import FileTree
+from dataladmetadatamodel.mapper.gitmapper.gitbackend import git_update_ref
+from dataladmetadatamodel.mapper.gitmapper.metadatamapper import MetadataGitMapper
+from dataladmetadatamodel.mapper.gitmapper.metadatarootrecordmapper import (
+    MetadataRootRecordGitMapper)
+from dataladmetadatamodel.mapper.reference import Reference
+from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
+from dataladmetadatamodel.metadatapath import MetadataPath
+from dataladmetadatamodel.metadatarootrecord import MetadataRootRecord
+from dataladmetadatamodel.text import Text
+from dataladmetadatamodel.versionlist import TreeVersionList
+
+from .utils import create_dataset_tree
+
+
+dataset_paths = [
+    MetadataPath(""),
+    MetadataPath("d1"),
+    MetadataPath("d1/d1.1"),
+    MetadataPath("d2")]
+
+file_paths = [
+    MetadataPath("a/b"),
+    MetadataPath("c")]
+
+
+class TestModificationTracking(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_unmodified_object_is_not_saved(self):
+        text = Text("git", self.realm, "content")
+        connector = Connector.from_object(text)
+        location = connector.save_object().location
+
+        with mock.patch.object(Text, "save") as save:
+            self.assertEqual(connector.save_object().location, location)
+            save.assert_not_called()
+
+            text.touch()
+            connector.save_object()
+            save.assert_called_once()
+
+    def test_touch_propagates_to_parents(self):
+        tree_version_list = TreeVersionList("git", self.realm)
+        tree_version_list.set_dataset_tree(
+            "v1",
+            "0",
+            create_dataset_tree("git", self.realm, dataset_paths, file_paths))
+        reference = tree_version_list.save()
+
+        tree_version_list = Connector.from_reference(reference).load_object()
+        _, dataset_tree = tree_version_list.get_dataset_tree("v1")
+        mrr = dataset_tree.get_metadata_root_record(MetadataPath("d1/d1.1"))
+        file_tree = mrr.get_file_tree()
+        metadata = file_tree.get_metadata(MetadataPath("a/b"))
+
+        for connected_object in (tree_version_list, dataset_tree, mrr,
+                                 file_tree, metadata):
+            self.assertFalse(connected_object.is_modified())
+
+        metadata.add_extractor_run(
+            0,
+            "test-extractor",
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {}),
+            {"info": "test"})
+
+        for connected_object in (tree_version_list, dataset_tree, mrr,
+                                 file_tree, metadata):
+            self.assertTrue(connected_object.is_modified())
+
+        # Only the modified metadata root record and metadata are saved
+        with \
+                mock.patch.object(
+                    MetadataRootRecord,
+                    "save",
+                    autospec=True,
+                    side_effect=MetadataRootRecord.save) as save_mrr, \
+                mock.patch.object(
+                    MetadataGitMapper,
+                    "unmap",
+                    autospec=True,
+                    side_effect=MetadataGitMapper.unmap) as save_metadata:
+
+            tree_version_list.save()
+            save_mrr.assert_called_once_with(mrr)
+            save_metadata.assert_called_once_with(mock.ANY, metadata)
+
+        for connected_object in (tree_version_list, dataset_tree, mrr,
+                                 file_tree, metadata):
+            self.assertFalse(connected_object.is_modified())
+
+        # The modification is persisted
+        tree_version_list = Connector.from_reference(reference).load_object()
+        _, dataset_tree = tree_version_list.get_dataset_tree("v1")
+        self.assertEqual(
+            dataset_tree.get_metadata_root_record(
+                MetadataPath("d1/d1.1")).get_file_tree().get_metadata(
+                    MetadataPath("a/b")),
+            metadata)
+
+    def test_modified_object_touches_new_parent(self):
+        text = Text("git", self.realm, "content")
+        metadata = Metadata("git", self.realm)
+        metadata.un_touch()
+
+        metadata.register_child(text)
+        self.assertTrue(metadata.is_modified())
+
+        metadata.un_touch()
+        text.un_touch()
+        metadata.register_child(text)
+        self.assertFalse(metadata.is_modified())
+
+
+class TestConnectorBudget(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+
+    def tearDown(self) -> None:
+        set_connector_budget(realm=self.realm)
+        set_connector_budget()
+        self.temp_dir.cleanup()
+
+    def _create_saved_connectors(self, count: int):
+        connectors = [
+            Connector.from_object(Text("git", self.realm, f"content {i}"))
+            for i in range(count)
+        ]
+        for connector in connectors:
+            connector.save_object()
+        return connectors
+
+    def test_object_budget(self):
+        set_connector_budget(max_objects=2, realm=self.realm)
+        connectors = self._create_saved_connectors(3)
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [False, True, True])
+
+        # Evicted objects are reloaded, the least recently used
+        # connector is evicted instead.
+        self.assertEqual(connectors[0].load_object().content, "content 0")
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [True, False, True])
+
+        connectors[2].load_object()
+        connectors[1].load_object()
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [False, True, True])
+
+    def test_byte_budget(self):
+        set_connector_budget(max_bytes=20, realm=self.realm)
+        connectors = self._create_saved_connectors(3)
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [False, True, True])
+        self.assertEqual(get_connector_cache(self.realm).size, 18)
+
+    def test_global_budget(self):
+        set_connector_budget(max_objects=1)
+        connectors = self._create_saved_connectors(2)
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [False, True])
+
+        # A realm budget takes precedence over the global budget
+        set_connector_budget(max_objects=3, realm=self.realm)
+        connectors = self._create_saved_connectors(2)
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [True, True])
+
+    def test_modified_objects_are_not_evicted(self):
+        set_connector_budget(max_objects=1, realm=self.realm)
+        connectors = self._create_saved_connectors(2)
+        connectors[1].load_object().touch()
+        connectors[0].load_object()
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [True, True])
+
+        connectors[1].save_object()
+        self.assertEqual(
+            [connector.is_mapped for connector in connectors],
+            [False, True])
+
+    def test_evicted_object_is_reconnected(self):
+        set_connector_budget(max_objects=1, realm=self.realm)
+        connectors = self._create_saved_connectors(2)
+        text = connectors[1].load_object()
+        connectors[0].load_object()
+        self.assertFalse(connectors[1].is_mapped)
+
+        # The object is still in use and is not loaded again
+        self.assertIs(connectors[1].load_object(), text)
+
+        # Modifications of an evicted object are saved
+        connectors[0].load_object()
+        self.assertFalse(connectors[1].is_mapped)
+        text.content = "modified content"
+        text.touch()
+        self.assertTrue(connectors[1].is_object_modified())
+
+        reference = connectors[1].save_object()
+        self.assertEqual(
+            Connector.from_reference(reference).load_object().content,
+            "modified content")
+
+    def test_saving_connectors_are_not_evicted(self):
+        dataset_tree = create_dataset_tree(
+            "git",
+            self.realm,
+            [MetadataPath("")],
+            file_paths)
+        reference = dataset_tree.get_metadata_root_record(
+            MetadataPath("")).save()
+
+        # Saving the file tree accounts the metadata connectors, that
+        # must not evict the connector of the file tree during its save.
+        set_connector_budget(max_objects=2, realm=self.realm)
+        mrr = Connector.from_reference(reference).load_object()
+        file_tree = mrr.get_file_tree()
+        for path in file_paths:
+            file_tree.get_metadata(path)
+        file_tree.add_metadata(
+            MetadataPath("d"),
+            Metadata("git", self.realm))
+        reference = mrr.save()
+
+        set_connector_budget(realm=self.realm)
+        self.assertEqual(
+            sorted(
+                path
+                for path, _ in Connector.from_reference(
+                    reference).load_object().get_file_tree(
+                        ).get_paths_recursive()),
+            sorted(file_paths + [MetadataPath("d")]))
+
+    def test_modified_children_of_evicted_objects_are_saved(self):
+        reference = create_dataset_tree(
+            "git",
+            self.realm,
+            [MetadataPath("")],
+            file_paths).get_metadata_root_record(MetadataPath("")).save()
+
+        set_connector_budget(max_objects=1, realm=self.realm)
+        mrr = Connector.from_reference(reference).load_object()
+        file_tree = mrr.get_file_tree()
+        metadata = file_tree.get_metadata(file_paths[0])
+
+        # Evict the connector of the file tree and release the file
+        # tree. The metadata keeps the file tree alive, i.e. its
+        # modification is saved with the file tree.
+        mrr.get_dataset_level_metadata()
+        self.assertFalse(mrr.file_tree.is_mapped)
+        del file_tree
+        metadata.add_extractor_run(
+            None,
+            "new-extractor",
+            "a",
+            "a@example.com",
+            ExtractorConfiguration("1.0", {}),
+            {"info": "new run"})
+        saved_reference = mrr.save()
+        self.assertNotEqual(saved_reference.location, reference.location)
+
+        set_connector_budget(realm=self.realm)
+        self.assertIn(
+            "new-extractor",
+            Connector.from_reference(saved_reference).load_object(
+                ).get_file_tree().get_metadata(file_paths[0]).extractors())
+
+    def test_purge_removes_connector(self):
+        set_connector_budget(max_objects=2, realm=self.realm)
+        connectors = self._create_saved_connectors(2)
+        connectors[0].purge()
+        self.assertEqual(len(get_connector_cache(self.realm).entries), 1)
+
+
+class TestIdentityMap(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.realm = self.temp_dir.name
+        subprocess.run(["git", "init", self.realm], stdout=subprocess.PIPE)
+        dataset_tree = create_dataset_tree(
+            "git",
+            self.realm,
+            [MetadataPath("")],
+            file_paths)
+        self.reference = dataset_tree.get_metadata_root_record(
+            MetadataPath("")).save()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_objects_are_shared(self):
+        with mock.patch.object(
+                MetadataRootRecordGitMapper,
+                "map",
+                autospec=True,
+                side_effect=MetadataRootRecordGitMapper.map) as map_mrr:
+
+            mrr = Connector.from_reference(self.reference).load_object()
+            self.assertIs(
+                Connector.from_reference(self.reference).load_object(),
+                mrr)
+            map_mrr.assert_called_once()
+
+    def test_modified_objects_are_not_shared(self):
+        mrr = Connector.from_reference(self.reference).load_object()
+        mrr.touch()
+        self.assertIsNot(
+            Connector.from_reference(self.reference).load_object(),
+            mrr)
+
+    def test_saved_shared_object_updates_references(self):
+        connector_1 = Connector.from_reference(self.reference)
+        connector_2 = Connector.from_reference(self.reference)
+        mrr = connector_1.load_object()
+        self.assertIs(connector_2.load_object(), mrr)
+
+        metadata = Metadata("git", self.realm)
+        metadata.add_extractor_run(
+            0,
+            "test-extractor",
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {}),
+            {"info": "modified"})
+        mrr.set_dataset_level_metadata(metadata)
+        new_reference = connector_1.save_object()
+        self.assertNotEqual(new_reference.location, self.reference.location)
+        self.assertEqual(
+            connector_2.save_object().location,
+            new_reference.location)
+
+    def test_git_references_are_not_shared(self):
+        git_update_ref(self.realm, "refs/test/mrr", self.reference.location)
+        reference = Reference(
+            "git",
+            self.realm,
+            "MetadataRootRecord",
+            "refs/test/mrr")
+        mrr = Connector.from_reference(reference).load_object()
+        self.assertIsNot(
+            Connector.from_reference(reference).load_object(),
+            mrr)
+
+    def test_equal_objects_are_not_shared(self):
+        reference = Connector.from_object(
+            Text("git", self.realm, "content")).save_object()
+        self.assertIsNot(
+            Connector.from_reference(reference).load_object(),
+            Connector.from_reference(reference).load_object())
+
+    def test_equal_metadata_of_files_is_not_shared(self):
+        file_tree = FileTree("git", self.realm)
+        for path in ("a", "b"):
+            file_tree.add_metadata(
+                MetadataPath(path),
+                Metadata("git", self.realm))
+        reference = file_tree.save()
+
+        file_tree = Connector.from_reference(reference).load_object()
+        metadata_a = file_tree.get_metadata(MetadataPath("a"))
+        metadata_b = file_tree.get_metadata(MetadataPath("b"))
+        self.assertIsNot(metadata_a, metadata_b)
+
+        metadata_a.add_extractor_run(
+            0,
+            "test-extractor",
+            "test-author",
+            "test@example.com",
+            ExtractorConfiguration("1.0", {}),
+            {"info": "a"})
+        self.assertEqual(list(metadata_b.extractors()), [])
+
+        file_tree = Connector.from_reference(file_tree.save()).load_object()
+        self.assertEqual(
+            list(file_tree.get_metadata(MetadataPath("a")).extractors()),
+            ["test-extractor"])
+        self.assertEqual(
+            list(file_tree.get_metadata(MetadataPath("b")).extractors()),
+            [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,12 +2,15 @@ import subprocess
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 from uuid import UUID
 
 from dataladmetadatamodel.connector import Connector
 from dataladmetadatamodel.datasettree import DatasetTree
+from dataladmetadatamodel.filetree import FileTree
 from dataladmetadatamodel.metadatapath import MetadataPath
 from dataladmetadatamodel.metadatarootrecord import MetadataRootRecord
+from dataladmetadatamodel.mapper.gitmapper import datasettreemapper
 from dataladmetadatamodel.mapper.gitmapper.objectreference import flush_object_references
 
 from .utils import assert_dataset_trees_equal, create_dataset_tree
@@ -59,6 +62,29 @@ class TestDatasetTree(unittest.TestCase):
         for entry in returned_entries:
             self.assertEqual(entry[1], mrr)
 
+    def test_add_datasets(self):
+        paths = [
+            MetadataPath("d1/d1.1"),
+            MetadataPath("d1"),
+            MetadataPath(""),
+            MetadataPath("d2/d2.1")]
+
+        mrrs = {
+            path: MetadataRootRecord(
+                "memory", "", uuid_0, str(path),
+                Connector.from_object(None),
+                Connector.from_object(None))
+            for path in paths
+        }
+
+        dataset_tree = DatasetTree("memory", "")
+        dataset_tree.add_datasets(mrrs.items())
+
+        self.assertEqual(
+            sorted(dataset_tree.get_dataset_paths()),
+            sorted(mrrs.items()))
+        self.assertNotIn(MetadataPath("d2"), dataset_tree)
+
     def test_root_node(self):
         dataset_tree = DatasetTree("git", "/tmp")
         mrr = MetadataRootRecord(
@@ -149,6 +175,145 @@ class TestDeepCopy(unittest.TestCase):
                 False)
 
 
+class TestMapping(unittest.TestCase):
+
+    def test_lazy_mapping(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            dataset_tree = create_dataset_tree(
+                "git",
+                realm,
+                dataset_test_paths,
+                file_test_paths)
+            reference = dataset_tree.save()
+            flush_object_references(Path(realm))
+
+            mapped_dataset_tree = Connector.from_reference(
+                reference).load_object()
+            self.assertFalse(mapped_dataset_tree.is_loaded())
+
+            mrr = mapped_dataset_tree.get_metadata_root_record(
+                MetadataPath("d2/d2.1/d2.1.1"))
+            self.assertIsInstance(mrr, MetadataRootRecord)
+            self.assertEqual(
+                mrr.dataset_identifier,
+                dataset_tree.get_metadata_root_record(
+                    MetadataPath("d2/d2.1/d2.1.1")).dataset_identifier)
+
+            # Only the requested metadata root record is mapped, and
+            # only the nodes on the path are loaded
+            self.assertFalse(mapped_dataset_tree.connector.is_mapped)
+            self.assertFalse(
+                mapped_dataset_tree.get_node_at_path(
+                    MetadataPath("d1")).is_loaded())
+
+            # Saving does not map the remaining metadata root records
+            self.assertEqual(
+                mapped_dataset_tree.save().location,
+                reference.location)
+            self.assertFalse(mapped_dataset_tree.connector.is_mapped)
+
+            assert_dataset_trees_equal(
+                self,
+                dataset_tree,
+                mapped_dataset_tree,
+                True)
+
+    def test_node_values(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            dataset_tree = create_dataset_tree(
+                "git",
+                realm,
+                dataset_test_paths,
+                file_test_paths)
+            reference = dataset_tree.save()
+
+            mapped_dataset_tree = Connector.from_reference(
+                reference).load_object()
+            node = mapped_dataset_tree.get_node_at_path(MetadataPath("d1"))
+            self.assertIsInstance(node.value, MetadataRootRecord)
+            self.assertIs(
+                node.value,
+                mapped_dataset_tree.get_metadata_root_record(
+                    MetadataPath("d1")))
+            self.assertIsNone(
+                mapped_dataset_tree.get_node_at_path(
+                    MetadataPath("d3")).value)
+
+            # Modifications of node values are saved
+            file_tree = FileTree("git", realm)
+            node.value.set_file_tree(file_tree)
+            modified_reference = mapped_dataset_tree.save()
+            self.assertNotEqual(
+                modified_reference.location,
+                reference.location)
+            self.assertEqual(
+                Connector.from_reference(
+                    modified_reference
+                ).load_object().get_metadata_root_record(
+                    MetadataPath("d1")).file_tree.reference.location,
+                file_tree.save().location)
+
+            # Assigning a value converts a directory into a dataset
+            mrr = MetadataRootRecord(
+                "git", realm, uuid_0, "00112233",
+                Connector.from_object(None),
+                Connector.from_object(None))
+            mapped_dataset_tree.get_node_at_path(MetadataPath("d3")).value = mrr
+            self.assertIn(MetadataPath("d3"), mapped_dataset_tree)
+            self.assertIn(
+                (MetadataPath("d3"), mrr),
+                Connector.from_reference(
+                    mapped_dataset_tree.save()
+                ).load_object().get_dataset_paths())
+
+    def test_incremental_save(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            dataset_tree = create_dataset_tree(
+                "git",
+                realm,
+                dataset_test_paths,
+                file_test_paths)
+            reference = dataset_tree.save()
+
+            mapped_dataset_tree = Connector.from_reference(
+                reference).load_object()
+            mapped_dataset_tree.add_dataset(
+                MetadataPath("d1/d1.2"),
+                MetadataRootRecord(
+                    "git", realm, uuid_0, "00112233",
+                    Connector.from_object(None),
+                    Connector.from_object(None)))
+
+            # Only the nodes on the path to the new dataset are
+            # saved: "d1/d1.2", "d1", and the root.
+            with mock.patch.object(
+                    datasettreemapper,
+                    "git_save_tree",
+                    wraps=datasettreemapper.git_save_tree) as save_tree:
+                modified_location = mapped_dataset_tree.save().location
+                self.assertEqual(save_tree.call_count, 3)
+            self.assertFalse(
+                mapped_dataset_tree.get_node_at_path(
+                    MetadataPath("d2")).is_loaded())
+
+            # The result is equal to the result of a complete save
+            dataset_tree.add_dataset(
+                MetadataPath("d1/d1.2"),
+                MetadataRootRecord(
+                    "git", realm, uuid_0, "00112233",
+                    Connector.from_object(None),
+                    Connector.from_object(None)))
+            self.assertEqual(
+                dataset_tree.save().location,
+                modified_location)
+
+
 class TestSubTreeManipulation(unittest.TestCase):
     def get_mrr(
             self,
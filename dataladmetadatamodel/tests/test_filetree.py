@@ -2,14 +2,29 @@ import subprocess
 import tempfile
 import unittest
 from pathlib import Path
+from unittest import mock
 
 from dataladmetadatamodel.connector import Connector
 from dataladmetadatamodel.filetree import FileTree
-from dataladmetadatamodel.metadata import Metadata
+from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
 from dataladmetadatamodel.metadatapath import MetadataPath
+from dataladmetadatamodel.mapper.gitmapper import filetreemapper
+from dataladmetadatamodel.mapper.gitmapper.filetreemapper import (
+    ESCAPED_NAME_PREFIX,
+    FILE_TREE_FORMAT_NAME,
+    INTERN_TABLE_NAME
+)
+from dataladmetadatamodel.mapper.gitmapper.gitbackend import (
+    get_empty_blob_hash,
+    git_ls_tree_recursive,
+    git_save_json,
+    git_save_str,
+    git_save_tree
+)
 from dataladmetadatamodel.mapper.gitmapper.objectreference import (
     flush_object_references
 )
+from dataladmetadatamodel.mapper.reference import Reference
 
 from .utils import assert_file_trees_equal, create_file_tree_with_metadata
 
@@ -49,6 +64,23 @@ class TestFileTree(unittest.TestCase):
                 returned_metadata,
                 Metadata("git", f"/tmp/{returned_path}"))
 
+    def test_add_metadata_entries(self):
+        metadata_objects = {
+            path: Metadata("git", f"/tmp/{path}")
+            for path in sorted(default_paths)
+        }
+
+        file_tree = FileTree("git", "/tmp")
+        file_tree.add_metadata_entries(metadata_objects.items())
+
+        self.assertEqual(
+            [
+                (path, connector.object)
+                for path, connector in file_tree.get_paths_recursive()
+            ],
+            list(metadata_objects.items()))
+        self.assertTrue(file_tree.is_modified())
+
     def test_root_node(self):
         file_tree = FileTree("git", "/tmp")
         metadata_node = Metadata("git", "/tmp")
@@ -118,5 +150,280 @@ class TestDeepCopy(unittest.TestCase):
             assert_file_trees_equal(self, file_tree, file_tree_copy, True)
 
 
+class TestMapping(unittest.TestCase):
+
+    def test_save_and_map(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            file_tree = create_file_tree_with_metadata(
+                "git",
+                realm,
+                default_paths,
+                [Metadata("git", realm) for _ in default_paths])
+            reference = file_tree.save()
+            flush_object_references(Path(realm))
+
+            mapped_file_tree = Connector.from_reference(reference).load_object()
+            assert_file_trees_equal(self, file_tree, mapped_file_tree, False)
+
+    def test_lazy_mapping(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            file_tree = create_file_tree_with_metadata(
+                "git",
+                realm,
+                default_paths,
+                [Metadata("git", realm) for _ in default_paths])
+            reference = file_tree.save()
+            flush_object_references(Path(realm))
+
+            mapped_file_tree = Connector.from_reference(reference).load_object()
+            self.assertFalse(mapped_file_tree.is_loaded())
+
+            metadata = mapped_file_tree.get_metadata(MetadataPath("a/b/c"))
+            self.assertIsInstance(metadata, Metadata)
+
+            # Only the nodes on the path are loaded
+            for path, is_loaded in (("", True),
+                                    ("a", True),
+                                    ("a/b", True),
+                                    ("c", False)):
+                self.assertEqual(
+                    mapped_file_tree.get_node_at_path(
+                        MetadataPath(path)).is_loaded(),
+                    is_loaded)
+            self.assertFalse(mapped_file_tree.is_modified())
+
+    def test_incremental_save(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            def create_metadata(extractor_names):
+                metadata = Metadata("git", realm)
+                for extractor_name in extractor_names:
+                    metadata.add_extractor_run(
+                        0,
+                        extractor_name,
+                        "test-author",
+                        "test@example.com",
+                        ExtractorConfiguration("1.0", {}),
+                        {"info": "test"})
+                return metadata
+
+            file_tree = create_file_tree_with_metadata(
+                "git",
+                realm,
+                default_paths,
+                [create_metadata([]) for _ in default_paths])
+            reference = file_tree.save()
+
+            mapped_file_tree = Connector.from_reference(reference).load_object()
+            metadata = mapped_file_tree.get_metadata(MetadataPath("a/b/c"))
+            metadata.add_extractor_run(
+                0,
+                "test-extractor",
+                "test-author",
+                "test@example.com",
+                ExtractorConfiguration("1.0", {}),
+                {"info": "test"})
+            mapped_file_tree.add_metadata(
+                MetadataPath("a/y"),
+                create_metadata(["other-extractor"]))
+
+            # Only the directories on the paths to the modified
+            # entries are saved: "a/b", "a", and the root. The intern
+            # table is saved, because it gets the entries of the new
+            # extractor runs.
+            with mock.patch.object(
+                    filetreemapper,
+                    "git_save_tree",
+                    wraps=filetreemapper.git_save_tree) as save_tree:
+                modified_location = mapped_file_tree.save().location
+                self.assertEqual(save_tree.call_count, 4)
+            self.assertFalse(
+                mapped_file_tree.get_node_at_path(
+                    MetadataPath("c")).is_loaded())
+
+            # Saving an unchanged tree does not save any directory
+            with mock.patch.object(
+                    filetreemapper,
+                    "git_save_tree",
+                    wraps=filetreemapper.git_save_tree) as save_tree:
+                self.assertEqual(
+                    mapped_file_tree.save().location,
+                    modified_location)
+                save_tree.assert_not_called()
+
+            # The result is equal to the result of a complete save
+            paths = default_paths + [MetadataPath("a/y")]
+            expected_file_tree = create_file_tree_with_metadata(
+                "git",
+                realm,
+                paths,
+                [
+                    create_metadata(["test-extractor"])
+                    if path == MetadataPath("a/b/c")
+                    else create_metadata(["other-extractor"])
+                    if path == MetadataPath("a/y")
+                    else create_metadata([])
+                    for path in paths
+                ])
+            self.assertEqual(
+                expected_file_tree.save().location,
+                modified_location)
+
+
+class TestFileTreeFormat(unittest.TestCase):
+
+    def test_leaves_point_to_metadata(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            file_tree = FileTree("git", realm)
+            file_tree.add_metadata(MetadataPath("a/b"), Metadata("git", realm))
+            file_tree.add_metadata(MetadataPath("c"), None)
+            reference = file_tree.save()
+
+            metadata_location = file_tree.get_node_at_path(
+                MetadataPath("a/b")).value.reference.location
+            self.assertEqual(
+                sorted((
+                    line.split()[2] + " " + line.split()[3]
+                    for line in git_ls_tree_recursive(
+                        realm,
+                        reference.location)
+                    if line.split()[3] != FILE_TREE_FORMAT_NAME),
+                key=lambda entry: entry.split()[1]),
+                [
+                    metadata_location + " a/b",
+                    get_empty_blob_hash(realm) + " c"
+                ])
+
+            mapped_file_tree = Connector.from_reference(reference).load_object()
+            self.assertEqual(
+                mapped_file_tree.get_metadata(MetadataPath("a/b")),
+                file_tree.get_metadata(MetadataPath("a/b")))
+            self.assertIsNone(mapped_file_tree.get_metadata(MetadataPath("c")))
+            self.assertNotIn(FILE_TREE_FORMAT_NAME, mapped_file_tree.child_nodes)
+
+    def test_legacy_format(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            # Create a file tree with Reference blobs as leaves
+            metadata = Metadata("git", realm)
+            metadata_reference = metadata.save()
+            reference_location = git_save_str(
+                realm,
+                metadata_reference.to_json_str())
+            sub_tree_location = git_save_tree(
+                realm,
+                [("100644", "blob", reference_location, "b")])
+            tree_location = git_save_tree(
+                realm,
+                [("040000", "tree", sub_tree_location, "a")])
+
+            mapped_file_tree = Connector.from_reference(
+                Reference("git", realm, "FileTree", tree_location)
+            ).load_object()
+            self.assertEqual(
+                mapped_file_tree.get_node_at_path(
+                    MetadataPath("a/b")).value.reference.location,
+                metadata_reference.location)
+
+            # Saving migrates the tree to the current format
+            saved_location = mapped_file_tree.save().location
+            self.assertIn(
+                f"100644 blob {metadata_reference.location}\ta/b",
+                git_ls_tree_recursive(realm, saved_location))
+
+    def test_reserved_names(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            paths = [
+                MetadataPath(FILE_TREE_FORMAT_NAME),
+                MetadataPath(INTERN_TABLE_NAME),
+                MetadataPath(ESCAPED_NAME_PREFIX + "a"),
+                MetadataPath(f"b/{FILE_TREE_FORMAT_NAME}")
+            ]
+            file_tree = FileTree("git", realm)
+            for index, path in enumerate(paths):
+                metadata = Metadata("git", realm)
+                metadata.add_extractor_run(
+                    None, f"extractor-{index}", "a", "a@example.com",
+                    ExtractorConfiguration("1.0", {}), {})
+                file_tree.add_metadata(path, metadata)
+            reference = file_tree.save()
+
+            mapped_file_tree = Connector.from_reference(reference).load_object()
+            self.assertEqual(
+                sorted(
+                    path
+                    for path, _ in mapped_file_tree.get_paths_recursive()),
+                sorted(paths))
+            for path in paths:
+                self.assertEqual(
+                    mapped_file_tree.get_metadata(path),
+                    file_tree.get_metadata(path))
+
+    def test_legacy_format_with_other_realm(self):
+        with tempfile.TemporaryDirectory() as realm, \
+                tempfile.TemporaryDirectory() as other_realm:
+            for repo_dir in (realm, other_realm):
+                subprocess.run(["git", "init", repo_dir])
+
+            # Create a legacy file tree with a Reference blob, that
+            # refers to metadata in another realm.
+            metadata = Metadata("git", other_realm)
+            metadata.add_extractor_run(
+                None, "extractor", "a", "a@example.com",
+                ExtractorConfiguration("1.0", {}), {"info": "other realm"})
+            reference_location = git_save_str(
+                realm,
+                metadata.save().to_json_str())
+            tree_location = git_save_tree(
+                realm,
+                [("100644", "blob", reference_location, "a")])
+
+            mapped_file_tree = Connector.from_reference(
+                Reference("git", realm, "FileTree", tree_location)
+            ).load_object()
+            leaf_node = mapped_file_tree.get_node_at_path(MetadataPath("a"))
+            self.assertEqual(str(leaf_node.value.reference.realm), other_realm)
+
+            # Saving copies the metadata into the realm of the tree
+            saved_reference = mapped_file_tree.save()
+            self.assertEqual(str(leaf_node.value.reference.realm), realm)
+
+            # The saved tree does not depend on the other realm
+            mapped_file_tree = Connector.from_reference(
+                saved_reference).load_object()
+            self.assertEqual(
+                mapped_file_tree.get_metadata(MetadataPath("a")),
+                metadata.deepcopy("git", realm))
+
+    def test_unsupported_format(self):
+        with tempfile.TemporaryDirectory() as realm:
+            subprocess.run(["git", "init", realm])
+
+            format_location = git_save_json(
+                realm,
+                {"@": {"type": "FileTree", "version": "1.0"}})
+            tree_location = git_save_tree(
+                realm,
+                [("100644", "blob", format_location, FILE_TREE_FORMAT_NAME)])
+
+            mapped_file_tree = Connector.from_reference(
+                Reference("git", realm, "FileTree", tree_location)
+            ).load_object()
+            self.assertRaises(
+                ValueError,
+                mapped_file_tree.get_node_at_path,
+                MetadataPath("a"))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,11 @@
+import json
 import unittest
 from typing import Tuple
+from unittest import mock
 
 
 from dataladmetadatamodel.metadata import ExtractorConfiguration, \
-    MetadataInstance, MetadataInstanceSet
+    Metadata, MetadataInstance, MetadataInstanceSet
 
 
 class TestInstanceSetBase(unittest.TestCase):
@@ -70,6 +72,82 @@ class TestSerialization(TestInstanceSetBase):
         ins2 = MetadataInstanceSet.from_json_str(json_str)
         self.assert_equal_to_pattern(ins2)
 
+    def test_chunked_metadata_serialization(self):
+        metadata = Metadata("git", "/tmp")
+        for extractor_name, content in (("extractor_1", {}),
+                                        ("extractor_\u00e4", {"a\u00f6": [1]})):
+            for prefix in ("default", "new"):
+                metadata.add_extractor_run(
+                    1.0,
+                    extractor_name,
+                    f"{prefix}_name",
+                    f"{prefix}_email",
+                    self.get_configuration(prefix),
+                    content)
+
+        json_str = metadata.to_json()
+        chunks = list(metadata.iter_json())
+        self.assertGreater(len(chunks), 4)
+        self.assertEqual("".join(chunks), json_str)
+        self.assertEqual(metadata.serialized_size, len(json_str))
+
+        # Undecoded instance sets are serialized identically
+        self.assertEqual(
+            "".join(Metadata.from_json(json_str).iter_json()),
+            json_str)
+
+
+class TestLazyDecoding(TestInstanceSetBase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        metadata = Metadata("git", "/tmp")
+        for extractor_name in ("extractor_1", "extractor_2"):
+            for prefix in ("default", "new"):
+                metadata.add_extractor_run(
+                    1.0,
+                    extractor_name,
+                    f"{prefix}_name",
+                    f"{prefix}_email",
+                    self.get_configuration(prefix),
+                    {"metadata 1": f"{prefix}_content"})
+        self.json_str = metadata.to_json()
+
+    def test_listing_does_not_decode_instances(self):
+        with mock.patch.object(
+                MetadataInstance,
+                "from_json_obj",
+                side_effect=AssertionError("instance decoded")):
+
+            metadata = Metadata.from_json(self.json_str)
+            self.assertEqual(
+                list(metadata.extractors()),
+                ["extractor_1", "extractor_2"])
+            for _, instance_set in metadata.extractor_runs():
+                self.assertEqual(
+                    instance_set.get_configurations(),
+                    [
+                        self.get_configuration("default"),
+                        self.get_configuration("new")
+                    ])
+                self.assertFalse(instance_set.is_decoded())
+
+            # Undecoded parts are serialized as they were read
+            self.assertEqual(
+                json.loads(metadata.to_json()),
+                json.loads(self.json_str))
+
+    def test_decoding_on_access(self):
+        metadata = Metadata.from_json(self.json_str)
+        instance_set = metadata.instance_sets["extractor_2"]
+        self.assertEqual(
+            instance_set.get_instance_for_configuration(
+                self.get_configuration("new")).metadata_content,
+            {"metadata 1": "new_content"})
+        self.assertTrue(instance_set.is_decoded())
+        self.assertFalse(metadata.instance_sets["extractor_1"].is_decoded())
+        self.assertEqual(metadata, Metadata.from_json(self.json_str))
+
 
 class TestUniqueness(TestInstanceSetBase):
 
@@ -105,6 +183,52 @@ class TestUniqueness(TestInstanceSetBase):
         self.assertIn(self.get_configuration("default"), configuration_list)
         self.assertIn(self.get_configuration("new"), configuration_list)
 
+    def test_configuration_lookup(self):
+        configurations = [
+            ExtractorConfiguration(
+                "1.0",
+                {"index": index, "options": {"values": [index, "x"]}})
+            for index in range(100)
+        ]
+        for configuration in configurations:
+            self.metadata_instance_set.add_metadata_instance(
+                MetadataInstance(
+                    1.0,
+                    "name",
+                    "email",
+                    configuration,
+                    {"content": configuration.parameter["index"]}))
+
+        json_obj = self.metadata_instance_set.to_json_obj()
+        for instance_set in (
+                self.metadata_instance_set,
+                MetadataInstanceSet.from_json_obj(json_obj)):
+
+            for index in (0, 42, 99):
+                self.assertEqual(
+                    instance_set.get_instance_for_configuration(
+                        ExtractorConfiguration(
+                            "1.0",
+                            {
+                                "options": {"values": [index, "x"]},
+                                "index": index
+                            })).metadata_content,
+                    {"content": index})
+
+            self.assertRaises(
+                ValueError,
+                instance_set.get_instance_for_configuration,
+                ExtractorConfiguration("2.0", {}))
+
+        # The serialized layout is unchanged
+        self.assertEqual(len(json_obj["parameter_set"]), 101)
+        self.assertEqual(
+            json_obj["parameter_set"][43]["parameter"]["index"],
+            42)
+        self.assertEqual(
+            json_obj["instance_set"][43]["metadata_content"],
+            {"content": 42})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import json
+import unittest
+from unittest import mock
+
+from dataladmetadatamodel import jsoncodec
+from dataladmetadatamodel.jsoncodec import dumps, iter_dumps, loads
+
+
+json_objects = [
+    None,
+    [True, False, 0, -1, 1.5, 1e-300, 2 ** 70, "", "äöü"],
+    {
+        "@": {"type": "Metadata", "version": "2.0"},
+        "nested": {"a": [{"b": None}], "ä": "\U0001f600"}
+    },
+    {1: "integer key"},
+    {True: [], None: {}, 1.5: [[1, 2], {"a": [3]}]}
+]
+
+# Content that orjson rejects, or decodes differently than json
+json_only_contents = [
+    "18446744073709551616",
+    "[-9223372036854775809, 9223372036854775808]",
+    "[NaN, Infinity, -Infinity]",
+    '"\\ud800"'
+]
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def test_canonical_encoding(self):
+        for json_object in json_objects:
+            self.assertEqual(dumps(json_object), json.dumps(json_object))
+            with mock.patch.object(jsoncodec, "orjson", None):
+                self.assertEqual(dumps(json_object), json.dumps(json_object))
+
+    def test_chunked_encoding(self):
+        for json_object in json_objects:
+            for depth in range(4):
+                self.assertEqual(
+                    "".join(iter_dumps(json_object, depth)),
+                    json.dumps(json_object))
+
+    def test_non_canonical_encoding(self):
+        for json_object in json_objects:
+            self.assertEqual(
+                loads(dumps(json_object, canonical=False)),
+                json.loads(json.dumps(json_object)))
+
+        # Objects that orjson cannot encode are encoded by json
+        self.assertEqual(dumps(2 ** 70, canonical=False), str(2 ** 70))
+
+    def test_decoding(self):
+        for json_object in json_objects:
+            content = json.dumps(json_object)
+            for encoded_content in (content, content.encode()):
+                self.assertEqual(
+                    loads(encoded_content),
+                    json.loads(encoded_content))
+                with mock.patch.object(jsoncodec, "orjson", None):
+                    self.assertEqual(
+                        loads(encoded_content),
+                        json.loads(encoded_content))
+
+    def test_json_only_content(self):
+        for content in json_only_contents:
+            self.assertEqual(
+                json.dumps(loads(content)),
+                json.dumps(json.loads(content)))
+
+    def test_invalid_content(self):
+        for content in ("", "[1, 2", "{'a': 1}"):
+            self.assertRaises(ValueError, loads, content)
+
+    @unittest.skipIf(jsoncodec.orjson is None, "orjson is not installed")
+    def test_accelerated_decoding(self):
+        with mock.patch.object(
+                jsoncodec.json,
+                "loads",
+                side_effect=AssertionError("json.loads called")):
+            self.assertEqual(loads('{"a": [1, 2.5]}'), {"a": [1, 2.5]})
+
+
+if __name__ == '__main__':
+    unittest.main()
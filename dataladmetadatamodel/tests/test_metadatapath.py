@@ -48,6 +48,60 @@ class TestMetadataPath(unittest.TestCase):
             metadata_path = MetadataPath("a/b/c")
         self.assertEqual(metadata_path, MetadataPath("a/b/c"))
 
+    def test_path_interface(self):
+        path = MetadataPath("a/b/c.tar.gz")
+        self.assertEqual(path.parts, ("a", "b", "c.tar.gz"))
+        self.assertEqual(path.name, "c.tar.gz")
+        self.assertEqual(path.suffix, ".gz")
+        self.assertEqual(path.suffixes, [".tar", ".gz"])
+        self.assertEqual(path.stem, "c.tar")
+        self.assertEqual(path.parent, MetadataPath("a/b"))
+        self.assertEqual(
+            tuple(path.parents),
+            (MetadataPath("a/b"), MetadataPath("a"), MetadataPath("")))
+        self.assertEqual(path.relative_to("a"), MetadataPath("b/c.tar.gz"))
+        self.assertRaises(ValueError, path.relative_to, "b")
+        self.assertTrue(path.is_relative_to(MetadataPath("a/b")))
+        self.assertEqual(path.joinpath("d", "e"), MetadataPath("a/b/c.tar.gz/d/e"))
+        self.assertEqual("x" / MetadataPath("y"), MetadataPath("x/y"))
+        self.assertEqual(str(MetadataPath("a/./b/")), "a/b")
+        self.assertEqual(MetadataPath("").as_posix(), "")
+        self.assertEqual(str(MetadataPath("")), "")
+        self.assertEqual(MetadataPath("a/b"), PurePosixPath("a/b"))
+        self.assertIsInstance(MetadataPath("a"), PurePosixPath)
+        self.assertIsInstance(path.parent, MetadataPath)
+        self.assertIsInstance(path / "d", MetadataPath)
+        self.assertEqual((path / "d").parts, ("a", "b", "c.tar.gz", "d"))
+
+    def test_delegated_path_interface(self):
+        path = MetadataPath("a/b/c.tar.gz")
+        self.assertEqual((path.drive, path.root, path.anchor), ("", "", ""))
+        self.assertFalse(path.is_reserved())
+        self.assertTrue(path.match("*.gz"))
+        self.assertTrue(path.match("b/*.tar.gz"))
+        self.assertFalse(path.match("a/*.gz"))
+        self.assertEqual(path.with_name("d"), MetadataPath("a/b/d"))
+        self.assertEqual(path.with_stem("d"), MetadataPath("a/b/d.gz"))
+        self.assertEqual(
+            path.with_suffix(".zip"),
+            MetadataPath("a/b/c.tar.zip"))
+        self.assertIsInstance(path.with_name("d"), MetadataPath)
+        self.assertRaises(ValueError, MetadataPath("").with_name, "d")
+        self.assertRaises(ValueError, path.with_suffix, "zip")
+        self.assertRaises(ValueError, path.as_uri)
+
+    def test_hash_and_order(self):
+        paths = [MetadataPath("b"), MetadataPath("a/b"), MetadataPath("a")]
+        self.assertEqual(
+            sorted(paths),
+            [MetadataPath("a"), MetadataPath("a/b"), MetadataPath("b")])
+        self.assertEqual(
+            len({*paths, MetadataPath("a"), MetadataPath("b")}),
+            3)
+        self.assertIs(
+            MetadataPath("name-1/x").parts[0],
+            MetadataPath("".join(["name", "-1"])).parts[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 
 from dataladmetadatamodel.metadatapath import MetadataPath
-from dataladmetadatamodel.treenode import TreeNode
+from dataladmetadatamodel.treenode import EMPTY_CHILD_NODES, TreeNode
 
 
 class TestHierarchy(unittest.TestCase):
@@ -45,6 +45,71 @@ class TestHierarchy(unittest.TestCase):
                 path,
                 TreeNode(value="test-value"))
 
+    def test_bulk_adding(self):
+        paths = [
+            MetadataPath(""),
+            MetadataPath("a/b/a"),
+            MetadataPath("a/b/c"),
+            MetadataPath("b"),
+            MetadataPath("c/d/e")]
+
+        tree = TreeNode()
+        tree.add_node_hierarchies(
+            (path, TreeNode(value=str(path)))
+            for path in paths)
+
+        self.assertEqual(tree.value, "")
+        self.assertEqual(
+            [
+                (path, node.value)
+                for path, node in tree.get_paths_recursive(False)
+            ],
+            [(path, str(path)) for path in paths[1:]])
+
+        # Directory nodes are created only once
+        self.assertEqual(list(tree.child_nodes.keys()), ["a", "b", "c"])
+        self.assertEqual(
+            list(tree.get_node_at_path(MetadataPath("a/b")).child_nodes),
+            ["a", "c"])
+
+    def test_bulk_adding_existing_path(self):
+        tree = TreeNode()
+        tree.add_node_hierarchy(
+            MetadataPath("a/b"),
+            TreeNode(value="test-value"))
+
+        for path in [MetadataPath("a/b"),
+                     MetadataPath("a/b/c")]:
+            self.assertRaises(
+                ValueError,
+                tree.add_node_hierarchies,
+                [(path, TreeNode(value="test-value"))])
+
+        tree.add_node_hierarchies(
+            [(MetadataPath("a/b/c"), TreeNode(value="test-value"))],
+            allow_leaf_node_conversion=True)
+        self.assertEqual(
+            tree.get_node_at_path(MetadataPath("a/b/c")).value,
+            "test-value")
+
+    def test_leaf_nodes_share_child_nodes(self):
+        tree = TreeNode()
+        tree.add_node_hierarchy(MetadataPath("a/b"), TreeNode(value="b"))
+        tree.add_node_hierarchy(MetadataPath("a/c"), TreeNode(value="c"))
+
+        self.assertIs(
+            tree.get_node_at_path(MetadataPath("a/b")).child_nodes,
+            tree.get_node_at_path(MetadataPath("a/c")).child_nodes)
+
+        tree.add_node_hierarchy(
+            MetadataPath("a/b/d"),
+            TreeNode(value="d"),
+            allow_leaf_node_conversion=True)
+        self.assertEqual(
+            list(tree.get_node_at_path(MetadataPath("a/b")).child_nodes),
+            ["d"])
+        self.assertEqual(len(EMPTY_CHILD_NODES), 0)
+
     def test_all_nodes_in_path(self):
         tree = TreeNode()
         tree.add_node_hierarchy(
@@ -65,5 +130,97 @@ class TestHierarchy(unittest.TestCase):
         self.assertEqual(len(all_nodes_in_path), 4)
 
 
+class TestWalk(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tree = TreeNode()
+        for path in ("a/b/c", "a/b/d", "a/e", "f"):
+            self.tree.add_node_hierarchy(
+                MetadataPath(path),
+                TreeNode(value=path))
+
+    def get_walked_paths(self, *args, **kwargs):
+        return [str(path) for path, _ in self.tree.walk(*args, **kwargs)]
+
+    def test_walk(self):
+        self.assertEqual(
+            self.get_walked_paths(),
+            ["", "a", "a/b", "a/b/c", "a/b/d", "a/e", "f"])
+        self.assertEqual(
+            self.get_walked_paths(leaves_only=True),
+            ["a/b/c", "a/b/d", "a/e", "f"])
+        self.assertEqual(
+            [
+                (str(path), node)
+                for path, node in self.tree.get_paths_recursive(True)
+            ],
+            [
+                (str(path), node)
+                for path, node in self.tree.walk()
+            ])
+
+    def test_walk_with_prefix(self):
+        self.assertEqual(
+            self.get_walked_paths(MetadataPath("a/b")),
+            ["a/b", "a/b/c", "a/b/d"])
+        self.assertEqual(
+            self.get_walked_paths(MetadataPath("a/e")),
+            ["a/e"])
+        self.assertEqual(self.get_walked_paths(MetadataPath("x")), [])
+
+    def test_walk_with_max_depth(self):
+        self.assertEqual(self.get_walked_paths(max_depth=0), [""])
+        self.assertEqual(
+            self.get_walked_paths(max_depth=1),
+            ["", "a", "f"])
+        self.assertEqual(
+            self.get_walked_paths(max_depth=2, leaves_only=True),
+            ["a/e", "f"])
+        self.assertEqual(
+            self.get_walked_paths(MetadataPath("a"), max_depth=1),
+            ["a", "a/b", "a/e"])
+
+
+class TestLoader(unittest.TestCase):
+    def test_loader(self):
+        loaded = []
+
+        def load_node():
+            loaded.append(True)
+            return "root-value", {"a": TreeNode(value="test-value")}
+
+        tree = TreeNode()
+        tree.set_loader(load_node)
+        self.assertFalse(tree.is_loaded())
+        self.assertEqual(loaded, [])
+
+        self.assertEqual(
+            tree.get_node_at_path(MetadataPath("a")).value,
+            "test-value")
+        self.assertTrue(tree.is_loaded())
+        self.assertEqual(tree.value, "root-value")
+
+        tree.add_node_hierarchy(MetadataPath("b"), TreeNode(value="b-value"))
+        self.assertEqual(sorted(tree.child_nodes.keys()), ["a", "b"])
+        self.assertEqual(loaded, [True])
+
+    def test_location_is_reset_on_change(self):
+        tree = TreeNode()
+        tree.set_loader(
+            lambda: (None, {"a": TreeNode(value="test-value")}),
+            "0123")
+        self.assertEqual(tree.location, "0123")
+
+        # Loading does not change the node
+        tree.get_node_at_path(MetadataPath("a"))
+        self.assertEqual(tree.location, "0123")
+
+        tree.add_node_hierarchy(MetadataPath("b"), TreeNode(value="b-value"))
+        self.assertIsNone(tree.location)
+
+        tree.location = "4567"
+        tree.value = "root-value"
+        self.assertIsNone(tree.location)
+
+
 if __name__ == '__main__':
     unittest.main()
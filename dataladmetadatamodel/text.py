@@ -22,6 +22,9 @@ class Text(ConnectedObject):
         self.realm = realm
         self.content = content
 
+    def get_size_estimate(self) -> int:
+        return len(self.content)
+
     def save(self) -> Reference:
         self.un_touch()
         return Reference(
@@ -1,13 +1,84 @@
-from typing import Any, Iterable, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from .metadatapath import MetadataPath
 
 
+ROOT_PATH = MetadataPath("")
+
+# Shared, immutable child nodes of all nodes without children. A node
+# gets its own dictionary when the first child node is added.
+EMPTY_CHILD_NODES = MappingProxyType(dict())
+
+
 class TreeNode:
+    __slots__ = ("_child_nodes", "_value", "loader", "location")
+
     def __init__(self,
                  value: Optional[Any] = None):
-        self.child_nodes = dict()
-        self.value = value
+        self._child_nodes = EMPTY_CHILD_NODES
+        self._value = value
+        self.loader = None
+        # The location of the persisted state of this node, i.e. the
+        # location it was loaded from or last saved to. It is reset
+        # when the value or the child nodes are changed. Mappers use
+        # it to skip saving unchanged nodes.
+        self.location: Optional[str] = None
+
+    def _load(self):
+        self._value, self._child_nodes = self.loader()
+        self.loader = None
+
+    @property
+    def child_nodes(self) -> Dict[str, "TreeNode"]:
+        if self.loader is not None:
+            self._load()
+        return self._child_nodes
+
+    @child_nodes.setter
+    def child_nodes(self, child_nodes: Dict[str, "TreeNode"]):
+        if self.loader is not None:
+            self._load()
+        self._child_nodes = child_nodes
+        self.location = None
+
+    @property
+    def value(self) -> Optional[Any]:
+        if self.loader is not None:
+            self._load()
+        return self._value
+
+    @value.setter
+    def value(self, value: Optional[Any]):
+        if self.loader is not None:
+            self._load()
+        self._value = value
+        self.location = None
+
+    def set_loader(self,
+                   loader: Callable[[], Tuple[Any, Dict[str, "TreeNode"]]],
+                   location: Optional[str] = None):
+        """
+        Defer the creation of the value and the child nodes of this
+        node until one of them is accessed. The loader returns a
+        tuple of the value and a dictionary that maps names to
+        child nodes. If given, location is the location of the
+        persisted state that the loader reads.
+        """
+        self._child_nodes = EMPTY_CHILD_NODES
+        self._value = None
+        self.loader = loader
+        self.location = location
+
+    def is_loaded(self) -> bool:
+        return self.loader is None
+
+    def _create_node(self) -> "TreeNode":
+        """
+        Create an empty node, that is added below this node, e.g. an
+        intermediate directory node.
+        """
+        return TreeNode()
 
     def __contains__(self, path: MetadataPath) -> bool:
         assert isinstance(path, MetadataPath)
@@ -27,23 +98,28 @@ class TreeNode:
 
         # Assert that there is no name is a single ".", and that
         # no name contains a "/".
-        assert all(map(lambda nn: nn[0] != ".", new_nodes))
-        assert all(map(lambda nn: nn[0].find("/") < 0, new_nodes))
+        assert all(
+            name != "." and "/" not in name
+            for name, _ in new_nodes)
 
         # Assert that there are no duplicated names
-        assert len(set(map(lambda nn: nn[0], new_nodes))) == len(new_nodes)
+        assert len(set(name for name, _ in new_nodes)) == len(new_nodes)
 
-        new_names = set(map(lambda nn: nn[0], new_nodes))
-        duplicated_names = set(self.child_nodes.keys()) & new_names
+        child_nodes = self.child_nodes
+        duplicated_names = [
+            name
+            for name, _ in new_nodes
+            if name in child_nodes]
 
         if duplicated_names:
             raise ValueError(
                 "Name(s) already exist(s): " + ", ".join(duplicated_names))
 
-        self.child_nodes = {
-            **self.child_nodes,
-            **dict(new_nodes)
-        }
+        if child_nodes is EMPTY_CHILD_NODES:
+            self._child_nodes = dict(new_nodes)
+        else:
+            child_nodes.update(new_nodes)
+        self.location = None
 
     def add_node_hierarchy(self,
                            path: MetadataPath,
@@ -69,7 +145,7 @@ class TreeNode:
         else:
             sub_node = self.child_nodes.get(path_elements[0], None)
             if not sub_node:
-                sub_node = TreeNode()
+                sub_node = self._create_node()
                 self._add_node(path_elements[0], sub_node)
             else:
                 if not allow_leaf_node_conversion and sub_node.is_leaf_node():
@@ -83,13 +159,58 @@ class TreeNode:
                 allow_leaf_node_conversion)
 
     def add_node_hierarchies(self,
-                             new_node_hierarchies: List[
+                             new_node_hierarchies: Iterable[
                                  Tuple[
                                      MetadataPath,
-                                     "TreeNode"]]):
+                                     "TreeNode"]],
+                             allow_leaf_node_conversion: bool = False):
+        """
+        Add all nodes in a single pass. Directory nodes are looked up,
+        or created, once per directory path and not once per added
+        node, which makes the construction linear in the number of
+        nodes. Paths should be sorted, because a directory node has to
+        be added before its children.
+        """
+        directory_nodes = {(): self}
+        for path, new_node in new_node_hierarchies:
+            path_elements = path.parts
+            if self.is_root_path(path):
+                self.value = new_node.value
+                continue
+            self._get_directory_node(
+                directory_nodes,
+                path_elements[:-1],
+                allow_leaf_node_conversion)._add_node(
+                    path_elements[-1],
+                    new_node)
 
-        for path_node_tuple in new_node_hierarchies:
-            self.add_node_hierarchy(*path_node_tuple)
+    def _get_directory_node(self,
+                            directory_nodes: Dict[Tuple[str, ...], "TreeNode"],
+                            path_elements: Tuple[str, ...],
+                            allow_leaf_node_conversion: bool) -> "TreeNode":
+        """
+        Return the node at path_elements, create it and all missing
+        intermediate nodes, if necessary. Nodes are cached in
+        directory_nodes, keyed by their path elements.
+        """
+        directory_node = directory_nodes.get(path_elements, None)
+        if directory_node is None:
+            parent_node = self._get_directory_node(
+                directory_nodes,
+                path_elements[:-1],
+                allow_leaf_node_conversion)
+            name = path_elements[-1]
+            directory_node = parent_node.child_nodes.get(name, None)
+            if directory_node is None:
+                directory_node = parent_node._create_node()
+                parent_node._add_node(name, directory_node)
+            elif not allow_leaf_node_conversion \
+                    and directory_node.is_leaf_node():
+                raise ValueError(
+                    f"Cannot replace leaf node with name "
+                    f"{name} with a directory node")
+            directory_nodes[path_elements] = directory_node
+        return directory_node
 
     def get_sub_node(self, name: str):
         return self.child_nodes[name]
@@ -99,7 +220,7 @@ class TreeNode:
                          ) -> Optional["TreeNode"]:
 
         """ Simple linear path-search """
-        path = path or MetadataPath("")
+        path = path or ROOT_PATH
         current_node = self
         for element in path.parts:
             try:
@@ -112,7 +233,7 @@ class TreeNode:
                               path: Optional[MetadataPath] = None
                               ) -> Optional[List[Tuple[str, "TreeNode"]]]:
 
-        path = path or MetadataPath("")
+        path = path or ROOT_PATH
         result = [("", self)]
         current_node = self
         for element in path.parts:
@@ -127,13 +248,53 @@ class TreeNode:
                             show_intermediate: Optional[bool] = False
                             ) -> Iterable[Tuple[MetadataPath, "TreeNode"]]:
 
-        if show_intermediate or self.is_leaf_node():
-            yield MetadataPath(""), self
+        return self.walk(leaves_only=not show_intermediate)
+
+    def walk(self,
+             prefix: Optional[MetadataPath] = None,
+             max_depth: Optional[int] = None,
+             leaves_only: bool = False
+             ) -> Iterable[Tuple[MetadataPath, "TreeNode"]]:
+        """
+        Yield path and node of all nodes in the subtree at prefix in
+        depth-first order. Paths are relative to self, i.e. they start
+        with prefix. If max_depth is given, only nodes up to max_depth
+        levels below prefix are yielded. If leaves_only is True, only
+        nodes without children are yielded.
+
+        The walk uses an explicit stack of child iterators instead of
+        recursion, and creates only the yielded path objects.
+        """
+        prefix_parts = prefix.parts if prefix is not None else ()
+        start_node = self.get_node_at_path(prefix)
+        if start_node is None:
+            return
+
+        if not leaves_only or start_node.is_leaf_node():
+            yield MetadataPath.from_parts(prefix_parts), start_node
+        if max_depth is not None and max_depth <= 0:
+            return
+
+        components = list(prefix_parts)
+        stack = [iter(start_node.child_nodes.items())]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                if stack:
+                    components.pop()
+                continue
+
+            name, node = entry
+            if not leaves_only:
+                yield MetadataPath.from_parts((*components, name)), node
+            elif node.is_leaf_node():
+                yield MetadataPath.from_parts((*components, name)), node
+                continue
 
-        for child_name, child_node in self.child_nodes.items():
-            for sub_path, tree_node in child_node.get_paths_recursive(
-                    show_intermediate):
-                yield MetadataPath(child_name) / sub_path, tree_node
+            if max_depth is None or len(stack) < max_depth:
+                components.append(name)
+                stack.append(iter(node.child_nodes.items()))
 
     @staticmethod
     def is_root_path(path: MetadataPath) -> bool:
@@ -21,6 +21,9 @@ class UUIDSet(ConnectedObject):
 
         if initial_set:
             self.uuid_set.update(initial_set)
+            for connector in initial_set.values():
+                if connector.is_mapped:
+                    self.register_child(connector.object)
 
     def save(self) -> Reference:
         """
@@ -51,14 +54,15 @@ class UUIDSet(ConnectedObject):
         The entry is marked as dirty.
         """
         self.touch()
-        self.uuid_set[uuid] = Connector.from_object(version_list)
+        self.uuid_set[uuid] = Connector.from_object(
+            self.register_child(version_list))
 
     def get_version_list(self, uuid) -> VersionList:
         """
         Get the version list for uuid. If it is not mapped yet,
         it will be mapped.
         """
-        return self.uuid_set[uuid].load_object()
+        return self.register_child(self.uuid_set[uuid].load_object())
 
     def unget_version_list(self, uuid):
         """
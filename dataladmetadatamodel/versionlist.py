@@ -41,6 +41,10 @@ class VersionList(ConnectedObject):
         self.realm = realm
         self.version_set = initial_set or dict()
 
+        for version_record in self.version_set.values():
+            if version_record.element_connector.is_mapped:
+                self.register_child(version_record.element_connector.object)
+
     def _get_version_record(self, primary_data_version) -> VersionRecord:
         return self.version_set[primary_data_version]
 
@@ -91,7 +95,7 @@ class VersionList(ConnectedObject):
         return (
             version_record.time_stamp,
             version_record.path,
-            version_record.element_connector.load_object())
+            self.register_child(version_record.element_connector.load_object()))
 
     def set_versioned_element(self,
                               primary_data_version: str,
@@ -108,7 +112,7 @@ class VersionList(ConnectedObject):
         self.version_set[primary_data_version] = VersionRecord(
             time_stamp,
             path,
-            Connector.from_object(element))
+            Connector.from_object(self.register_child(element)))
 
     def unget_versioned_element(self,
                                 primary_data_version: str):
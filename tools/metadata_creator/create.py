@@ -9,6 +9,7 @@ from dataladmetadatamodel.connector import Connector
 from dataladmetadatamodel.datasettree import DatasetTree
 from dataladmetadatamodel.filetree import FileTree
 from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
+from dataladmetadatamodel.metadatapath import MetadataPath
 from dataladmetadatamodel.metadatarootrecord import MetadataRootRecord
 from dataladmetadatamodel.uuidset import UUIDSet
 from dataladmetadatamodel.versionlist import TreeVersionList, VersionList, VersionRecord
@@ -110,16 +111,20 @@ def _create_file_tree(mapper_family, realm) -> FileTree:
 
     file_tree = FileTree(mapper_family, realm)
     file_paths = _create_file_paths([3, 4, 10], [])
-    for path in file_paths:
-        metadata = _create_metadata(
-            mapper_family,
-            realm,
-            path,
-            FILE_LEVEL_FORMATS,
-            3,
-            2
+    file_tree.add_metadata_entries(
+        (
+            MetadataPath(path),
+            _create_metadata(
+                mapper_family,
+                realm,
+                path,
+                FILE_LEVEL_FORMATS,
+                3,
+                2
+            )
         )
-        file_tree.add_metadata(path, metadata)
+        for path in file_paths
+    )
     return file_tree
 
 
@@ -154,9 +159,9 @@ def _create_metadata_root_record(mapper_family: str,
 def _create_dataset_tree(mapper_family, realm) -> DatasetTree:
     dataset_paths = _create_tree_paths([(3, 1), (2, 1), (3, 3)], [])
     dataset_tree = DatasetTree(mapper_family, realm)
-    for index, path in enumerate([""] + dataset_paths):
-        dataset_tree.add_dataset(
-            path,
+    dataset_tree.add_datasets(
+        (
+            MetadataPath(path),
             _create_metadata_root_record(
                 mapper_family,
                 realm,
@@ -165,6 +170,8 @@ def _create_dataset_tree(mapper_family, realm) -> DatasetTree:
                 "000102030405060708090a0b0c0d0e0f1011{index:04x}".format(index=index)
             )
         )
+        for index, path in enumerate([""] + dataset_paths)
+    )
 
     return dataset_tree
 
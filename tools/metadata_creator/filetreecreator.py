@@ -3,7 +3,8 @@ from typing import Generator, Tuple
 
 from dataladmetadatamodel import JSONObject
 from dataladmetadatamodel.filetree import FileTree
-from dataladmetadatamodel.metadata import ExtractorConfiguration
+from dataladmetadatamodel.metadata import ExtractorConfiguration, Metadata
+from dataladmetadatamodel.metadatapath import MetadataPath
 
 
 DATALAD_DATASET_HIDDEN_DIR_NAME = ".datalad"
@@ -73,16 +74,21 @@ def update_file_tree(mapper_family: str,
                      root_dir: str,
                      parameter_set_count: int):
 
+    new_entries = []
     for path, entry in read_files(root_dir):
+        metadata_path = MetadataPath(path)
+        if metadata_path in file_tree:
+            metadata = file_tree.get_metadata(metadata_path)
+        else:
+            metadata = Metadata(mapper_family, realm)
+            new_entries.append((metadata_path, metadata))
+
         for count in range(parameter_set_count):
             parameters = {
                 "fs_parameter_0": f"value_0.{count}",
                 "fs_parameter_1": f"value_1.{count}"
             }
-            file_tree.add_extractor_run(
-                mapper_family,
-                realm,
-                path,
+            metadata.add_extractor_run(
                 None,
                 "file-core-extractor",
                 "metadata_creator script",
@@ -92,3 +98,5 @@ def update_file_tree(mapper_family: str,
                     parameters
                 ),
                 get_extractor_run(path, entry, count))
+
+    file_tree.add_metadata_entries(new_entries)
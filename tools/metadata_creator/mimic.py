@@ -1,6 +1,9 @@
 import logging
+from contextlib import ExitStack
+from pathlib import Path
 
 
+from dataladmetadatamodel.mapper.gitmapper.gitbackend import pack_session
 from dataladmetadatamodel.mapper.gitmapper.objectreference import flush_object_references
 
 from tools.metadata_creator.mrrcreator import create_mrrs_from_dataset
@@ -23,20 +26,24 @@ def create_metadata_from_dataset(mapper: str,
         dataset_path,
         parameter_set_count)
 
-    uuid_set = create_uuid_set_for_mrrs(
-        mapper,
-        realm,
-        metadata_root_records)
-    mdc_logger.info(f"saving uuid set: {uuid_set}")
-    uuid_set.save()
-    mdc_logger.info(f"done saving uuid set: {uuid_set}")
-
-    tree_version_list = create_tree_version_list_for_mrrs(
-        mapper,
-        realm,
-        metadata_root_records)
-    mdc_logger.info(f"saving tree version list: {tree_version_list}")
-    tree_version_list.save()
-    mdc_logger.info(f"done saving tree version list: {tree_version_list}")
-
-    flush_object_references(Path(realm))
+    # Collect the git objects of the saves in a single packfile
+    with ExitStack() as stack:
+        if mapper == "git":
+            stack.enter_context(pack_session(realm))
+        uuid_set = create_uuid_set_for_mrrs(
+            mapper,
+            realm,
+            metadata_root_records)
+        mdc_logger.info(f"saving uuid set: {uuid_set}")
+        uuid_set.save()
+        mdc_logger.info(f"done saving uuid set: {uuid_set}")
+
+        tree_version_list = create_tree_version_list_for_mrrs(
+            mapper,
+            realm,
+            metadata_root_records)
+        mdc_logger.info(f"saving tree version list: {tree_version_list}")
+        tree_version_list.save()
+        mdc_logger.info(f"done saving tree version list: {tree_version_list}")
+
+        flush_object_references(Path(realm))
@@ -3,6 +3,7 @@ from typing import Dict, Tuple
 from uuid import UUID
 
 from dataladmetadatamodel.datasettree import DatasetTree
+from dataladmetadatamodel.metadatapath import MetadataPath
 from dataladmetadatamodel.metadatarootrecord import MetadataRootRecord
 from dataladmetadatamodel.versionlist import TreeVersionList
 
@@ -15,9 +16,10 @@ def create_tree_version_list_for_mrrs(
 
     dataset_tree = DatasetTree(mapper_family, realm)
 
-    for id_version_path, metadata_root_record in metadata_root_records.items():
-        dataset_id, dataset_version, relative_path = id_version_path
-        dataset_tree.add_dataset(relative_path, metadata_root_record)
+    dataset_tree.add_datasets(
+        (MetadataPath(relative_path), metadata_root_record)
+        for (_, _, relative_path), metadata_root_record
+        in metadata_root_records.items())
 
     top_level_version = tuple(
         filter(